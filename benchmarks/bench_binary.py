@@ -0,0 +1,60 @@
+"""
+Compare the binary format of over_stats.binary with JSON and pickle over the corpus.
+
+Usage: python benchmarks/bench_binary.py
+
+For each page of the corpus the profile is parsed once, then the size of each encoding is printed along with the time
+taken to encode and to decode it. JSON cannot encode Decimals, so the use_decimal profiles are only compared with
+pickle.
+"""
+import json
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus
+import over_stats
+import over_stats.binary
+import over_stats.parser
+
+ROUNDS = 20
+
+
+def best(function):
+    return min(timeit.repeat(function, number=ROUNDS, repeat=5)) / ROUNDS
+
+
+def formats(use_decimal):
+    binary = ('binary', over_stats.binary.dumps_model, over_stats.binary.loads_model)
+    pickled = ('pickle', lambda model: pickle.dumps(model, pickle.HIGHEST_PROTOCOL), pickle.loads)
+    if use_decimal:
+        return [binary, pickled]
+    return [binary, ('json', lambda model: json.dumps(model).encode('utf-8'), json.loads), pickled]
+
+
+def main():
+    print(f'{"page":30} {"format":8} {"bytes":>9} {"dumps ms":>9} {"loads ms":>9}')
+    totals = {}
+    for use_decimal in (False, True):
+        for page in corpus.load_corpus():
+            model = over_stats.parser.parse_career_page(page.content, use_decimal)
+            name = page.name + (' decimal' if use_decimal else '')
+            for format_name, dumps, loads in formats(use_decimal):
+                data = dumps(model)
+                dumps_time = best(lambda: dumps(model))
+                loads_time = best(lambda: loads(data))
+                key = (format_name, use_decimal)
+                size, total_dumps, total_loads = totals.get(key, (0, 0, 0))
+                totals[key] = (size + len(data), total_dumps + dumps_time, total_loads + loads_time)
+                print(f'{name:30} {format_name:8} {len(data):9} {dumps_time * 1000:9.3f} {loads_time * 1000:9.3f}')
+    print()
+    for (format_name, use_decimal), (size, dumps_time, loads_time) in totals.items():
+        name = 'total' + (' decimal' if use_decimal else '')
+        print(f'{name:30} {format_name:8} {size:9} {dumps_time * 1000:9.3f} {loads_time * 1000:9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark suite over the corpus of career pages in benchmarks/corpus. The committed pages are synthetic, recorded pages
+are added with 'python benchmarks/corpus.py record', see benchmarks/corpus.py. It needs pytest-benchmark and runs
+offline:
+
+    python -m pytest benchmarks/bench_corpus.py --benchmark-autosave
+
+Results are saved in .benchmarks/ and a later commit can be compared against them, failing when it is slower:
+
+    python -m pytest benchmarks/bench_corpus.py --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Every page is measured end to end through load_data_if_needed() with each parser, served from memory so only the
+parser is measured. Each generate_* helper and each builder of the single pass parser is measured separately, along
+with the throughput of handle_stat_value and of the ValueConverter used by the parsers. The peak memory allocated
+while loading a profile is stored in the extra_info of each result.
+"""
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus
+import over_stats
+import over_stats.parser
+import over_stats.transport
+import over_stats.values
+
+pytest.importorskip('pytest_benchmark')
+
+PAGES = corpus.load_corpus()
+PAGE_IDS = [page.name for page in PAGES]
+# The selector parser is much slower, fewer rounds keep the suite short.
+ROUNDS = {over_stats.PARSER_REQUESTS_HTML: 3}
+DEFAULT_ROUNDS = 10
+
+
+class CorpusTransport(over_stats.transport.Transport):
+    """
+    Transport that serves a page of the corpus from memory.
+    """
+
+    def __init__(self, page):
+        self.page = page
+
+    def get(self, url, headers=None):
+        return over_stats.transport.Response(url, 200, self.page.content, {'Content-Type': 'text/html; charset=utf-8'})
+
+
+def require(parser):
+    if parser == over_stats.PARSER_LXML:
+        pytest.importorskip('lxml')
+    elif parser == over_stats.PARSER_REQUESTS_HTML:
+        pytest.importorskip('requests_html')
+
+
+def new_profile(page, parser, use_decimal=False):
+    return over_stats.PlayerProfile(page.battletag, page.platform, use_decimal, parser=parser,
+                                    transport=CorpusTransport(page))
+
+
+def peak_memory(function):
+    """
+    Get the peak number of bytes allocated by Python while running function.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def mode_sections(page):
+    """
+    Get the requests_html elements of each game mode of the page and the dropdowns used by the generate_* helpers.
+    """
+    import requests_html
+    html = requests_html.HTML(html=over_stats.parser.decode_page(page.content))
+    modes = []
+    for mode in over_stats.MODE_LIST:
+        html_mode = html.find(f'div[id="{mode}"]')
+        if html_mode:
+            html_mode = html_mode[0]
+            modes.append((html_mode, over_stats.PlayerProfile.get_dict_from_dropdown(over_stats.COMPARISON, html_mode),
+                          over_stats.PlayerProfile.get_dict_from_dropdown(over_stats.STATS, html_mode)))
+    return html, modes
+
+
+def stat_values(page):
+    """
+    Get the text of every stat value of the page, as it is given to handle_stat_value.
+    """
+    index = over_stats.parser.index_page(page.content, over_stats.PARSER_STDLIB)
+    values = []
+    for blocks in index.blocks.values():
+        for block in blocks:
+            if block.cards:
+                for card in block.cards:
+                    values.extend(card.lines[2::2])
+            elif not block.achievements:
+                values.extend(block.lines[1::2])
+    return values
+
+
+'''
+Load every page of the corpus end to end with each parser.
+'''
+@pytest.mark.parametrize('parser', over_stats.PARSERS)
+@pytest.mark.parametrize('page', PAGES, ids=PAGE_IDS)
+def test_load_data_if_needed(benchmark, page, parser):
+    require(parser)
+    benchmark.group = f'load_data_if_needed {page.name}'
+    benchmark.extra_info['page_bytes'] = len(page.content)
+    benchmark.extra_info['peak_memory'] = peak_memory(lambda: new_profile(page, parser).load_data_if_needed())
+    benchmark.pedantic(lambda profile: profile.load_data_if_needed(),
+                       setup=lambda: ((new_profile(page, parser),), {}),
+                       rounds=ROUNDS.get(parser, DEFAULT_ROUNDS))
+
+'''
+Measure each generate_* helper over every section of the page.
+'''
+@pytest.mark.parametrize('helper', ['generate_comparison_stats', 'generate_hero_stats', 'generate_achievement_list',
+                                    'get_dict_from_dropdown'])
+@pytest.mark.parametrize('page', PAGES, ids=PAGE_IDS)
+def test_generate_helpers(benchmark, page, helper):
+    require(over_stats.PARSER_REQUESTS_HTML)
+    profile = over_stats.PlayerProfile
+    html, modes = mode_sections(page)
+    if helper == 'generate_comparison_stats':
+        calls = [(html_mode, value) for html_mode, comparisons, _ in modes for value in comparisons.values()]
+    elif helper == 'generate_hero_stats':
+        calls = [(html_mode, value) for html_mode, _, heroes in modes for value in heroes.values()]
+    elif helper == 'generate_achievement_list':
+        calls = [(html, value) for value in profile.get_dict_from_dropdown(over_stats.ACHIEVEMENTS, html).values()]
+    else:
+        calls = [(group_id, html_mode) for html_mode, _, _ in modes
+                 for group_id in (over_stats.COMPARISON, over_stats.STATS)]
+    function = getattr(profile, helper)
+    benchmark.group = helper
+    benchmark.extra_info['calls'] = len(calls)
+    benchmark.pedantic(lambda: [function(*arguments) for arguments in calls],
+                       rounds=ROUNDS[over_stats.PARSER_REQUESTS_HTML])
+
+'''
+Measure the builders of the single pass parser, which replace the generate_* helpers, over every section of the page.
+'''
+@pytest.mark.parametrize('builder', ['comparison_stats', 'hero_stats', 'achievement_list', 'index_page'])
+@pytest.mark.parametrize('page', PAGES, ids=PAGE_IDS)
+def test_single_pass_builders(benchmark, page, builder):
+    index = over_stats.parser.index_page(page.content)
+    groups = {'comparison_stats': over_stats.COMPARISON, 'hero_stats': over_stats.STATS,
+              'achievement_list': over_stats.ACHIEVEMENTS}
+    benchmark.group = builder
+    if builder == 'index_page':
+        benchmark(over_stats.parser.index_page, page.content)
+        return
+    sections = [index.find_blocks(value, dropdown.scope) for dropdown in index.find_dropdowns(groups[builder])
+                for _, value in dropdown.options]
+    function = getattr(over_stats.parser, builder)
+    benchmark.extra_info['calls'] = len(sections)
+    benchmark(lambda: [function(blocks) for blocks in sections])
+
+'''
+Measure the throughput of handle_stat_value over every stat value of the corpus.
+'''
+@pytest.mark.parametrize('use_seconds', [False, True])
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_handle_stat_value(benchmark, use_decimal, use_seconds):
+    values = [value for page in PAGES for value in stat_values(page)]
+    handle_stat_value = over_stats.PlayerProfile.handle_stat_value
+    benchmark.group = 'handle_stat_value'
+    benchmark.extra_info['values'] = len(values)
+    benchmark(lambda: [handle_stat_value(value, use_decimal, use_seconds) for value in values])
+
+'''
+Measure the throughput of a ValueConverter for each page of the corpus, as the parsers use it.
+'''
+@pytest.mark.parametrize('use_seconds', [False, True])
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_value_converter(benchmark, use_decimal, use_seconds):
+    pages = [stat_values(page) for page in PAGES]
+
+    def convert_pages():
+        for values in pages:
+            over_stats.values.ValueConverter(use_decimal, use_seconds).convert_pairs(enumerate(values))
+
+    benchmark.group = 'handle_stat_value'
+    benchmark.extra_info['values'] = sum(len(values) for values in pages)
+    benchmark(convert_pages)
@@ -0,0 +1,58 @@
+"""
+Measure the cost of importing over_stats in a new process.
+
+Usage: python benchmarks/bench_import.py
+
+Each measurement runs in a fresh interpreter and reports the wall time of the import and the peak resident memory of
+the process. 'requests_html session' is what importing over_stats used to do before the transports were added: import
+requests_html and create an HTMLSession.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MEASURE = '''
+import resource, sys, time
+start_time = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start_time
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+CASES = [
+    ('empty interpreter', 'pass'),
+    ('import over_stats', 'import over_stats'),
+    ('over_stats + first parse', 'import over_stats, over_stats.parser\n'
+                                 'over_stats.parser.parse_career_page("<div id=\\"quickplay\\"></div>")'),
+    ('requests_html session', 'import requests_html\nrequests_html.HTMLSession()'),
+]
+
+
+def measure(code, runs):
+    """
+    Return the fastest import time in seconds and the lowest peak memory in KiB over a number of runs.
+    """
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', MEASURE.format(code=code)], cwd=ROOT, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        elapsed, rss = output.split()
+        results.append((float(elapsed), int(rss)))
+    return min(elapsed for elapsed, _ in results), min(rss for _, rss in results)
+
+
+def main(runs=5):
+    print(f'{"case":<28}{"time":>12}{"peak rss":>14}')
+    for name, code in CASES:
+        try:
+            elapsed, rss = measure(code, runs)
+        except subprocess.CalledProcessError:
+            print(f'{name:<28}{"not installed":>26}')
+            continue
+        print(f'{name:<28}{elapsed * 1000:>10.1f}ms{rss / 1024:>11.1f}MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Measure the latency of a single targeted accessor call on a profile that was just downloaded, with and without lazy
+parsing.
+
+Usage: python benchmarks/bench_lazy.py [saved_page.html]
+
+The page is served from memory so only parsing is measured. When no page is given, a generated 'every hero played'
+profile is used.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import over_stats
+import over_stats.transport
+from over_stats.tests.career_pages import HEROES, render_career_page
+
+URL = over_stats.CAREER_URL + 'pc/player-1'
+
+
+class MemoryTransport(over_stats.transport.Transport):
+    def __init__(self, page):
+        self.page = page
+
+    def get(self, url, headers=None):
+        return over_stats.transport.Response(url, 200, self.page)
+
+
+CALLS = [
+    ('comparisons(cp, Time Played)', lambda profile: profile.comparisons(over_stats.MODE_CP, 'Time Played')),
+    ('stats(qp, ALL HEROES, Game)', lambda profile: profile.stats(over_stats.MODE_QP, 'ALL HEROES', 'Game')),
+    ('achievement_types()', lambda profile: profile.achievement_types()),
+    ('raw_data', lambda profile: profile.raw_data),
+]
+
+
+def best_time(call, page, lazy, repeat):
+    best = None
+    for _ in range(repeat):
+        profile = over_stats.PlayerProfile('player#1', transport=MemoryTransport(page), lazy=lazy)
+        start_time = time.perf_counter()
+        call(profile)
+        elapsed = time.perf_counter() - start_time
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(paths, repeat=5):
+    if paths:
+        with open(paths[0], encoding='utf-8') as f:
+            page = f.read()
+    else:
+        page = render_career_page(seed=2, heroes=len(HEROES))
+    print(f'{"first call":<32}{"eager":>12}{"lazy":>12}{"speedup":>10}')
+    for name, call in CALLS:
+        eager = best_time(call, page, False, repeat)
+        lazy = best_time(call, page, True, repeat)
+        print(f'{name:<32}{eager * 1000:>10.1f}ms{lazy * 1000:>10.1f}ms{eager / lazy:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+"""
+Compare the selector based parser with the single pass parser, tokenizing the page with html.parser and with lxml.
+
+Usage: python benchmarks/bench_parser.py [saved_page.html ...]
+
+When no pages are given, generated career pages are used: a regular profile and an 'every hero played' profile.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import over_stats
+from over_stats.parser import parse_career_page
+from over_stats.tests.career_pages import HEROES, render_career_page
+
+
+def best_time(function, repeat):
+    """
+    Run function repeat times and return the fastest run in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start_time
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(paths, repeat=5):
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [('regular profile', render_career_page(seed=1)),
+                 ('every hero played', render_career_page(seed=2, heroes=len(HEROES)))]
+
+    parsers = over_stats.PARSERS[::-1]
+    print(f'{"page":<24}{"size":>10}' + ''.join(f'{parser:>16}' for parser in parsers))
+    for name, page in pages:
+        expected = parse_career_page(page, parser=over_stats.PARSER_REQUESTS_HTML)
+        times = []
+        for parser in parsers:
+            if parse_career_page(page, parser=parser) != expected:
+                raise SystemExit(f'{name}: {parser} should build the same model as the selector parser')
+            times.append(best_time(lambda: parse_career_page(page, parser=parser), repeat))
+        print(f'{name:<24}{len(page):>10}' + ''.join(f'{elapsed * 1000:>14.1f}ms' for elapsed in times))
+        print(f'{"speedup":<34}' + ''.join(f'{times[0] / elapsed:>15.1f}x' for elapsed in times))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
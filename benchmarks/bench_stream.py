@@ -0,0 +1,86 @@
+"""
+Compare parsing a career page after the whole body was received with parsing it while the chunks arrive.
+
+Usage: python benchmarks/bench_stream.py [saved_page.html]
+
+The body is delivered in 64 KiB chunks with a short delay between them to simulate the network. For each mode the
+benchmark prints the total time, the time until the first section was available and the peak memory allocated by
+Python while the page was being received and parsed. When no page is given, a generated 'every hero played' profile
+is used.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import over_stats
+import over_stats.parser
+import over_stats.stream
+import over_stats.transport
+from over_stats.tests.career_pages import HEROES, render_career_page
+
+DELAY = 0.002
+
+
+def network(body):
+    for position in range(0, len(body), over_stats.transport.CHUNK_SIZE):
+        time.sleep(DELAY)
+        yield body[position:position + over_stats.transport.CHUNK_SIZE]
+
+
+def whole_page(body, parser):
+    content = b''.join(network(body))
+    model = over_stats.parser.parse_career_page(content, parser=parser)
+    return model, time.perf_counter()
+
+
+def streamed(body, parser):
+    first_section = []
+
+    def emit(path, value):
+        if not first_section:
+            first_section.append(time.perf_counter())
+
+    model = over_stats.stream.parse_stream(network(body), parser=parser, emit=emit)
+    return model, first_section[0]
+
+
+def measure(run, body, parser):
+    start_time = time.perf_counter()
+    model, first_section = run(body, parser)
+    elapsed = time.perf_counter() - start_time
+    # Tracing allocations slows the parser down, memory is measured in a second run.
+    tracemalloc.start()
+    run(body, parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, elapsed, first_section - start_time, peak
+
+
+def main(paths):
+    if paths:
+        with open(paths[0], 'rb') as f:
+            body = f.read()
+    else:
+        body = render_career_page(seed=2, heroes=len(HEROES)).encode('utf-8')
+    print(f'page: {len(body) / 1024:.0f} KiB in {len(body) // over_stats.transport.CHUNK_SIZE + 1} chunks')
+    print(f'{"":<28}{"total":>10}{"first section":>16}{"peak memory":>14}')
+    for parser in (over_stats.PARSER_STDLIB, over_stats.PARSER_LXML):
+        models = []
+        for name, run in (('whole page', whole_page), ('streamed', streamed)):
+            try:
+                model, elapsed, first_section, peak = measure(run, body, parser)
+            except ImportError:
+                print(f'{parser} is not installed')
+                break
+            models.append(model)
+            print(f'{parser + " " + name:<28}{elapsed * 1000:>8.1f}ms{first_section * 1000:>14.1f}ms'
+                  f'{peak / 1024 / 1024:>10.2f}MiB')
+        if len(models) == 2:
+            assert models[0] == models[1]
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
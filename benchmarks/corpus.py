@@ -0,0 +1,131 @@
+"""
+Corpus of career pages used by the benchmark suite.
+
+The pages are stored gzipped in benchmarks/corpus/<source>/<platform>/<battletag>.html.gz so the same bytes are parsed
+on every commit. source is 'synthetic' or 'recorded':
+
+    python benchmarks/corpus.py generate    # write the synthetic pages listed in GENERATED
+    python benchmarks/corpus.py record      # download the live profiles listed in RECORDED
+
+The committed corpus is synthetic: its pages are rendered by over_stats/tests/career_pages.py, the generator the parser
+tests use, with the sizes of real profiles, including 'every hero played' profiles. They measure how the code scales
+with the size of a profile, not how it performs on the markup of the live site, which only recorded pages do. Recorded
+pages are picked up by the suite automatically and are named after their source, so results on both can be told apart.
+"""
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import over_stats
+import over_stats.transport
+from over_stats.tests.career_pages import HEROES, render_career_page
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+SOURCE_SYNTHETIC = 'synthetic'
+SOURCE_RECORDED = 'recorded'
+SOURCES = [SOURCE_SYNTHETIC, SOURCE_RECORDED]
+
+# (platform, battletag, arguments of render_career_page)
+GENERATED = [
+    (over_stats.PLAT_PC, 'casual-1001', dict(seed=1001, heroes=4, modes=(over_stats.MODE_QP,))),
+    (over_stats.PLAT_PC, 'regular-1002', dict(seed=1002, heroes=12)),
+    (over_stats.PLAT_PC, 'allheroes-1003', dict(seed=1003, heroes=len(HEROES))),
+    (over_stats.PLAT_PSN, 'console-player', dict(seed=2001, heroes=9)),
+    (over_stats.PLAT_PSN, 'console-allheroes', dict(seed=2002, heroes=len(HEROES))),
+    (over_stats.PLAT_XBL, 'xbox-player', dict(seed=3001, heroes=15)),
+    (over_stats.PLAT_XBL, 'xbox-competitive', dict(seed=3002, heroes=6, modes=(over_stats.MODE_CP,))),
+]
+
+# Live profiles that are downloaded by the record command.
+RECORDED = [
+    (over_stats.PLAT_PC, 'zappis#21285'),
+    (over_stats.PLAT_PSN, 'EhhFreezy'),
+    (over_stats.PLAT_PSN, 'acesarramsan'),
+    (over_stats.PLAT_XBL, 'Dethroned'),
+]
+
+
+class CorpusPage:
+    """
+    A page of the corpus. source is SOURCE_SYNTHETIC or SOURCE_RECORDED, content is the body of the response as bytes.
+    """
+
+    def __init__(self, source, platform, battletag, path):
+        self.source = source
+        self.platform = platform
+        self.battletag = battletag
+        self.path = path
+        self._content = None
+
+    @property
+    def name(self):
+        return f'{self.source}/{self.platform}/{self.battletag}'
+
+    @property
+    def url(self):
+        return over_stats.PlayerProfile(self.battletag, self.platform).url
+
+    @property
+    def content(self):
+        if self._content is None:
+            with gzip.open(self.path, 'rb') as f:
+                self._content = f.read()
+        return self._content
+
+
+def page_path(source, platform, battletag):
+    return os.path.join(CORPUS_DIR, source, platform, battletag.replace('#', '-') + '.html.gz')
+
+
+def write_page(source, platform, battletag, content):
+    path = page_path(source, platform, battletag)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # mtime is fixed so regenerating the corpus does not change the files.
+    with open(path, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+        gz.write(content)
+    return path
+
+
+def load_corpus():
+    """
+    Get the CorpusPages of every career page found in the corpus directory, sorted by name.
+    """
+    pages = []
+    for source in SOURCES:
+        for platform in over_stats.PLATFORMS:
+            directory = os.path.join(CORPUS_DIR, source, platform)
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith('.html.gz'):
+                    battletag = file_name[:-len('.html.gz')]
+                    if platform == over_stats.PLAT_PC:
+                        # PC battletags are stored as they appear in the url.
+                        name, _, number = battletag.rpartition('-')
+                        battletag = f'{name}#{number}'
+                    pages.append(CorpusPage(source, platform, battletag, os.path.join(directory, file_name)))
+    return sorted(pages, key=lambda page: page.name)
+
+
+def generate():
+    for platform, battletag, page_args in GENERATED:
+        page = render_career_page(title=battletag, **page_args)
+        print(write_page(SOURCE_SYNTHETIC, platform, battletag, page.encode('utf-8')))
+
+
+def record():
+    transport = over_stats.transport.RequestsTransport()
+    for platform, battletag in RECORDED:
+        profile = over_stats.PlayerProfile(battletag, platform, transport=transport)
+        print(write_page(SOURCE_RECORDED, platform, battletag, profile.fetch().content))
+    transport.close()
+
+
+if __name__ == '__main__':
+    commands = {'generate': generate, 'record': record}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f'Usage: python {sys.argv[0]} generate|record')
+        sys.exit(1)
+    commands[sys.argv[1]]()
@@ -0,0 +1,114 @@
+"""
+Load test of over_stats.server against a local stub of the career site.
+
+Usage: python benchmarks/load_server.py [--players 50] [--requests 5000] [--concurrency 100] [--latency 0.2]
+
+The stub serves a generated page for each player after latency seconds, the server runs on its own event loop in a
+background thread and the clients send requests for random endpoints of random players, a third of them with the
+ETag of a previous answer. The benchmark prints the throughput, the latency percentiles, the status of the answers,
+the counters of the server and the number of pages the stub had to serve: coalescing and the LRU keep it at one
+request per player.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import aiohttp
+from aiohttp import web
+
+import over_stats
+import over_stats.server
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+ENDPOINTS = ['/modes', '/comparisons/quickplay', '/comparisons/competitive/Time Played', '/stats/competitive',
+             '/stats/quickplay/ALL HEROES/Combat', '/stats/competitive/ALL HEROES/Combat/Deaths', '/achievements']
+
+
+def start_server(base_url):
+    """
+    Run the server in a background thread and return its address.
+    """
+    started = threading.Event()
+    address = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(over_stats.server.create_app(base_url=base_url, concurrency=50))
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        address.append(f'http://127.0.0.1:{runner.addresses[0][1]}')
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return address[0]
+
+
+async def drive(server_url, players, total, concurrency):
+    latencies = []
+    statuses = {}
+    etags = {}
+    queue = iter(range(total))
+
+    async def client(session):
+        for _ in queue:
+            url = f'{server_url}/pc/player-{random.randrange(players)}{random.choice(ENDPOINTS)}'
+            headers = {}
+            if url in etags and random.random() < 1 / 3:
+                headers['If-None-Match'] = etags[url]
+            start = time.perf_counter()
+            async with session.get(url, headers=headers) as response:
+                await response.read()
+                if 'ETag' in response.headers:
+                    etags[url] = response.headers['ETag']
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        async with session.get(server_url + '/status') as response:
+            counters = await response.json()
+    return elapsed, sorted(latencies), statuses, counters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds the stub waits before each page')
+    options = parser.parse_args()
+
+    pages = {f'pc/player-{number}': render_career_page(seed=number, heroes=8) for number in range(options.players)}
+    with StubServer(pages, latency=options.latency) as upstream:
+        server_url = start_server(upstream.base_url)
+        elapsed, latencies, statuses, counters = asyncio.run(
+            drive(server_url, options.players, options.requests, options.concurrency))
+        upstream_requests = len(upstream.requests)
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    print(f'{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} requests/s')
+    print(f'latency ms: p50 {percentile(0.5):.1f} p90 {percentile(0.9):.1f} p99 {percentile(0.99):.1f} '
+          f'max {latencies[-1] * 1000:.1f}')
+    print('statuses:', ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
+    print('server:', ', '.join(f'{name}: {value}' for name, value in counters.items()))
+    print(f'pages served by the stub: {upstream_requests}')
+
+
+if __name__ == '__main__':
+    main()
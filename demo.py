@@ -10,7 +10,8 @@ player_data = over_stats.PlayerProfile('ZanyDruid#13868')
 
 # Ther is a bug in the boto3 library that causes it not to be able to handle
 # floats. To get around this issue there is flag that you can use to wrap floats
-# into a Decimal. Be careful that Decimals cannot be dumped to json.
+# into a Decimal. Be careful that Decimals cannot be dumped to json, use
+# player_data.dumps() and over_stats.PlayerProfile.loads() to store them instead.
 # player_data = over_stats.PlayerProfile('acesarramsan', over_stats.PLAT_PSN, True)
 
 # Download and parse the profile's data
@@ -1,8 +1,16 @@
-from decimal import *
+import threading
 import urllib.parse
-import requests_html
 
+# Only the modules needed to download and parse a profile are imported here, the others (binary, index, refresh,
+# stream, cache, ...) are imported by the methods that use them.
 import over_stats.errors
+import over_stats.flight
+import over_stats.lazy
+import over_stats.metrics
+import over_stats.parser
+import over_stats.transport
+import over_stats.values
+from over_stats.profileset import ProfileSet
 
 PLAT_PC = "pc"
 PLAT_XBL = "xbl"
@@ -17,34 +25,93 @@ MODES = 'modes'
 ACHIEVEMENTS = 'achievements'
 ACH_EARNED = 'earned'
 ACH_MISSING = 'missing'
-
-session = requests_html.HTMLSession()
+PARSER_LXML = 'lxml'
+PARSER_STDLIB = 'html.parser'
+PARSER_REQUESTS_HTML = 'requests_html'
+PARSERS = [PARSER_LXML, PARSER_STDLIB, PARSER_REQUESTS_HTML]
+CAREER_URL = 'https://playoverwatch.com/en-us/career/'
+
+
+def url_battletag(battletag, platform=PLAT_PC):
+    """
+    Get the battletag as it appears in the url of a career page. The '#' of a pc battletag is written as a '-', so
+    'zappis#21285' and 'zappis-21285' are the same profile.
+    """
+    if platform == PLAT_PC:
+        try:
+            return urllib.parse.quote(battletag.replace('#', '-'))
+        except AttributeError:
+            raise over_stats.errors.InvalidBattletag(f'battletag="{battletag}" is invalid')
+    return urllib.parse.quote(battletag)
 
 
 class PlayerProfile:
-    def __init__(self, battletag=None, platform=PLAT_PC, use_decimal=False):
-        """Create a new player profile."""
-
-        if platform == PLAT_PC:
-            try:
-                self._battletag = urllib.parse.quote(battletag.replace('#', '-'))
-            except AttributeError:
-                raise over_stats.errors.InvalidBattletag(f'battletag="{battletag}" is invalid')
-        elif platform not in PLATFORMS:
-                raise over_stats.errors.InvalidArgument(f'platform="{platform}" is invalid')
-        else:
-            self._battletag = urllib.parse.quote(battletag)
+    def __init__(self, battletag=None, platform=PLAT_PC, use_decimal=False, parser=None, transport=None,
+                 base_url=CAREER_URL, cache=None, lazy=False, stream=False, metrics=None, use_seconds=False):
+        """
+        Create a new player profile.
+        parser is one of PARSERS, by default lxml is used if it is installed and html.parser otherwise.
+        transport is an over_stats.transport.Transport, by default a transport shared by all profiles is used.
+        base_url is the address of the career pages, the profile is downloaded from base_url + platform/battletag.
+        cache is an over_stats.cache.ProfileCache used to store the parsed profile between processes.
+        If lazy is true, each section of the page is parsed the first time it is accessed. raw_data still returns the
+        whole profile. It cannot be combined with a cache, which stores whole profiles.
+        If stream is true, the page is parsed while it is being downloaded instead of after the whole body arrived.
+        Neither lazy nor stream can be combined with each other or with the requests_html parser, which needs the
+        whole page. Unsupported combinations raise InvalidArgument.
+        metrics is an over_stats.metrics.Sink that receives the time spent in each phase of the load, by default the
+        sink installed with over_stats.metrics.set_default_sink() is used.
+        If use_seconds is true, durations such as '01:23:45' or '12 hours' are converted into a number of seconds
+        instead of being kept as they appear on the page.
+        """
+
+        if platform not in PLATFORMS:
+            raise over_stats.errors.InvalidArgument(f'platform="{platform}" is invalid')
+        self._battletag = url_battletag(battletag, platform)
+        if parser is not None and parser not in PARSERS:
+            raise over_stats.errors.InvalidArgument(f'parser="{parser}" is invalid')
+        if lazy and stream:
+            raise over_stats.errors.InvalidArgument('lazy and stream cannot be combined')
+        if (lazy or stream) and parser == PARSER_REQUESTS_HTML:
+            raise over_stats.errors.InvalidArgument(f'parser="{parser}" cannot be combined with lazy or stream')
+        if lazy and cache is not None:
+            raise over_stats.errors.InvalidArgument('lazy cannot be combined with a cache')
+        self.battletag = battletag
         self._platform = platform
         self._model = None
+        self._r = None
+        self._fingerprints = None
+        self._index = None
+        # Guards _flight and the swap of _model, _r and _fingerprints, it is never held during a download.
+        self._lock = threading.Lock()
+        self._flight = None
+        # Counts the swaps, a load or refresh only stores its model if no other one was stored since it started.
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
         self._use_decimal = use_decimal
-        self.url = 'https://playoverwatch.com/en-us/career/' + platform + '/' + self._battletag
+        self._use_seconds = use_seconds
+        self._parser = parser
+        self._transport = transport
+        self._cache = cache
+        self._lazy = lazy
+        self._stream = stream
+        self._metrics = metrics
+        self.url = base_url + platform + '/' + self._battletag
 
     # Internal methods
     def get_html_for_mode(self, mode):
         """
-        Used to retrieve the html element that contains all the data for competitive or quickplay.
+        Used to retrieve the requests_html element that contains all the data for competitive or quickplay. The
+        element is built from the downloaded page, which needs requests_html, and is not available for profiles that
+        were streamed or read from a cache.
         """
-        html = self._r.html.find(f'div[id="{mode}"]')
+        import requests_html
+        self.load_data_if_needed()
+        response = self._r
+        if response is None or response.content is None:
+            raise over_stats.errors.DataNotLoaded(f'The page of {self.url} was not kept, it cannot be searched')
+        html = requests_html.HTML(html=over_stats.parser.decode_page(response.content, response.encoding))
+        html = html.find(f'div[id="{mode}"]')
         if len(html) == 0:
             raise over_stats.errors.PlayerNotFound(f'Mode "{mode}" was not found. There is no data for this player')
         if len(html) != 1:
@@ -60,56 +127,115 @@ class PlayerProfile:
 
         """
         if self._model is None:
-            self._model = {
-                    MODES: {},
-                    ACHIEVEMENTS: {}
-                    }
-            self._r = session.get(self.url)
-            # We are assuming that OW will not have any other game modes other than competitive and quickplay. 
-            for mode in MODE_LIST:
-                # now get the html content that belongs to the current game mode
-                html_mode = None
-                try:
-                    html_mode = self.get_html_for_mode(mode)
-                except over_stats.errors.PlayerNotFound:
-                    # If the player has not played in a mode, then the html element will be missing. 
-                    # We can safely skip it in this case.
-                    continue
-
-                mode_dict = {}
-
-                # now retrieve the dictionary for all the different comparisons available, they will be something
-                # like 'Games Won', 'Time Played', 'Weapon Accuracy', etc
-                comparison_dict = {}
-                comparisons = self.get_dict_from_dropdown(COMPARISON, html_mode)
-                for comp_name, comp_value in comparisons.items():
-                    comparison_stats = self.generate_comparison_stats(html_mode, comp_value, self._use_decimal)
-                    comparison_dict[comp_name] = comparison_stats
-                mode_dict[COMPARISON] = comparison_dict
-
-                # Now we are going to parse the career stat section
-                hero_stat_dict = {}
-                # Generate the dictionary for the hero stats
-                heroes = self.get_dict_from_dropdown(STATS, html_mode)
-                # Now generate a dictionary using the hero name as the dictionary key
-                for heroe_name, heroe_value in heroes.items():
-                    hero_stats = self.generate_hero_stats(html_mode, heroe_value, self._use_decimal)
-                    hero_stat_dict[heroe_name] = hero_stats
-                mode_dict[STATS] = hero_stat_dict
-
-                self._model[MODES][mode] = mode_dict
-
-            achievements_dict = {}
-            # Now extract the achievements
-            achievements = self.get_dict_from_dropdown(ACHIEVEMENTS, self._r.html)
-            # The achievement_type will be something like 'Offense', 'Defense', 'Tank', etc
-            for achievement_type, achievement_type_value in achievements.items():
-                achievement_dict = self.generate_achievement_list(self._r.html, achievement_type_value)
-                achievements_dict[achievement_type] = achievement_dict
-            self._model[ACHIEVEMENTS] = achievements_dict
+            self.load_model()
+
+    def load_model(self, force=False):
+        """
+        Download and parse the profile, unless it is already loaded and force is false. Only one thread loads a
+        profile at a time: threads that need it while it is being loaded wait for that load and get its result or its
+        error. The model is only stored once it is complete, until then the previous model, if any, is still used. It
+        is not stored if a refresh stored a newer model while it was being loaded.
+        """
+        with self._lock:
+            if self._model is not None and not force:
+                return
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = over_stats.flight.Flight()
+                generation = self._generation
+        if not leader:
+            flight.wait()
+            return
+
+        response = None
+        try:
+            with over_stats.metrics.timer(self.metrics, over_stats.metrics.LOAD):
+                if self._cache is not None:
+                    model = self._cache.load(self, force)
+                else:
+                    response = self.fetch()
+                    model = self.parse(response, self._lazy)
+        except BaseException as e:
+            # Even a KeyboardInterrupt has to reach the waiting threads, or they would wait forever.
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None and self._generation == generation:
+                    self.swap(model, response)
+                self._flight = None
+            flight.finish()
+
+    def swap(self, model, response=None, fingerprints=None):
+        """
+        Replace the model, and the response and section fingerprints it was built from, at once. Callers hold _lock.
+        """
+        self._generation += 1
+        if response is not None:
+            self._r = response
+        self._fingerprints = fingerprints
+        self._model = model
+
+    @property
+    def metrics(self):
+        """
+        Get the over_stats.metrics.Sink of this profile, or None if nothing is measured.
+        """
+        if self._metrics is not None:
+            return self._metrics
+        return over_stats.metrics.default_sink()
+
+    def fetch(self, headers=None, stream=None):
+        """
+        Download the career page and return the over_stats.transport.Response. headers are sent with the request,
+        they can make the request conditional in which case the response can be a 304. stream overrides the stream
+        option of the profile.
+        """
+        transport = self._transport or over_stats.transport.default_transport()
+        metrics = self.metrics
+        if stream is None:
+            stream = self._stream
+        with over_stats.metrics.timer(metrics, over_stats.metrics.FETCH):
+            if stream:
+                response = transport.stream(self.url, headers)
+            else:
+                response = transport.get(self.url, headers)
+        if metrics is not None and response.content is not None:
+            metrics.count(over_stats.metrics.BYTES, len(response.content))
+        self.check_status(response.status)
+        return response
+
+    def parse(self, response, lazy=False):
+        """
+        Build the model from the Response. The page is walked only once, the parser keeps an index of every element
+        that holds data and builds the model from it. If lazy is true, an over_stats.lazy.LazySection is returned
+        instead and sections are parsed when they are accessed. Streamed responses are parsed while their body is read.
+        """
+        metrics = self.metrics
+        if response.content is None:
+            from over_stats.stream import parse_stream
+            with over_stats.metrics.timer(metrics, over_stats.metrics.STREAM):
+                return parse_stream(response.iter_content(), self._use_decimal, self._parser, response.encoding,
+                                    metrics=metrics, use_seconds=self._use_seconds)
+        if lazy:
+            with over_stats.metrics.timer(metrics, over_stats.metrics.INDEX):
+                return over_stats.lazy.lazy_model(response.content, self._use_decimal, self._parser,
+                                                  self._use_seconds)
+        return over_stats.parser.parse_career_page(response.content, self._use_decimal, self._parser,
+                                                   response.encoding, metrics, self._use_seconds)
+
+    def check_status(self, status):
+        """
+        Raise the appropriate exception if the career page could not be downloaded.
+        """
+        if status == 404:
+            raise over_stats.errors.PlayerNotFound(f'There is no profile at {self.url}')
+        if status != 200 and status != 304:
+            raise over_stats.errors.UnexpectedBehaviour(f'Requesting {self.url} returned HTTP {status}')
 
     @staticmethod
-    def generate_comparison_stats(html, comparison_value, use_decimal=False):
+    def generate_comparison_stats(html, comparison_value, use_decimal=False, use_seconds=False):
         """
         Search the html element for divs containing the comparison stats.
         The result will be a dictionary that uses a hero as it's key and the stat value as the value
@@ -127,11 +253,11 @@ class PlayerProfile:
         it = iter(stat_data)
         for hero_name in it:
             stat_value = next(it)
-            stat_dict[hero_name] = PlayerProfile.handle_stat_value(stat_value, use_decimal)
+            stat_dict[hero_name] = PlayerProfile.handle_stat_value(stat_value, use_decimal, use_seconds)
         return stat_dict
 
     @staticmethod
-    def generate_hero_stats(html, hero_value, use_decimal=False):
+    def generate_hero_stats(html, hero_value, use_decimal=False, use_seconds=False):
         """
         Search the html element for all divs containing the hero stat card. Each card will contain a list of
         stats. The result will be a dictionary of stat categories names that link to a dictionary of stat names
@@ -156,7 +282,7 @@ class PlayerProfile:
             it = iter(card_content)
             for stat_name in it:
                 stat_value = next(it)
-                stat_dict[stat_name] = PlayerProfile.handle_stat_value(stat_value, use_decimal)
+                stat_dict[stat_name] = PlayerProfile.handle_stat_value(stat_value, use_decimal, use_seconds)
             card_dict[card_title] = stat_dict
         return card_dict
 
@@ -188,26 +314,13 @@ class PlayerProfile:
         return stat_dict
 
     @staticmethod
-    def handle_stat_value(stat_value, use_decimal=False):
+    def handle_stat_value(stat_value, use_decimal=False, use_seconds=False):
         """
         The values retrieved from the html is a string that represents different types of value types.
-        This method will handle converting those strings into their appropriate value
+        This method will handle converting those strings into their appropriate value. If use_seconds is true,
+        durations are converted into seconds. See over_stats.values.convert_stat_value().
         """
-        if '--' == stat_value or ':' in stat_value:
-            return stat_value
-        elif '%' in stat_value:
-            if use_decimal:
-                return Decimal(str(float(stat_value.replace("%", "")) / 100.0))
-            else:
-                return float(stat_value.replace("%", "")) / 100.0
-        elif ' ' in stat_value:
-            return stat_value.split(" ")
-        else:
-            stat_value = stat_value.replace(',', '')
-            if '.' in stat_value:
-                return float(stat_value)
-            else:
-                return int(stat_value)
+        return over_stats.values.convert_stat_value(stat_value, use_decimal, use_seconds)
 
     @staticmethod
     def get_dict_from_dropdown(select_id, page_section):
@@ -237,6 +350,19 @@ class PlayerProfile:
         Return the content of _model. If _model is still empty then a load_data_if_needed() will ensure to make a request 
         to populate it.
         """
+        model = self._data
+        materialized = over_stats.lazy.materialize(model)
+        if materialized is not model:
+            with self._lock:
+                if self._model is model:
+                    self._model = materialized
+        return materialized
+
+    @property
+    def _data(self):
+        """
+        Return _model without materializing the sections that have not been parsed yet.
+        """
         self.load_data_if_needed()
         return self._model
 
@@ -244,27 +370,34 @@ class PlayerProfile:
         """
         If _model is not populated or if force is tue, we will try to populate _model. Otherwise this method will be a noop.
         """
-        if force:
-            self._model = {}
-        self.load_data_if_needed()
+        self.load_model(force)
+
+    def refresh(self):
+        """
+        Download the profile again and parse only the sections that changed since it was loaded. Returns an
+        over_stats.refresh.Delta with every stat that was added, removed or changed. See over_stats.refresh.
+        """
+        import over_stats.refresh
+        with self._refresh_lock:
+            return over_stats.refresh.refresh(self)
     
     def modes(self):
         """
         Get a list of available game modes
         """
-        return list(self.raw_data[MODES].keys())
+        return list(self._data[MODES].keys())
 
     def comparison_types(self, mode):
         """
         Get a list of comparison types available for this game mode
         """
-        return list(self.raw_data[MODES][mode][COMPARISON].keys())
+        return list(self._data[MODES][mode][COMPARISON].keys())
 
     def comparison_heroes(self, mode, comparison_type):
         """
         Get a list of available heroes for this combination of comparison type and game mode
         """
-        return list(self.raw_data[MODES][mode][COMPARISON][comparison_type].keys())
+        return list(self._data[MODES][mode][COMPARISON][comparison_type].keys())
 
     def comparisons(self, mode, comparison_type=None, comparison_hero=None):
         """
@@ -276,11 +409,11 @@ class PlayerProfile:
             raise over_stats.errors.InvalidArgument(f'mode="{mode}" is invalid')
         try:
             if comparison_type is None and comparison_hero is None:
-                return self.raw_data[MODES][mode][COMPARISON]
+                return over_stats.lazy.materialize(self._data[MODES][mode][COMPARISON])
             elif comparison_type is not None and comparison_hero is None:
-                return self.raw_data[MODES][mode][COMPARISON][comparison_type]
+                return self._data[MODES][mode][COMPARISON][comparison_type]
             elif comparison_type is not None and comparison_hero is not None:
-                return self.raw_data[MODES][mode][COMPARISON][comparison_type][comparison_hero]
+                return self._data[MODES][mode][COMPARISON][comparison_type][comparison_hero]
             else:
                 raise over_stats.errors.InvalidArgument(f'Combination of comparison_type="{comparison_type}", comparison_hero="{comparison_hero}" is not valid')
         except KeyError:
@@ -290,19 +423,19 @@ class PlayerProfile:
         """
         Get a list of available heroes to get stats from for the provided game mode.
         """
-        return list(self.raw_data[MODES][mode][STATS].keys())
+        return list(self._data[MODES][mode][STATS].keys())
 
     def stat_categories(self, mode, hero):
         """
         Get a list of available stat categories for the requested hero
         """
-        return list(self.raw_data[MODES][mode][STATS][hero].keys())
+        return list(self._data[MODES][mode][STATS][hero].keys())
 
     def stat_names(self, mode, hero, category):
         """
         Get a list of available stat names for the requested game mode, hero name and stat category
         """
-        return list(self.raw_data[MODES][mode][STATS][hero][category].keys())
+        return list(self._data[MODES][mode][STATS][hero][category].keys())
 
     def stats(self, mode, hero=None, category=None, stat_name=None):
         """
@@ -314,13 +447,13 @@ class PlayerProfile:
             raise over_stats.errors.InvalidArgument(f'mode="{mode}" is invalid')
         try:
             if hero is None and category is None and stat_name is None:
-                return self.raw_data[MODES][mode][STATS]
+                return over_stats.lazy.materialize(self._data[MODES][mode][STATS])
             elif hero is not None and category is None and stat_name is None:
-                return self.raw_data[MODES][mode][STATS][hero]
+                return self._data[MODES][mode][STATS][hero]
             elif hero is not None and category is not None and stat_name is None:
-                return self.raw_data[MODES][mode][STATS][hero][category]
+                return self._data[MODES][mode][STATS][hero][category]
             elif hero is not None and category is not None and stat_name is not None:
-                return self.raw_data[MODES][mode][STATS][hero][category][stat_name]
+                return self._data[MODES][mode][STATS][hero][category][stat_name]
             else:
                 raise over_stats.errors.InvalidArgument(f'Combination of hero="{hero}", category="{category}" and stat_name="{stat_name}" is not valid')
         except KeyError:
@@ -330,7 +463,7 @@ class PlayerProfile:
         """
         Get a list of available achievement types.
         """
-        return list(self.raw_data[ACHIEVEMENTS].keys())
+        return list(self._data[ACHIEVEMENTS].keys())
 
     def achievements(self, achievement_type=None, list_name=None):
         """
@@ -340,10 +473,87 @@ class PlayerProfile:
         """
         try:
             if achievement_type is None:
-                return self.raw_data[ACHIEVEMENTS]
+                return over_stats.lazy.materialize(self._data[ACHIEVEMENTS])
             elif list_name is None:
-                return self.raw_data[ACHIEVEMENTS][achievement_type]
+                return self._data[ACHIEVEMENTS][achievement_type]
             else:
-                return self.raw_data[ACHIEVEMENTS][achievement_type][list_name]
+                return self._data[ACHIEVEMENTS][achievement_type][list_name]
         except KeyError:
             raise over_stats.errors.DataNotFound("Data not available")
+
+    def index(self):
+        """
+        Get the over_stats.index.ProfileIndex of the data of this profile. It is built the first time it is needed and
+        again after the profile is loaded or refreshed.
+        """
+        import over_stats.index
+        model = self.raw_data
+        index = self._index
+        if index is None or index.model is not model:
+            index = self._index = over_stats.index.ProfileIndex(model)
+        return index
+
+    def stat_locations(self, mode, stat_name):
+        """
+        Get every (hero, category, value) that has stat_name in the game mode, for example the value of 'Solo Kills'
+        for each hero that has it.
+        """
+        if mode not in MODE_LIST:
+            raise over_stats.errors.InvalidArgument(f'mode="{mode}" is invalid')
+        return self.index().stat_locations(mode, stat_name)
+
+    def hero_comparisons(self, mode, hero):
+        """
+        Get the value of the hero in every comparison type of the game mode, as a dictionary keyed by comparison type.
+        """
+        if mode not in MODE_LIST:
+            raise over_stats.errors.InvalidArgument(f'mode="{mode}" is invalid')
+        return self.index().hero_comparisons(mode, hero)
+
+    def achievement(self, name):
+        """
+        Get the (achievement_type, list_name) of an achievement, list_name is over_stats.ACH_EARNED or
+        over_stats.ACH_MISSING.
+        """
+        return self.index().achievement(name)
+
+    def compact(self, names=None):
+        """
+        Get the numeric stats of this profile as an over_stats.columnar.CompactProfile. names is the NameTable used to
+        encode hero, category and stat names, by default a table shared by every profile is used.
+        """
+        return over_stats.columnar.CompactProfile.from_model(self.raw_data, names)
+
+    def to_arrays(self, names=None):
+        """
+        Get the numeric stats of this profile as a dictionary of NumPy arrays, see CompactProfile.to_arrays().
+        """
+        return self.compact(names).to_arrays()
+
+    def to_frame(self, names=None):
+        """
+        Get the numeric stats of this profile as a pandas DataFrame, see CompactProfile.to_frame().
+        """
+        return self.compact(names).to_frame()
+
+    def dumps(self):
+        """
+        Encode this profile and its data in the compact binary format of over_stats.binary.
+        """
+        import over_stats.binary
+        return over_stats.binary.dumps_model(self.raw_data, self._use_decimal, self._use_seconds, self.battletag,
+                                             self._platform, self.url)
+
+    @classmethod
+    def loads(cls, data, **options):
+        """
+        Rebuild a profile from the bytes returned by dumps() without downloading anything. options are passed to the
+        constructor, for example a transport used if the profile is loaded again with load_data(force=True).
+        """
+        import over_stats.binary
+        decoded = over_stats.binary.loads_model(data)
+        profile = cls(decoded.battletag, decoded.platform, decoded.use_decimal, use_seconds=decoded.use_seconds,
+                      **options)
+        profile.url = decoded.url
+        profile._model = decoded.model
+        return profile
@@ -0,0 +1,5 @@
+import sys
+
+import over_stats.cli
+
+sys.exit(over_stats.cli.main())
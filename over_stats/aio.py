@@ -0,0 +1,162 @@
+"""
+Asynchronous client to download many profiles concurrently. It needs aiohttp, install it with:
+
+    pip install over_stats[aio]
+
+Profiles that are loaded together share one aiohttp session, its connection pool is sized by the concurrency limit.
+Parsing happens in an executor so the event loop is never blocked by html work:
+
+    profiles = await over_stats.aio.fetch_many(['zappis#21285', 'ZanyDruid#13868'], concurrency=20)
+"""
+import asyncio
+import functools
+
+import aiohttp
+
+import over_stats
+import over_stats.batch
+import over_stats.errors
+import over_stats.metrics
+import over_stats.parser
+import over_stats.refresh
+import over_stats.transport
+
+DEFAULT_CONCURRENCY = 10
+DEFAULT_TIMEOUT = 30
+
+
+def create_session(concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """
+    Create an aiohttp session that keeps up to concurrency connections alive. timeout is the total number of
+    seconds allowed for each request.
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+class AsyncPlayerProfile(over_stats.PlayerProfile):
+    """
+    A PlayerProfile that is loaded with 'await profile.load_data()' and refreshed with 'await profile.refresh()'.
+    Once it is loaded all the accessors of PlayerProfile can be used. Calling them before the profile is loaded raises
+    DataNotLoaded.
+    """
+
+    def __init__(self, battletag=None, platform=over_stats.PLAT_PC, use_decimal=False, parser=None, session=None,
+                 executor=None, base_url=over_stats.CAREER_URL, metrics=None, use_seconds=False):
+        """
+        Create a new player profile.
+        session is the aiohttp session used to download the profile, if it is None a session is created for each load.
+        executor is the concurrent.futures executor used to parse the page, by default the loop's executor is used.
+        metrics is an over_stats.metrics.Sink, the measurements taken while the page is parsed in the executor are
+        sent to it once the page is parsed.
+        If use_seconds is true, durations are converted into a number of seconds, like in PlayerProfile.
+        """
+        super().__init__(battletag, platform, use_decimal, parser, base_url=base_url, metrics=metrics,
+                         use_seconds=use_seconds)
+        self._session = session
+        self._executor = executor
+        # Created by the first refresh(), so it belongs to the running loop.
+        self._refreshing = None
+
+    def load_data_if_needed(self):
+        if self._model is None:
+            raise over_stats.errors.DataNotLoaded(f'{self.url} has not been loaded, use "await load_data()" first')
+
+    def load_model(self, force=False):
+        raise over_stats.errors.InvalidArgument(f'{self.url} is loaded asynchronously, use "await load_data()"')
+
+    async def load_data(self, force=False):
+        """
+        Download and parse the profile if it is not loaded yet or if force is true.
+        """
+        if self._model is not None and not force:
+            return
+        generation = self._generation
+        metrics = self.metrics
+        with over_stats.metrics.timer(metrics, over_stats.metrics.LOAD):
+            response = await self.fetch_page()
+            self.check_status(response.status)
+            # In a coroutine get_event_loop() returns the running loop, get_running_loop() needs Python 3.7.
+            loop = asyncio.get_event_loop()
+            if metrics is None:
+                parse = functools.partial(over_stats.parser.parse_career_page, response.content, self._use_decimal,
+                                          self._parser, response.encoding, use_seconds=self._use_seconds)
+                model = await loop.run_in_executor(self._executor, parse)
+            else:
+                # The executor can be a process pool: the sink stays here, the worker records the measurements and
+                # they are replayed into the sink, like over_stats.batch does.
+                parse = functools.partial(over_stats.batch.parse_measured, response.content, self._use_decimal,
+                                          self._parser, response.encoding, self._use_seconds)
+                model, events = await loop.run_in_executor(self._executor, parse)
+                over_stats.metrics.replay(events, metrics)
+        with self._lock:
+            # A refresh that finished during the load has the newer model.
+            if self._generation == generation:
+                self.swap(model, response)
+
+    async def refresh(self):
+        """
+        Download the profile again and parse only the sections that changed, like PlayerProfile.refresh(). Returns an
+        over_stats.refresh.Delta. The sections are parsed in the loop's executor, the executor of the profile can be a
+        process pool which could not update the profile.
+        """
+        if self._refreshing is None:
+            self._refreshing = asyncio.Lock()
+        async with self._refreshing:
+            with over_stats.metrics.timer(self.metrics, over_stats.metrics.REFRESH):
+                generation = self._generation
+                old_model, old_fingerprints, headers = over_stats.refresh.previous_state(self)
+                response = await self.fetch_page(headers)
+                self.check_status(response.status)
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, over_stats.refresh.update, self, response, old_model,
+                                                  old_fingerprints, generation)
+
+    async def fetch_page(self, headers=None):
+        """
+        Download the career page with the session of the profile, or a new session if it has none, and return the
+        over_stats.transport.Response. headers are sent with the request.
+        """
+        metrics = self.metrics
+        with over_stats.metrics.timer(metrics, over_stats.metrics.FETCH):
+            if self._session is None:
+                async with create_session(1) as session:
+                    response = await self.get_page(session, headers)
+            else:
+                response = await self.get_page(self._session, headers)
+        if metrics is not None:
+            metrics.count(over_stats.metrics.BYTES, len(response.content))
+        return response
+
+    async def get_page(self, session, headers=None):
+        async with session.get(self.url, headers=headers) as response:
+            return over_stats.transport.Response(self.url, response.status, await response.read(),
+                                                 dict(response.headers))
+
+
+async def fetch_many(battletags, platform=over_stats.PLAT_PC, use_decimal=False, concurrency=DEFAULT_CONCURRENCY,
+                     parser=None, executor=None, session=None, base_url=over_stats.CAREER_URL,
+                     return_exceptions=False, metrics=None, use_seconds=False):
+    """
+    Load a profile for each battletag, with at most concurrency profiles being downloaded at the same time. The
+    result is a list of loaded AsyncPlayerProfiles in the same order as battletags. If return_exceptions is true, the
+    exception raised while loading a profile is placed in the list instead of being raised. metrics and use_seconds
+    are given to every profile.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def load(battletag, shared_session):
+        profile = AsyncPlayerProfile(battletag, platform, use_decimal, parser, shared_session, executor, base_url,
+                                     metrics, use_seconds)
+        async with limit:
+            await profile.load_data()
+        return profile
+
+    async def load_all(shared_session):
+        return await asyncio.gather(*[load(battletag, shared_session) for battletag in battletags],
+                                    return_exceptions=return_exceptions)
+
+    if session is not None:
+        return await load_all(session)
+    async with create_session(concurrency) as session:
+        return await load_all(session)
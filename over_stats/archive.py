@@ -0,0 +1,392 @@
+"""
+Append-only archive of profile snapshots that is read through mmap.
+
+Each snapshot holds the numeric stats of a profile on a date, the same rows as an over_stats.columnar.CompactProfile,
+sorted by (mode, hero, category, stat_name) so a single stat is found with a binary search over the mapped file. The
+archive keeps an index of the snapshots keyed by (platform, battletag, date), so answering a query never deserializes
+a whole profile:
+
+    with over_stats.archive.ProfileArchive('history.ovsa', 'a') as archive:
+        archive.append(player_data, datetime.date.today())
+
+    with over_stats.archive.ProfileArchive('history.ovsa') as archive:
+        archive.stats(over_stats.PLAT_PC, 'zappis#21285', date, over_stats.MODE_CP, 'Reaper', 'Combat', 'Deaths')
+        for platform, battletag, date, value in archive.series(over_stats.MODE_CP, 'Reaper', 'Combat', 'Deaths'):
+            ...
+
+The file is a header followed by segments, which are only ever appended:
+
+    STRINGS    names added to one of the two string tables, hero, category and stat names or platforms and battletags
+    RECORD     a snapshot: its platform, battletag and date followed by the sorted keys, the values and their kinds
+    INDEX      the records and STRINGS segments written since the previous INDEX, and the offset of that INDEX
+
+An INDEX is written when the archive is flushed or closed and the file ends with its offset, so opening an archive
+only reads the chain of INDEX segments and the string tables. If the archive was not closed, the segments are scanned
+instead. Arrays are stored in the byte order of the machine that wrote them.
+"""
+import array
+import bisect
+import datetime
+import mmap
+import os
+import struct
+import sys
+
+import over_stats
+import over_stats.columnar
+import over_stats.errors
+
+MAGIC = b'OVSA'
+INDEX_MAGIC = b'OVSI'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBB2x8x')
+SEGMENT = struct.Struct('<B3xI')
+STRINGS_HEADER = struct.Struct('<B3xI')
+RECORD_HEADER = struct.Struct('<4I')
+INDEX_HEADER = struct.Struct('<QII')
+TRAILER = struct.Struct('<Q4s4x')
+
+STRINGS = 1
+RECORD = 2
+INDEX = 3
+
+NAMES_TABLE = 0
+PLAYERS_TABLE = 1
+
+# A key packs the mode and the codes of the hero, category and stat name into 64 bits.
+CODE_BITS = 20
+CODE_MASK = (1 << CODE_BITS) - 1
+
+
+def make_key(mode, hero, category, stat):
+    return mode << 3 * CODE_BITS | hero << 2 * CODE_BITS | category << CODE_BITS | stat
+
+
+def split_key(key):
+    return key >> 3 * CODE_BITS, key >> 2 * CODE_BITS & CODE_MASK, key >> CODE_BITS & CODE_MASK, key & CODE_MASK
+
+
+def padding(size):
+    return -size % 8
+
+
+class ProfileArchive:
+    """
+    An archive file. mode is 'r' to read an existing archive or 'a' to append to it, creating it if needed.
+    """
+
+    def __init__(self, path, mode='r'):
+        if mode not in ('r', 'a'):
+            raise over_stats.errors.InvalidArgument(f'mode="{mode}" is invalid')
+        self.path = path
+        self.mode = mode
+        self.names = over_stats.columnar.NameTable()
+        self.players = over_stats.columnar.NameTable()
+        # Maps (platform, battletag, date) to the offset of its RECORD.
+        self._index = {}
+        self._new_records = []
+        self._new_strings = []
+        self._last_index = 0
+        self._map = None
+        self._mapped_size = 0
+        if mode == 'a':
+            self._file = open(path, 'a+b')
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell() == 0:
+                self._file.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == 'big'))
+                self._file.flush()
+        else:
+            self._file = open(path, 'rb')
+        try:
+            self._load()
+        except Exception:
+            self.close()
+            raise
+        # Names read from the file are already stored, only the ones added from now on are written.
+        self._stored = {NAMES_TABLE: len(self.names), PLAYERS_TABLE: len(self.players)}
+
+    # Reading
+
+    def _mapped(self, end):
+        """
+        Get the mmap of the file, mapping it again if it does not reach end yet.
+        """
+        if self._map is None or end > self._mapped_size:
+            if self._map is not None:
+                self._map.close()
+            if self.mode == 'a':
+                self._file.flush()
+            self._mapped_size = os.fstat(self._file.fileno()).st_size
+            if end > self._mapped_size:
+                raise over_stats.errors.InvalidFormat('The archive is truncated')
+            self._map = mmap.mmap(self._file.fileno(), self._mapped_size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _load(self):
+        size = os.fstat(self._file.fileno()).st_size
+        data = self._mapped(HEADER.size)
+        magic, version, big_endian = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise over_stats.errors.InvalidFormat(f'{self.path} is not a profile archive')
+        if version != VERSION:
+            raise over_stats.errors.InvalidFormat(f'Version {version} of the archive format is not supported')
+        if bool(big_endian) != (sys.byteorder == 'big'):
+            raise over_stats.errors.InvalidFormat('The archive was written on a machine with a different byte order')
+        if size == HEADER.size:
+            return
+        last_index = None
+        if size >= HEADER.size + SEGMENT.size + INDEX_HEADER.size + TRAILER.size:
+            offset, magic = TRAILER.unpack_from(data, size - TRAILER.size)
+            if magic == INDEX_MAGIC and HEADER.size <= offset < size:
+                last_index = offset
+        if last_index is None:
+            self._scan(HEADER.size, size)
+        else:
+            self._read_indexes(last_index)
+        self._last_index = last_index or 0
+
+    def _segment(self, offset):
+        """
+        Get the type, the start and the end of the payload of the segment at offset.
+        """
+        segment_type, length = SEGMENT.unpack_from(self._mapped(offset + SEGMENT.size), offset)
+        start = offset + SEGMENT.size
+        return segment_type, start, start + length
+
+    def _scan(self, offset, size):
+        """
+        Read every segment between offset and size, used when the archive was not closed. The segments are indexed
+        again by the next flush.
+        """
+        while offset + SEGMENT.size <= size:
+            segment_type, start, end = self._segment(offset)
+            if end > size:
+                # The last segment was not completely written.
+                break
+            if segment_type == STRINGS:
+                self._read_strings(offset)
+                self._new_strings.append(offset)
+            elif segment_type == RECORD:
+                self._new_records.append(offset)
+                platform, battletag, date = RECORD_HEADER.unpack_from(self._map, start)[:3]
+                self._index[(self.players.name(platform), self.players.name(battletag),
+                             datetime.date.fromordinal(date))] = offset
+            offset = end + padding(end - start)
+        if self.mode == 'a' and offset < size:
+            # Drop the incomplete segment so the next ones are not read as part of it.
+            self._map.close()
+            self._map = None
+            self._file.truncate(offset)
+
+    def _read_indexes(self, offset):
+        """
+        Read the chain of INDEX segments that ends at offset.
+        """
+        chain = []
+        while offset:
+            segment_type, start, end = self._segment(offset)
+            if segment_type != INDEX:
+                raise over_stats.errors.InvalidFormat('The archive index is corrupted')
+            previous, strings_count, records_count = INDEX_HEADER.unpack_from(self._map, start)
+            chain.append((start, strings_count, records_count))
+            offset = previous
+        for start, strings_count, records_count in reversed(chain):
+            position = start + INDEX_HEADER.size
+            strings = array.array('Q', self._map[position:position + 8 * strings_count])
+            position += 8 * strings_count
+            records = array.array('Q', self._map[position:position + 8 * records_count])
+            for strings_offset in strings:
+                self._read_strings(strings_offset)
+            for record_offset in records:
+                platform, battletag, date = RECORD_HEADER.unpack_from(self._map, record_offset + SEGMENT.size)[:3]
+                self._index[(self.players.name(platform), self.players.name(battletag),
+                             datetime.date.fromordinal(date))] = record_offset
+
+    def _read_strings(self, offset):
+        _, start, end = self._segment(offset)
+        table, count = STRINGS_HEADER.unpack_from(self._map, start)
+        position = start + STRINGS_HEADER.size
+        lengths = array.array('I', self._map[position:position + 4 * count])
+        position += 4 * count
+        names = self.names if table == NAMES_TABLE else self.players
+        for length in lengths:
+            names.code(self._map[position:position + length].decode('utf-8'))
+            position += length
+
+    def _record(self, key):
+        offset = self._index.get(key)
+        if offset is None:
+            raise over_stats.errors.DataNotFound('Data not available')
+        _, start, end = self._segment(offset)
+        rows = RECORD_HEADER.unpack_from(self._mapped(end), start)[3]
+        return start + RECORD_HEADER.size, rows
+
+    def _lookup(self, record, key):
+        """
+        Find key in a record with a binary search over the mapped file. Returns the (value, kind) or None.
+        """
+        start, rows = record
+        with memoryview(self._map) as view, view[start:start + 8 * rows] as keys_bytes, \
+                keys_bytes.cast('Q') as keys:
+            row = bisect.bisect_left(keys, key)
+            if row == rows or keys[row] != key:
+                return None
+        values_start = start + 8 * rows
+        value = struct.unpack_from('d', self._map, values_start + 8 * row)[0]
+        return value, self._map[values_start + 8 * rows + row]
+
+    def _stat_key(self, mode, hero, category, stat_name):
+        codes = (self.names.find(hero), self.names.find(category), self.names.find(stat_name))
+        if mode not in over_stats.MODE_LIST or None in codes:
+            return None
+        return make_key(over_stats.MODE_LIST.index(mode), *codes)
+
+    def stats(self, platform, battletag, date, mode, hero, category, stat_name):
+        """
+        Get the value of a stat in the snapshot of a player on a date, as a float. Durations are in seconds and
+        missing values are None. Raises DataNotFound if there is no such snapshot or stat. Comparisons are read with
+        over_stats.COMPARISON as the category and the comparison type as the stat_name.
+        """
+        record = self._record((platform, battletag, date))
+        key = self._stat_key(mode, hero, category, stat_name)
+        found = self._lookup(record, key) if key is not None else None
+        if found is None:
+            raise over_stats.errors.DataNotFound('Data not available')
+        value, kind = found
+        return None if kind == over_stats.columnar.KIND_MISSING else value
+
+    def series(self, mode, hero, category, stat_name, platform=None, battletag=None, start=None, end=None):
+        """
+        Generate (platform, battletag, date, value) for every snapshot that has the stat, sorted by player and date.
+        The snapshots can be limited to a platform, a battletag and to the dates between start and end, inclusive.
+        """
+        key = self._stat_key(mode, hero, category, stat_name)
+        if key is None:
+            return
+        for snapshot in self.keys(platform, battletag, start, end):
+            found = self._lookup(self._record(snapshot), key)
+            if found is not None:
+                value, kind = found
+                yield snapshot + (None if kind == over_stats.columnar.KIND_MISSING else value,)
+
+    def snapshot(self, platform, battletag, date):
+        """
+        Read every stat of a snapshot into an over_stats.columnar.CompactProfile that uses the names of the archive.
+        """
+        start, rows = self._record((platform, battletag, date))
+        compact = over_stats.columnar.CompactProfile(self.names)
+        keys = array.array('Q', self._map[start:start + 8 * rows])
+        for key in keys:
+            mode, hero, category, stat = split_key(key)
+            compact.mode.append(mode)
+            compact.hero.append(hero)
+            compact.category.append(category)
+            compact.stat.append(stat)
+        compact.value.frombytes(self._map[start + 8 * rows:start + 16 * rows])
+        compact.kind.frombytes(self._map[start + 16 * rows:start + 17 * rows])
+        return compact
+
+    def keys(self, platform=None, battletag=None, start=None, end=None):
+        """
+        Get the sorted (platform, battletag, date) of the snapshots, optionally limited like in series().
+        """
+        return sorted(key for key in self._index
+                      if (platform is None or key[0] == platform) and (battletag is None or key[1] == battletag)
+                      and (start is None or key[2] >= start) and (end is None or key[2] <= end))
+
+    def dates(self, platform, battletag):
+        """
+        Get the sorted dates of the snapshots of a player.
+        """
+        return [key[2] for key in self.keys(platform, battletag)]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    # Writing
+
+    def append(self, profile, date=None):
+        """
+        Store the stats of a PlayerProfile, which is loaded if needed, as its snapshot on date, today by default. A
+        later snapshot of the same player and date replaces the previous one.
+        """
+        self.append_model(profile._platform, profile.battletag, date or datetime.date.today(), profile.raw_data)
+
+    def append_model(self, platform, battletag, date, model):
+        """
+        Store the stats of a _model dictionary as the snapshot of a player on date.
+        """
+        if self.mode != 'a':
+            raise over_stats.errors.InvalidArgument('The archive was opened for reading')
+        compact = over_stats.columnar.CompactProfile.from_model(model, self.names)
+        if len(self.names) > CODE_MASK:
+            raise over_stats.errors.InvalidArgument('The archive has too many distinct names')
+        rows = sorted(zip((make_key(*codes) for codes in zip(compact.mode, compact.hero, compact.category,
+                                                               compact.stat)),
+                          compact.value, compact.kind))
+        player = (self.players.code(platform), self.players.code(battletag))
+        self._write_strings(NAMES_TABLE, self.names)
+        self._write_strings(PLAYERS_TABLE, self.players)
+        payload = b''.join((RECORD_HEADER.pack(player[0], player[1], date.toordinal(), len(rows)),
+                            array.array('Q', [row[0] for row in rows]).tobytes(),
+                            array.array('d', [row[1] for row in rows]).tobytes(),
+                            array.array('B', [row[2] for row in rows]).tobytes()))
+        offset = self._write_segment(RECORD, payload)
+        self._new_records.append(offset)
+        self._index[(platform, battletag, date)] = offset
+
+    def _write_strings(self, table, names):
+        stored = self._stored[table]
+        if stored == len(names):
+            return
+        encoded = [name.encode('utf-8') for name in names.names()[stored:]]
+        payload = b''.join([STRINGS_HEADER.pack(table, len(encoded)),
+                            array.array('I', [len(name) for name in encoded]).tobytes()] + encoded)
+        self._new_strings.append(self._write_segment(STRINGS, payload))
+        self._stored[table] = len(names)
+
+    def _write_segment(self, segment_type, payload):
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(SEGMENT.pack(segment_type, len(payload)) + payload + b'\0' * padding(len(payload)))
+        return offset
+
+    def flush(self):
+        """
+        Write an INDEX for the snapshots appended since the last flush, so the next open does not scan them.
+        """
+        if self.mode != 'a' or not (self._new_records or self._new_strings):
+            return
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        payload = b''.join((INDEX_HEADER.pack(self._last_index, len(self._new_strings), len(self._new_records)),
+                            array.array('Q', self._new_strings).tobytes(),
+                            array.array('Q', self._new_records).tobytes()))
+        payload += b'\0' * padding(len(payload)) + TRAILER.pack(offset, INDEX_MAGIC)
+        self._write_segment(INDEX, payload)
+        self._file.flush()
+        self._last_index = offset
+        self._new_records = []
+        self._new_strings = []
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,104 @@
+"""
+Bulk loading of profiles.
+
+Downloads run on a pool of threads and the parsing, which is CPU bound, runs on a pool of processes so throughput
+scales with the number of cores. Results are produced as soon as each profile is parsed:
+
+    for battletag, result in over_stats.batch.load_profiles(battletags, workers=4):
+        if isinstance(result, Exception):
+            print(f'{battletag} failed: {result}')
+        else:
+            print(battletag, list(result[over_stats.MODES].keys()))
+"""
+import concurrent.futures
+import os
+
+import over_stats
+import over_stats.metrics
+import over_stats.parser
+
+DEFAULT_FETCH_WORKERS = 8
+FETCH = 'fetch'
+PARSE = 'parse'
+
+
+def load_profiles(battletags, platform=over_stats.PLAT_PC, workers=None, use_decimal=False, parser=None,
+                  transport=None, fetch_workers=DEFAULT_FETCH_WORKERS, base_url=over_stats.CAREER_URL, metrics=None,
+                  use_seconds=False):
+    """
+    Load the profile of every battletag and generate (battletag, model) tuples in the order in which they finish.
+    model is the same dictionary returned by PlayerProfile.raw_data. If a profile cannot be loaded, the exception is
+    returned in place of the model, for example PlayerNotFound, so a single battletag cannot abort the batch.
+    battletags can also hold (platform, battletag) tuples to load profiles of several platforms, they are generated
+    back as they were given.
+
+    workers is the number of processes used to parse, it defaults to the number of cores. fetch_workers is the number
+    of threads used to download pages. battletags is consumed lazily and only a bounded number of profiles are in
+    flight at any time, so memory does not grow with the size of the input.
+
+    metrics is an over_stats.metrics.Sink, by default the sink installed with set_default_sink() is used. The
+    measurements taken in the worker processes are sent to it when each profile is parsed.
+    """
+    if metrics is None:
+        metrics = over_stats.metrics.default_sink()
+    workers = workers or os.cpu_count() or 1
+    max_pending = fetch_workers + 2 * workers
+    battletags = iter(battletags)
+    exhausted = False
+    # Maps each future to the battletag it belongs to and to whether it is downloading or parsing the page.
+    pending = {}
+
+    with concurrent.futures.ThreadPoolExecutor(fetch_workers) as fetch_pool, \
+            concurrent.futures.ProcessPoolExecutor(workers) as parse_pool:
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        battletag = next(battletags)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    profile_platform, profile_battletag = battletag if isinstance(battletag, tuple) else \
+                        (platform, battletag)
+                    try:
+                        profile = over_stats.PlayerProfile(profile_battletag, profile_platform, use_decimal, parser,
+                                                           transport, base_url, metrics=metrics)
+                    except Exception as e:
+                        yield battletag, e
+                        continue
+                    pending[fetch_pool.submit(profile.fetch)] = (battletag, FETCH)
+                if not pending:
+                    return
+
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    battletag, stage = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield battletag, e
+                        continue
+                    if stage == PARSE:
+                        if metrics is not None:
+                            result, events = result
+                            over_stats.metrics.replay(events, metrics)
+                        yield battletag, result
+                    else:
+                        # The page was downloaded, now send it to be parsed.
+                        parse_page = parse_measured if metrics is not None else over_stats.parser.parse_career_page
+                        parse = parse_pool.submit(parse_page, result.content, use_decimal, parser, result.encoding,
+                                                  use_seconds=use_seconds)
+                        pending[parse] = (battletag, PARSE)
+        finally:
+            # If the caller stops iterating early, do not wait for the profiles that have not started yet.
+            for future in pending:
+                future.cancel()
+
+
+def parse_measured(content, use_decimal, parser, encoding, use_seconds=False):
+    """
+    Parse a page in a worker process and return the model together with the measurements taken while parsing it.
+    """
+    recorder = over_stats.metrics.EventRecorder()
+    model = over_stats.parser.parse_career_page(content, use_decimal, parser, encoding, recorder, use_seconds)
+    return model, recorder.events
@@ -0,0 +1,303 @@
+"""
+Compact binary format for parsed profiles.
+
+The _model is encoded in columns: every name and string value is stored once in a string table, the shape of the tree
+(dictionaries, lists and the type of each value) is an array of integers and ints and floats are stored in their own
+typed arrays. Each array uses the smallest item size that fits its values, so the format is much smaller than JSON.
+Decimals are stored as their text so they round trip exactly, which JSON cannot do.
+
+The format is meant for size and exact values, not speed: the tree is walked in Python, so encoding and decoding are
+slower than json and pickle, which are written in C. benchmarks/bench_binary.py compares the three.
+
+    data = player_data.dumps()
+    player_data = over_stats.PlayerProfile.loads(data)
+
+The layout is:
+
+    magic (4 bytes) | version | flags | size of each section (uint32) | profile | lengths | text | shape | ints | floats
+
+The profile section holds the battletag, platform and url as utf-8 separated by NUL. The string table is the utf-8
+text of every string one after the other and the array of their lengths in bytes. Every array starts with its
+typecode. Arrays are written in the byte order of the machine that wrote them, which is recorded in the flags.
+
+The header holds the size of every section, so dumps can be written one after the other to a file and read back with
+read_models().
+"""
+import array
+import struct
+import sys
+from decimal import Decimal
+
+import over_stats.errors
+
+MAGIC = b'OVST'
+VERSION = 1
+
+FLAG_DECIMAL = 1
+FLAG_SECONDS = 2
+FLAG_BIG_ENDIAN = 4
+
+# The low 3 bits of each item of the shape are its type, the other bits its size or the code of its string.
+DICT = 0
+LIST = 1
+STRING = 2
+INT = 3
+FLOAT = 4
+DECIMAL = 5
+# ints that do not fit in 64 bits are stored as text.
+BIG_INT = 6
+TAG_BITS = 3
+TAG_MASK = 7
+
+HEADER = struct.Struct('<4sBB6I')
+UNSIGNED_TYPECODES = 'BHIQ'
+SIGNED_TYPECODES = 'bhiq'
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def smallest_array(values, typecodes):
+    """
+    Build an array with the smallest typecode among typecodes that can hold every value.
+    """
+    for typecode in typecodes:
+        try:
+            return array.array(typecode, values)
+        except OverflowError:
+            continue
+    raise OverflowError('values do not fit in 64 bits')
+
+
+def pack_array(values):
+    return values.typecode.encode('ascii') + values.tobytes()
+
+
+def unpack_array(data, swap):
+    values = array.array(chr(data[0]))
+    values.frombytes(data[1:])
+    if swap:
+        values.byteswap()
+    return values
+
+
+class Encoder:
+    """
+    Walks a _model and fills the columns of the format.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.strings = []
+        self.shape = []
+        self.ints = []
+        self.floats = []
+
+    def code(self, text):
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def encode(self, value):
+        shape = self.shape
+        value_type = type(value)
+        if value_type is dict:
+            self.dictionary(value)
+        elif value_type is list:
+            codes = self.codes
+            shape.append(len(value) << TAG_BITS | LIST)
+            for item in value:
+                item_code = codes.get(item) if type(item) is str else None
+                if item_code is not None:
+                    shape.append(item_code << TAG_BITS | STRING)
+                else:
+                    self.encode(item)
+        elif value_type is str:
+            shape.append(self.code(value) << TAG_BITS | STRING)
+        elif value_type is int:
+            if INT64_MIN <= value <= INT64_MAX:
+                shape.append(INT)
+                self.ints.append(value)
+            else:
+                shape.append(self.code(str(value)) << TAG_BITS | BIG_INT)
+        elif value_type is float:
+            shape.append(FLOAT)
+            self.floats.append(value)
+        elif value_type is Decimal:
+            shape.append(self.code(str(value)) << TAG_BITS | DECIMAL)
+        else:
+            raise over_stats.errors.InvalidArgument(f'Values of type {value_type.__name__} cannot be encoded')
+
+    def dictionary(self, value):
+        # The stats are the leaves of the model and the most common items, they are written here without a call.
+        codes = self.codes
+        code = self.code
+        shape = self.shape
+        append = shape.append
+        shape.append(len(value) << TAG_BITS | DICT)
+        for key, item in value.items():
+            key_code = codes.get(key)
+            append(key_code if key_code is not None else code(key))
+            item_type = type(item)
+            if item_type is int and INT64_MIN <= item <= INT64_MAX:
+                append(INT)
+                self.ints.append(item)
+            elif item_type is float:
+                append(FLOAT)
+                self.floats.append(item)
+            elif item_type is str:
+                item_code = codes.get(item)
+                append((item_code if item_code is not None else code(item)) << TAG_BITS | STRING)
+            else:
+                self.encode(item)
+
+
+def dumps_model(model, use_decimal=False, use_seconds=False, battletag='', platform='', url=''):
+    """
+    Encode a _model, and the profile it belongs to, into bytes.
+    """
+    encoder = Encoder()
+    encoder.encode(model)
+    flags = (FLAG_DECIMAL if use_decimal else 0) | (FLAG_SECONDS if use_seconds else 0) | \
+        (FLAG_BIG_ENDIAN if sys.byteorder == 'big' else 0)
+    profile = '\0'.join((battletag or '', platform or '', url or '')).encode('utf-8')
+    encoded = [text.encode('utf-8') for text in encoder.strings]
+    sections = [profile,
+                pack_array(smallest_array([len(text) for text in encoded], UNSIGNED_TYPECODES)),
+                b''.join(encoded),
+                pack_array(smallest_array(encoder.shape, UNSIGNED_TYPECODES)),
+                pack_array(smallest_array(encoder.ints, SIGNED_TYPECODES)),
+                pack_array(array.array('d', encoder.floats))]
+    return b''.join([HEADER.pack(MAGIC, VERSION, flags, *[len(section) for section in sections])] + sections)
+
+
+class Decoded:
+    """
+    The contents of a dump: the _model and the options and identity of the profile it belongs to.
+    """
+
+    def __init__(self, model, use_decimal, use_seconds, battletag, platform, url):
+        self.model = model
+        self.use_decimal = use_decimal
+        self.use_seconds = use_seconds
+        self.battletag = battletag
+        self.platform = platform
+        self.url = url
+
+
+class Decoder:
+    """
+    Rebuilds a _model from the columns of the format.
+    """
+
+    def __init__(self, strings, shape, ints, floats):
+        self.strings = strings
+        self.shape = iter(shape)
+        self.ints = iter(ints)
+        self.floats = iter(floats)
+
+    def decode(self):
+        value = self.value(next(self.shape))
+        if next(self.shape, None) is not None:
+            raise ValueError('unexpected data after the model')
+        return value
+
+    def value(self, item):
+        tag = item & TAG_MASK
+        if tag == DICT:
+            return self.dictionary(item >> TAG_BITS)
+        if tag == LIST:
+            return self.list(item >> TAG_BITS)
+        if tag == STRING:
+            return self.strings[item >> TAG_BITS]
+        if tag == INT:
+            return next(self.ints)
+        if tag == FLOAT:
+            return next(self.floats)
+        if tag == DECIMAL:
+            return Decimal(self.strings[item >> TAG_BITS])
+        if tag == BIG_INT:
+            return int(self.strings[item >> TAG_BITS])
+        raise ValueError(f'unknown type {tag}')
+
+    def list(self, size):
+        # Lists are mostly the names of achievements.
+        strings = self.strings
+        shape = self.shape
+        result = []
+        for _ in range(size):
+            item = next(shape)
+            if item & TAG_MASK == STRING:
+                result.append(strings[item >> TAG_BITS])
+            else:
+                result.append(self.value(item))
+        return result
+
+    def dictionary(self, size):
+        # The stats are the leaves of the model and the most common items, they are read here without a call.
+        strings = self.strings
+        shape = self.shape
+        result = {}
+        for _ in range(size):
+            key = strings[next(shape)]
+            item = next(shape)
+            tag = item & TAG_MASK
+            if tag == INT:
+                result[key] = next(self.ints)
+            elif tag == STRING:
+                result[key] = strings[item >> TAG_BITS]
+            elif tag == FLOAT:
+                result[key] = next(self.floats)
+            else:
+                result[key] = self.value(item)
+        return result
+
+
+def loads_model(data):
+    """
+    Decode bytes produced by dumps_model() into a Decoded.
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise over_stats.errors.InvalidFormat('The data is too short to be a profile')
+    magic, version, flags, *lengths = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise over_stats.errors.InvalidFormat('The data is not a profile')
+    if version != VERSION:
+        raise over_stats.errors.InvalidFormat(f'Version {version} of the format is not supported')
+    if HEADER.size + sum(lengths) != len(data):
+        raise over_stats.errors.InvalidFormat('The data is truncated')
+    sections = []
+    position = HEADER.size
+    for length in lengths:
+        sections.append(data[position:position + length])
+        position += length
+    profile, lengths, text, shape, ints, floats = sections
+    swap = bool(flags & FLAG_BIG_ENDIAN) != (sys.byteorder == 'big')
+    try:
+        text = bytes(text)
+        table = []
+        position = 0
+        for length in unpack_array(lengths, swap):
+            table.append(text[position:position + length].decode('utf-8'))
+            position += length
+        model = Decoder(table, unpack_array(shape, swap), unpack_array(ints, swap), unpack_array(floats, swap)).decode()
+        battletag, platform, url = bytes(profile).decode('utf-8').split('\0')
+    except (IndexError, ValueError, StopIteration, TypeError) as e:
+        raise over_stats.errors.InvalidFormat(f'The data is corrupted: {e}')
+    return Decoded(model, bool(flags & FLAG_DECIMAL), bool(flags & FLAG_SECONDS), battletag or None, platform, url)
+
+
+def read_models(file):
+    """
+    Generate a Decoded for each dump in a binary file that holds several dumps one after the other.
+    """
+    while True:
+        header = file.read(HEADER.size)
+        if not header:
+            return
+        if len(header) < HEADER.size:
+            raise over_stats.errors.InvalidFormat('The data is truncated')
+        size = sum(HEADER.unpack(header)[3:])
+        yield loads_model(header + file.read(size))
@@ -0,0 +1,223 @@
+"""
+Persistent cache for parsed profiles.
+
+The cache stores the parsed model of a profile together with the ETag and Last-Modified headers of the response it was
+built from. While an entry is fresh it is returned without any network request. Once its time to live expires, the
+page is requested again with If-None-Match/If-Modified-Since, if the profile did not change the server answers with a
+304 and the stored model is used without parsing anything.
+
+    cache = over_stats.cache.SQLiteCache('profiles.db', ttl=600, max_bytes=256 * 1024 * 1024)
+    player_data = over_stats.PlayerProfile('zappis#21285', cache=cache)
+"""
+import pickle
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = 10 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheEntry:
+    """
+    A cached model. expires_at is the time, in seconds since the epoch, after which the entry has to be revalidated.
+    """
+    __slots__ = ('model', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, model, etag=None, last_modified=None, expires_at=0):
+        self.model = model
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def conditional_headers(self):
+        """
+        Get the headers that make a request conditional on the page having changed since this entry was stored.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ProfileCache:
+    """
+    Base class for profile caches. It implements the lookup and revalidation logic and keeps the counters, subclasses
+    store the entries by implementing get_entry(), put_entry(), renew_entry() and delete_entry().
+
+    The counters are hits (fresh entries returned), misses (profiles that were not cached), revalidations (conditional
+    requests sent for expired entries), not_modified (revalidations answered with a 304) and evictions.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def count(self, counter, amount=1):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def counters(self):
+        """
+        Get a dictionary with the value of every counter.
+        """
+        with self._counter_lock:
+            return {'hits': self.hits, 'misses': self.misses, 'revalidations': self.revalidations,
+                    'not_modified': self.not_modified, 'evictions': self.evictions}
+
+    @staticmethod
+    def key(profile):
+        """
+        Get the key a profile is stored under. The model depends on the url, on whether floats are Decimals and on
+        whether durations are converted into seconds.
+        """
+        key = f'{profile.url} decimal={bool(profile._use_decimal)}'
+        if profile._use_seconds:
+            key += ' seconds=True'
+        return key
+
+    def load(self, profile, force=False):
+        """
+        Get the model for a PlayerProfile, downloading and parsing the page only when needed. If force is true, a
+        fresh entry is revalidated like an expired one.
+        """
+        key = self.key(profile)
+        entry = self.get_entry(key)
+        if entry is not None and entry.expires_at > time.time() and not force:
+            self.count('hits')
+            return entry.model
+
+        if entry is None:
+            self.count('misses')
+            response = profile.fetch()
+        else:
+            self.count('revalidations')
+            response = profile.fetch(entry.conditional_headers())
+            if response.status == 304:
+                self.count('not_modified')
+                self.renew_entry(key, time.time() + self.ttl)
+                return entry.model
+
+        model = profile.parse(response)
+        self.store(profile, model, response)
+        return model
+
+    def store(self, profile, model, response):
+        """
+        Store the model of a PlayerProfile built from response.
+        """
+        self.put_entry(self.key(profile), CacheEntry(model, response.header('ETag'), response.header('Last-Modified'),
+                                                     time.time() + self.ttl))
+
+    def get_entry(self, key):
+        """
+        Get the CacheEntry stored for key, or None if there is no entry.
+        """
+        raise NotImplementedError
+
+    def put_entry(self, key, entry):
+        """
+        Store a CacheEntry, replacing any previous entry for key.
+        """
+        raise NotImplementedError
+
+    def renew_entry(self, key, expires_at):
+        """
+        Change the expiration time of an entry after it was revalidated.
+        """
+        raise NotImplementedError
+
+    def delete_entry(self, key):
+        """
+        Remove the entry stored for key, if any.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteCache(ProfileCache):
+    """
+    Cache stored in an SQLite database, so it can be shared by every process on the machine. When the stored models
+    take more than max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(ttl)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS profiles (key TEXT PRIMARY KEY, model BLOB NOT NULL, etag TEXT, '
+                         'last_modified TEXT, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+                         'size INTEGER NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS profiles_accessed_at ON profiles (accessed_at)')
+
+    def get_entry(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT model, etag, last_modified, expires_at FROM profiles WHERE key = ?',
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE profiles SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        model, etag, last_modified, expires_at = row
+        return CacheEntry(pickle.loads(model), etag, last_modified, expires_at)
+
+    def put_entry(self, key, entry):
+        model = pickle.dumps(entry.model, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (key, model, entry.etag, entry.last_modified, entry.expires_at, time.time(), len(model)))
+            self._evict()
+
+    def renew_entry(self, key, expires_at):
+        with self._lock:
+            self._db.execute('UPDATE profiles SET expires_at = ?, accessed_at = ? WHERE key = ?',
+                             (expires_at, time.time(), key))
+
+    def delete_entry(self, key):
+        with self._lock:
+            self._db.execute('DELETE FROM profiles WHERE key = ?', (key,))
+
+    def _evict(self):
+        """
+        Delete the least recently used entries until the cache fits in max_bytes.
+        """
+        total = self._size()
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._db.execute('SELECT key, size FROM profiles ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM profiles WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        self.count('evictions', evicted)
+
+    def _size(self):
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM profiles').fetchone()[0]
+
+    def size(self):
+        """
+        Get the number of bytes used by the stored models.
+        """
+        with self._lock:
+            return self._size()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM profiles').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
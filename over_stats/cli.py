@@ -0,0 +1,249 @@
+"""
+The over-stats command, which exports the stats of many profiles.
+
+Battletags are read from files or from stdin, one per line. A line can start with a platform to load a console
+profile, for example psn/acesarramsan, the other lines use --platform. Profiles are downloaded and parsed in parallel
+by over_stats.batch and written as soon as each one is parsed, so memory does not grow with the number of profiles:
+
+    over-stats battletags.txt --format csv --output stats.csv --workers 4
+    cat battletags.txt | over-stats --directory saved_pages/ > stats.ndjson
+
+The formats are:
+
+    ndjson     one JSON object per profile: {"platform": ..., "battletag": ..., "data": raw_data}
+    csv        one row per stat: platform, battletag, mode, hero, category, stat, value. Comparisons use
+               over_stats.COMPARISON as their category and the comparison type as their stat
+    binary     the dumps of over_stats.binary one after the other, read them with over_stats.binary.read_models()
+
+--directory loads the pages saved in a directory instead of downloading them, see
+over_stats.transport.DirectoryTransport. Profiles that cannot be loaded are reported on stderr, followed by a summary
+of the run, and the exit status is 1 if any profile failed.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import over_stats
+import over_stats.batch
+import over_stats.binary
+import over_stats.transport
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+FORMAT_BINARY = 'binary'
+FORMATS = [FORMAT_NDJSON, FORMAT_CSV, FORMAT_BINARY]
+CSV_HEADER = ['platform', 'battletag', 'mode', 'hero', 'category', 'stat', 'value']
+# Seconds between two updates of the progress line.
+PROGRESS_INTERVAL = 0.5
+
+
+def read_battletags(lines, platform=over_stats.PLAT_PC):
+    """
+    Generate a (platform, battletag) tuple for each line that is not empty or a # comment.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        prefix, separator, battletag = line.partition('/')
+        if separator and prefix in over_stats.PLATFORMS:
+            yield prefix, battletag
+        else:
+            yield platform, line
+
+
+def stat_rows(model):
+    """
+    Generate a (mode, hero, category, stat_name, value) tuple for every stat and comparison of a _model.
+    """
+    for mode, mode_dict in model[over_stats.MODES].items():
+        for comparison_type, comparison in mode_dict[over_stats.COMPARISON].items():
+            # Sections that were not found on the page are stored as empty lists.
+            for hero, value in (comparison or {}).items():
+                yield mode, hero, over_stats.COMPARISON, comparison_type, value
+        for hero, categories in mode_dict[over_stats.STATS].items():
+            for category, stats in (categories or {}).items():
+                for stat_name, value in stats.items():
+                    yield mode, hero, category, stat_name, value
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        # Durations such as ['12', 'hours'].
+        return ' '.join(value)
+    return str(value)
+
+
+class NdjsonWriter:
+    binary = False
+
+    def __init__(self, output, options):
+        self.output = output
+
+    def write(self, platform, battletag, model):
+        # Decimals are written as strings so they keep every digit.
+        self.output.write(json.dumps({'platform': platform, 'battletag': battletag, 'data': model}, default=str))
+        self.output.write('\n')
+
+
+class CsvWriter:
+    binary = False
+
+    def __init__(self, output, options):
+        self.writer = csv.writer(output)
+        self.writer.writerow(CSV_HEADER)
+
+    def write(self, platform, battletag, model):
+        self.writer.writerows([platform, battletag, mode, hero, category, stat_name, csv_value(value)]
+                              for mode, hero, category, stat_name, value in stat_rows(model))
+
+
+class BinaryWriter:
+    binary = True
+
+    def __init__(self, output, options):
+        self.output = output
+        self.options = options
+
+    def write(self, platform, battletag, model):
+        options = self.options
+        url = over_stats.PlayerProfile(battletag, platform, base_url=options.base_url).url
+        self.output.write(over_stats.binary.dumps_model(model, options.decimal, options.seconds, battletag, platform,
+                                                        url))
+
+
+WRITERS = {FORMAT_NDJSON: NdjsonWriter, FORMAT_CSV: CsvWriter, FORMAT_BINARY: BinaryWriter}
+
+
+class Progress:
+    """
+    Counts the profiles that were exported and prints the progress and the final summary on stream.
+    """
+
+    def __init__(self, stream, live):
+        self.stream = stream
+        self.live = live
+        self.exported = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._printed = self.start
+
+    def error(self, message):
+        self.stream.write(('\r' if self.live else '') + message + '\n')
+        self.update(failed=True)
+
+    def update(self, failed=False):
+        if failed:
+            self.failed += 1
+        else:
+            self.exported += 1
+        if self.live:
+            now = time.monotonic()
+            if now - self._printed >= PROGRESS_INTERVAL:
+                self._printed = now
+                self.stream.write(f'\r{self.line(now)}')
+                self.stream.flush()
+
+    def line(self, now):
+        elapsed = now - self.start
+        rate = (self.exported + self.failed) / elapsed if elapsed > 0 else 0
+        return f'{self.exported} profiles exported, {self.failed} failed in {elapsed:.1f}s ({rate:.1f} profiles/s)'
+
+    def summary(self):
+        self.stream.write(('\r' if self.live else '') + self.line(time.monotonic()) + '\n')
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog='over-stats', description='Export the stats of Overwatch profiles.')
+    parser.add_argument('inputs', nargs='*', default=['-'], metavar='FILE',
+                        help='files with one battletag per line, - or no file reads stdin')
+    parser.add_argument('-f', '--format', choices=FORMATS, default=FORMAT_NDJSON, help='output format')
+    parser.add_argument('-o', '--output', default='-', help='file to write, stdout by default')
+    parser.add_argument('-p', '--platform', choices=over_stats.PLATFORMS, default=over_stats.PLAT_PC,
+                        help='platform of the battletags without a platform/ prefix')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='processes used to parse pages, the number of cores by default')
+    parser.add_argument('--fetch-workers', type=int, default=over_stats.batch.DEFAULT_FETCH_WORKERS,
+                        help='threads used to download pages')
+    parser.add_argument('-d', '--directory', help='read saved pages from this directory instead of downloading them')
+    parser.add_argument('--base-url', default=over_stats.CAREER_URL, help='address of the career pages')
+    parser.add_argument('--parser', choices=over_stats.PARSERS, default=None, help='HTML parser')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds to wait for the server')
+    parser.add_argument('--retries', type=int, default=over_stats.transport.DEFAULT_RETRIES,
+                        help='times a failed request is sent again')
+    parser.add_argument('--rate', type=float, default=None, help='maximum number of requests per second')
+    parser.add_argument('--decimal', action='store_true', help='store percentages as Decimals')
+    parser.add_argument('--seconds', action='store_true', help='convert durations into seconds')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not print progress or the summary')
+    return parser.parse_args(argv)
+
+
+def create_transport(options):
+    if options.directory is not None:
+        return over_stats.transport.DirectoryTransport(options.directory)
+    rate_limiter = over_stats.transport.TokenBucket(options.rate) if options.rate else None
+    return over_stats.transport.RequestsTransport(pool_size=options.fetch_workers,
+                                                  timeout=options.timeout or over_stats.transport.DEFAULT_TIMEOUT,
+                                                  retries=options.retries, rate_limiter=rate_limiter)
+
+
+def read_inputs(inputs, stdin):
+    """
+    Generate the lines of every input, one file at a time.
+    """
+    for name in inputs:
+        if name == '-':
+            yield from stdin
+        else:
+            with open(name) as f:
+                yield from f
+
+
+def export(options, output, stderr, stdin):
+    """
+    Export the profiles listed in the inputs to output and return the Progress of the run.
+    """
+    writer = WRITERS[options.format](output, options)
+    progress = Progress(stderr, not options.quiet and stderr.isatty())
+    transport = create_transport(options)
+    battletags = read_battletags(read_inputs(options.inputs, stdin), options.platform)
+    try:
+        for (platform, battletag), result in over_stats.batch.load_profiles(
+                battletags, workers=options.workers, use_decimal=options.decimal, parser=options.parser,
+                transport=transport, fetch_workers=options.fetch_workers, base_url=options.base_url,
+                use_seconds=options.seconds):
+            if isinstance(result, Exception):
+                progress.error(f'{platform}/{battletag}: {result}')
+            else:
+                writer.write(platform, battletag, result)
+                progress.update()
+    finally:
+        transport.close()
+    return progress
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Run the over-stats command and return its exit status.
+    """
+    options = parse_arguments(argv)
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    binary = WRITERS[options.format].binary
+    if options.output == '-':
+        output = stdout.buffer if binary else stdout
+        progress = export(options, output, stderr, stdin)
+        output.flush()
+    else:
+        with open(options.output, 'wb' if binary else 'w', **({} if binary else {'newline': ''})) as output:
+            progress = export(options, output, stderr, stdin)
+    if not options.quiet:
+        progress.summary()
+    return 1 if progress.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
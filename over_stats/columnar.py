@@ -0,0 +1,204 @@
+"""
+Compact columnar storage for the numeric stats of a profile.
+
+The _model is a tree of dictionaries holding ints, floats, Decimals, strings and lists, which takes a lot of memory
+when many profiles are kept around. A CompactProfile keeps one row per stat in typed arrays instead: the game mode,
+hero, category and stat name are codes into a NameTable shared by every profile, values are floats, durations are
+converted into seconds and missing values ('--') are NaN.
+
+Career stats are stored as (mode, hero, category, stat). Comparisons are stored with over_stats.COMPARISON as their
+category and the comparison type as their stat name, for example (mode, 'Reaper', 'comparisons', 'Games Won').
+
+NumPy is only needed to export the arrays with to_arrays(), install over_stats[numpy]. pandas is only needed for
+to_frame(), install over_stats[pandas].
+"""
+import array
+import math
+import threading
+from decimal import Decimal
+
+import over_stats
+import over_stats.errors
+import over_stats.values
+
+KIND_NUMBER = 0
+KIND_DURATION = 1
+KIND_MISSING = 2
+
+
+class NameTable:
+    """
+    Interns names into integer codes. Profiles that share a NameTable use the same code for the same name, so their
+    arrays can be compared directly.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def code(self, name):
+        """
+        Get the code for name, adding it to the table if needed.
+        """
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    code = self._codes[name] = len(self._names)
+                    self._names.append(name)
+        return code
+
+    def find(self, name):
+        """
+        Get the code for name, or None if the name is not in the table.
+        """
+        return self._codes.get(name)
+
+    def name(self, code):
+        return self._names[code]
+
+    def names(self):
+        """
+        Get the list of names, the position of each name is its code.
+        """
+        return list(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+# The table used when no other NameTable is given.
+NAMES = NameTable()
+
+
+def compact_value(value):
+    """
+    Convert a value stored in the _model into a (float, kind) tuple.
+    """
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value), KIND_NUMBER
+    seconds = over_stats.values.duration_seconds(value)
+    if seconds is not None:
+        return float(seconds), KIND_DURATION
+    return math.nan, KIND_MISSING
+
+
+class CompactProfile:
+    """
+    The numeric stats of a profile stored in typed arrays, one row per stat.
+    """
+    __slots__ = ('names', 'mode', 'hero', 'category', 'stat', 'value', 'kind', '_rows', '_indexed')
+
+    def __init__(self, names=None):
+        self.names = names if names is not None else NAMES
+        self.mode = array.array('B')
+        self.hero = array.array('I')
+        self.category = array.array('I')
+        self.stat = array.array('I')
+        self.value = array.array('d')
+        self.kind = array.array('B')
+        # (mode, hero, category, stat) codes -> row of the first _indexed rows, extended by get() with the rows added
+        # since it last ran.
+        self._rows = {}
+        self._indexed = 0
+
+    @classmethod
+    def from_model(cls, model, names=None):
+        """
+        Build a CompactProfile from the _model dictionary of a PlayerProfile.
+        """
+        compact = cls(names)
+        for mode, mode_dict in model[over_stats.MODES].items():
+            for comparison_type, comparison in mode_dict[over_stats.COMPARISON].items():
+                # Sections that were not found on the page are stored as empty lists.
+                for hero, value in (comparison or {}).items():
+                    compact.append(mode, hero, over_stats.COMPARISON, comparison_type, value)
+            for hero, categories in mode_dict[over_stats.STATS].items():
+                for category, stats in (categories or {}).items():
+                    for stat_name, value in stats.items():
+                        compact.append(mode, hero, category, stat_name, value)
+        return compact
+
+    def append(self, mode, hero, category, stat_name, value):
+        """
+        Add a row. value is converted with compact_value().
+        """
+        value, kind = compact_value(value)
+        code = self.names.code
+        self.mode.append(over_stats.MODE_LIST.index(mode))
+        self.hero.append(code(hero))
+        self.category.append(code(category))
+        self.stat.append(code(stat_name))
+        self.value.append(value)
+        self.kind.append(kind)
+
+    def get(self, mode, hero, category, stat_name):
+        """
+        Get a value as a float. Durations are in seconds and missing values are None. Raises DataNotFound if the
+        profile does not have the stat. Rows are found through an index built the first time get() is called.
+        """
+        rows = self._rows
+        # Rows can be appended to the arrays directly, they are indexed when they are first looked up.
+        for row in range(self._indexed, len(self.value)):
+            rows.setdefault((self.mode[row], self.hero[row], self.category[row], self.stat[row]), row)
+        self._indexed = len(self.value)
+        codes = (over_stats.MODE_LIST.index(mode), self.names.find(hero), self.names.find(category),
+                 self.names.find(stat_name))
+        row = rows.get(codes)
+        if row is None:
+            raise over_stats.errors.DataNotFound('Data not available')
+        return None if self.kind[row] == KIND_MISSING else self.value[row]
+
+    def rows(self):
+        """
+        Generate (mode, hero, category, stat_name, value, kind) tuples with the names decoded.
+        """
+        name = self.names.name
+        for row in range(len(self.value)):
+            value = None if self.kind[row] == KIND_MISSING else self.value[row]
+            yield (over_stats.MODE_LIST[self.mode[row]], name(self.hero[row]), name(self.category[row]),
+                   name(self.stat[row]), value, self.kind[row])
+
+    @property
+    def nbytes(self):
+        """
+        Get the number of bytes used by the arrays.
+        """
+        return sum(column.itemsize * len(column) for column in
+                   (self.mode, self.hero, self.category, self.stat, self.value, self.kind))
+
+    def to_arrays(self):
+        """
+        Get the columns as a dictionary of NumPy arrays. mode is an index into over_stats.MODE_LIST, hero, category
+        and stat are codes into the NameTable, value is float64 with NaN for missing values and kind is one of the KIND
+        constants. The arrays share memory with this profile.
+        """
+        import numpy
+        return {name: numpy.frombuffer(column, dtype=column.typecode) if len(column) else
+                numpy.zeros(0, dtype=column.typecode)
+                for name, column in (('mode', self.mode), ('hero', self.hero), ('category', self.category),
+                                     ('stat', self.stat), ('value', self.value), ('kind', self.kind))}
+
+    def to_frame(self):
+        """
+        Get the stats as a pandas DataFrame with one row per stat and the names decoded into categoricals. It needs
+        pandas, install over_stats[pandas].
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError('to_frame() needs pandas, install it with "pip install over_stats[pandas]"')
+        arrays = self.to_arrays()
+        names = self.names.names()
+        frame = {'mode': pandas.Categorical.from_codes(arrays['mode'].astype('int64'), over_stats.MODE_LIST)}
+        for column in ('hero', 'category', 'stat'):
+            codes = arrays[column].astype('int64')
+            frame[column] = pandas.Categorical.from_codes(codes, names).remove_unused_categories()
+        frame['value'] = arrays['value']
+        frame['kind'] = arrays['kind']
+        return pandas.DataFrame(frame)
+
+    def __len__(self):
+        return len(self.value)
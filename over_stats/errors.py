@@ -15,3 +15,11 @@ class DataNotFound(Exception):
 
 class InvalidBattletag(Exception):
     pass
+
+
+class DataNotLoaded(Exception):
+    pass
+
+
+class InvalidFormat(Exception):
+    pass
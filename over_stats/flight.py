@@ -0,0 +1,29 @@
+"""
+Single flight of a piece of work shared by several threads.
+
+The first thread that needs a result creates a Flight and does the work, the threads that need the same result while
+it is running wait for the Flight instead of doing the work again. Both PlayerProfile.load_data() and the
+ProfileRegistry load profiles this way.
+"""
+import threading
+
+
+class Flight:
+    """
+    Work in progress. The thread that does the work sets result or error and then calls finish(), the other threads
+    call wait() and get the same result or error.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def finish(self):
+        self.done.set()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
@@ -0,0 +1,247 @@
+"""
+History of the stats of tracked players, stored in SQLite.
+
+Each time a profile is recorded, its numeric stats are compared with the last values stored for the player and only
+the stats that changed are written, one row per (player, mode, hero, category, stat, timestamp). Hourly and daily
+rollups (the first, last, lowest and highest value of each bucket and the number of changes) are updated while the
+snapshot is written, so trends are read without going through the samples:
+
+    history = over_stats.history.History('history.db')
+    history.record(over_stats.PlayerProfile('zappis#21285'))
+    ...
+    times, values = history.series(over_stats.PLAT_PC, 'zappis#21285', over_stats.MODE_CP, 'ALL HEROES', 'Game',
+                                   'Games Won')
+    daily = history.rollup(over_stats.PLAT_PC, 'zappis#21285', over_stats.MODE_CP, 'ALL HEROES', 'Game', 'Games Won',
+                           over_stats.history.DAY)
+
+Values are converted like in over_stats.columnar: they are floats, durations are in seconds and missing values are
+NaN. Comparisons are stored with over_stats.COMPARISON as their category and the comparison type as their stat.
+Timestamps are seconds since the epoch and buckets start at a multiple of their period, in UTC.
+"""
+import array
+import math
+import sqlite3
+import threading
+import time
+
+import over_stats
+import over_stats.columnar
+import over_stats.errors
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+PERIODS = (HOUR, DAY)
+
+
+class History:
+    """
+    Store of the history of many players in the SQLite database at path, it can be shared by several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS players (id INTEGER PRIMARY KEY, platform TEXT NOT NULL, '
+                         'battletag TEXT NOT NULL, recorded_at REAL, snapshots INTEGER NOT NULL DEFAULT 0, '
+                         'UNIQUE (platform, battletag))')
+        self._db.execute('CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY, mode TEXT NOT NULL, '
+                         'hero TEXT NOT NULL, category TEXT NOT NULL, stat TEXT NOT NULL, '
+                         'UNIQUE (mode, hero, category, stat))')
+        # The value of every stat of every player each time it changed. kind is an over_stats.columnar KIND.
+        self._db.execute('CREATE TABLE IF NOT EXISTS samples (player INTEGER NOT NULL, stat INTEGER NOT NULL, '
+                         'time REAL NOT NULL, value REAL, kind INTEGER NOT NULL, PRIMARY KEY (player, stat, time)) '
+                         'WITHOUT ROWID')
+        # The last sample of every stat of every player, to find the values that changed.
+        self._db.execute('CREATE TABLE IF NOT EXISTS latest (player INTEGER NOT NULL, stat INTEGER NOT NULL, '
+                         'value REAL, kind INTEGER NOT NULL, PRIMARY KEY (player, stat)) WITHOUT ROWID')
+        self._db.execute('CREATE TABLE IF NOT EXISTS rollups (player INTEGER NOT NULL, stat INTEGER NOT NULL, '
+                         'period INTEGER NOT NULL, bucket INTEGER NOT NULL, first REAL, last REAL, low REAL, '
+                         'high REAL, changes INTEGER NOT NULL, PRIMARY KEY (player, stat, period, bucket)) '
+                         'WITHOUT ROWID')
+        # (mode, hero, category, stat) -> id of the stat
+        self._stat_ids = {}
+
+    # Recording
+
+    def record(self, profile, timestamp=None):
+        """
+        Record the stats of a PlayerProfile, which is loaded if needed, at timestamp, now by default. Returns the
+        number of stats that changed since the last snapshot of the player.
+        """
+        return self.record_model(profile._platform, profile.battletag, profile.raw_data, timestamp)
+
+    def record_model(self, platform, battletag, model, timestamp=None):
+        """
+        Record the stats of a _model dictionary. Snapshots of a player have to be recorded in chronological order,
+        an older snapshot raises InvalidArgument.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        rows = over_stats.columnar.CompactProfile.from_model(model).rows()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                changed = self._record(platform, battletag, rows, timestamp)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                # Stats inserted by this snapshot were rolled back with it.
+                self._stat_ids.clear()
+                raise
+            self._db.execute('COMMIT')
+        return changed
+
+    def _record(self, platform, battletag, rows, timestamp):
+        db = self._db
+        player = self._player_id(platform, battletag)
+        recorded_at = db.execute('SELECT recorded_at FROM players WHERE id = ?', (player,)).fetchone()[0]
+        if recorded_at is not None and timestamp < recorded_at:
+            raise over_stats.errors.InvalidArgument(f'A snapshot of {platform}/{battletag} taken after {timestamp} '
+                                                    f'was already recorded')
+        latest = {stat: (value, kind) for stat, value, kind in
+                  db.execute('SELECT stat, value, kind FROM latest WHERE player = ?', (player,))}
+        samples = []
+        seen = set()
+        for mode, hero, category, stat_name, value, kind in rows:
+            stat = self._stat_id((mode, hero, category, stat_name))
+            seen.add(stat)
+            if latest.get(stat) != (value, kind):
+                samples.append((player, stat, timestamp, value, kind))
+        for stat, (value, kind) in latest.items():
+            # A stat that is no longer on the page is recorded as missing.
+            if stat not in seen and kind != over_stats.columnar.KIND_MISSING:
+                samples.append((player, stat, timestamp, None, over_stats.columnar.KIND_MISSING))
+
+        db.executemany('INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)', samples)
+        db.executemany('INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?)',
+                       [(player, stat, value, kind) for player, stat, _, value, kind in samples])
+        for period in PERIODS:
+            bucket = int(timestamp // period * period)
+            db.executemany('INSERT OR IGNORE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                           [(player, stat, period, bucket, value, value, value, value)
+                            for player, stat, _, value, _ in samples])
+            # min() and max() of SQLite return NULL if any argument is NULL, missing values do not change the bounds.
+            db.executemany('UPDATE rollups SET last = ?1, low = min(coalesce(low, ?1), coalesce(?1, low)), '
+                           'high = max(coalesce(high, ?1), coalesce(?1, high)), changes = changes + 1 '
+                           'WHERE player = ?2 AND stat = ?3 AND period = ?4 AND bucket = ?5',
+                           [(value, player, stat, period, bucket) for player, stat, _, value, _ in samples])
+        db.execute('UPDATE players SET recorded_at = ?, snapshots = snapshots + 1 WHERE id = ?', (timestamp, player))
+        return len(samples)
+
+    def _player_id(self, platform, battletag, create=True):
+        if create:
+            self._db.execute('INSERT OR IGNORE INTO players (platform, battletag) VALUES (?, ?)', (platform, battletag))
+        row = self._db.execute('SELECT id FROM players WHERE platform = ? AND battletag = ?',
+                               (platform, battletag)).fetchone()
+        if row is None:
+            raise over_stats.errors.DataNotFound('Data not available')
+        return row[0]
+
+    def _stat_id(self, key, create=True):
+        stat = self._stat_ids.get(key)
+        if stat is None:
+            if create:
+                self._db.execute('INSERT OR IGNORE INTO stats (mode, hero, category, stat) VALUES (?, ?, ?, ?)', key)
+            row = self._db.execute('SELECT id FROM stats WHERE mode = ? AND hero = ? AND category = ? AND stat = ?',
+                                   key).fetchone()
+            if row is None:
+                raise over_stats.errors.DataNotFound('Data not available')
+            stat = self._stat_ids[key] = row[0]
+        return stat
+
+    # Queries
+
+    def series(self, platform, battletag, mode, hero, category, stat_name, start=None, end=None):
+        """
+        Get the samples of a stat between start and end, inclusive, as two arrays of doubles: the timestamps at which
+        the value changed and the values. Raises DataNotFound if the player or the stat were never recorded.
+        """
+        with self._lock:
+            player = self._player_id(platform, battletag, False)
+            stat = self._stat_id((mode, hero, category, stat_name), False)
+            rows = self._db.execute('SELECT time, value FROM samples WHERE player = ? AND stat = ? AND time >= ? '
+                                    'AND time <= ? ORDER BY time',
+                                    (player, stat, -math.inf if start is None else start,
+                                     math.inf if end is None else end)).fetchall()
+        times = array.array('d', [row[0] for row in rows])
+        values = array.array('d', [math.nan if row[1] is None else row[1] for row in rows])
+        return times, values
+
+    def rollup(self, platform, battletag, mode, hero, category, stat_name, period=DAY, start=None, end=None):
+        """
+        Get the buckets of period seconds, HOUR or DAY, of a stat between start and end. Returns a dictionary of
+        arrays: bucket (the timestamp at which each bucket starts), first, last, low and high values and changes, the
+        number of samples in the bucket. A stat keeps its last value in the buckets in which it did not change, they
+        hold that value and 0 changes. The buckets start at start if the stat had a value before it, otherwise at its
+        first change, and end at end, or at its last change if end is None.
+        """
+        if period not in PERIODS:
+            raise over_stats.errors.InvalidArgument(f'period={period} is invalid')
+        first_bucket = None if start is None else start // period * period
+        with self._lock:
+            player = self._player_id(platform, battletag, False)
+            stat = self._stat_id((mode, hero, category, stat_name), False)
+            rows = self._db.execute('SELECT bucket, first, last, low, high, changes FROM rollups WHERE player = ? '
+                                    'AND stat = ? AND period = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket',
+                                    (player, stat, period, -math.inf if start is None else first_bucket,
+                                     math.inf if end is None else end)).fetchall()
+            previous = None
+            if start is not None:
+                previous = self._db.execute('SELECT last FROM rollups WHERE player = ? AND stat = ? AND period = ? '
+                                            'AND bucket < ? ORDER BY bucket DESC LIMIT 1',
+                                            (player, stat, period, first_bucket)).fetchone()
+        columns = {'bucket': array.array('q'), 'first': array.array('d'), 'last': array.array('d'),
+                   'low': array.array('d'), 'high': array.array('d'), 'changes': array.array('q')}
+        if previous is not None:
+            bucket, last = first_bucket, previous[0]
+        elif rows:
+            bucket, last = rows[0][0], None
+        else:
+            return columns
+        if end is not None:
+            last_bucket = end // period * period
+        else:
+            last_bucket = rows[-1][0] if rows else bucket
+        rows = iter(rows)
+        row = next(rows, None)
+        while bucket <= last_bucket:
+            if row is not None and row[0] == bucket:
+                values = row
+                last = row[2]
+                row = next(rows, None)
+            else:
+                values = (bucket, last, last, last, last, 0)
+            for column, value in zip(columns.values(), values):
+                column.append(math.nan if value is None else value)
+            bucket += period
+        return columns
+
+    def latest(self, platform, battletag):
+        """
+        Get the last recorded value of every stat of a player as a dictionary keyed by (mode, hero, category,
+        stat_name). Missing values are None.
+        """
+        with self._lock:
+            player = self._player_id(platform, battletag, False)
+            rows = self._db.execute('SELECT mode, hero, category, stats.stat, value FROM latest JOIN stats '
+                                    'ON stats.id = latest.stat WHERE player = ?', (player,)).fetchall()
+        return {tuple(row[:4]): row[4] for row in rows}
+
+    def players(self):
+        """
+        Get a list of (platform, battletag, recorded_at, snapshots) for every player that was recorded.
+        """
+        with self._lock:
+            return self._db.execute('SELECT platform, battletag, recorded_at, snapshots FROM players '
+                                    'ORDER BY platform, battletag').fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
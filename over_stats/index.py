@@ -0,0 +1,115 @@
+"""
+Secondary indexes over the _model of a profile.
+
+The _model is nested by mode, hero, category and stat name, so it answers stats(mode, hero, category, stat_name) but
+finding every hero that has a stat, the comparisons of a hero or the type of an achievement means walking all of it.
+A ProfileIndex walks the model once and keeps dictionaries for those questions:
+
+    index = player_data.index()
+    index.stat_locations(over_stats.MODE_CP, 'Solo Kills')     # ((hero, category, value), ...)
+    index.hero_comparisons(over_stats.MODE_CP, 'Reaper')       # {comparison_type: value}
+    index.achievement('Decorated')                              # (achievement_type, over_stats.ACH_EARNED)
+
+The keys of each level of the model are kept as tuples, so listing them does not build a new list each time. Every
+query is a dictionary lookup. The values are the ones stored in the model, the index does not copy them.
+"""
+import over_stats
+import over_stats.errors
+
+
+class ProfileIndex:
+    """
+    The indexes of one _model. It is built by PlayerProfile.index() and rebuilt when the profile loads a new model.
+    """
+    __slots__ = ('model', '_stats', '_comparisons', '_achievements', '_keys')
+
+    def __init__(self, model):
+        self.model = model
+        # (mode, hero) -> {comparison_type: value}
+        self._comparisons = {}
+        # achievement name -> (achievement_type, ACH_EARNED or ACH_MISSING)
+        self._achievements = {}
+        # path in the model -> tuple of the keys at that path
+        self._keys = {}
+
+        stats = {}
+        keys = self._keys
+        modes = model[over_stats.MODES]
+        keys[()] = tuple(modes)
+        for mode, mode_dict in modes.items():
+            comparison_types = mode_dict[over_stats.COMPARISON]
+            keys[(mode, over_stats.COMPARISON)] = tuple(comparison_types)
+            for comparison_type, comparison in comparison_types.items():
+                # Sections that were not found on the page are stored as empty lists.
+                comparison = comparison or {}
+                keys[(mode, over_stats.COMPARISON, comparison_type)] = tuple(comparison)
+                for hero, value in comparison.items():
+                    hero_comparisons = self._comparisons.get((mode, hero))
+                    if hero_comparisons is None:
+                        hero_comparisons = self._comparisons[(mode, hero)] = {}
+                    hero_comparisons[comparison_type] = value
+            heroes = mode_dict[over_stats.STATS]
+            keys[(mode, over_stats.STATS)] = tuple(heroes)
+            for hero, categories in heroes.items():
+                categories = categories or {}
+                keys[(mode, over_stats.STATS, hero)] = tuple(categories)
+                for category, category_stats in categories.items():
+                    keys[(mode, over_stats.STATS, hero, category)] = tuple(category_stats)
+                    for stat_name, value in category_stats.items():
+                        locations = stats.get((mode, stat_name))
+                        if locations is None:
+                            locations = stats[(mode, stat_name)] = []
+                        locations.append((hero, category, value))
+        # (mode, stat_name) -> ((hero, category, value), ...)
+        self._stats = {key: tuple(locations) for key, locations in stats.items()}
+
+        achievement_types = model[over_stats.ACHIEVEMENTS]
+        keys[(over_stats.ACHIEVEMENTS,)] = tuple(achievement_types)
+        for achievement_type, lists in achievement_types.items():
+            for list_name in (over_stats.ACH_EARNED, over_stats.ACH_MISSING):
+                for name in (lists or {}).get(list_name, ()):
+                    self._achievements[name] = (achievement_type, list_name)
+
+    def keys(self, *path):
+        """
+        Get the tuple of keys of the model at path, for example keys(mode, over_stats.STATS, hero) are the categories
+        of a hero. Raises DataNotFound if the model has no such path.
+        """
+        try:
+            return self._keys[path]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
+
+    def stat_locations(self, mode, stat_name):
+        """
+        Get every (hero, category, value) that has the stat in the mode.
+        """
+        try:
+            return self._stats[(mode, stat_name)]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
+
+    def stat_categories(self, mode, stat_name):
+        """
+        Get the categories that hold the stat in the mode, in the order they were first found.
+        """
+        return tuple(dict.fromkeys(category for _, category, _ in self.stat_locations(mode, stat_name)))
+
+    def hero_comparisons(self, mode, hero):
+        """
+        Get the value of the hero in every comparison type of the mode as a dictionary, do not modify it.
+        """
+        try:
+            return self._comparisons[(mode, hero)]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
+
+    def achievement(self, name):
+        """
+        Get the (achievement_type, list_name) of an achievement, list_name is over_stats.ACH_EARNED or
+        over_stats.ACH_MISSING.
+        """
+        try:
+            return self._achievements[name]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
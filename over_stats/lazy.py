@@ -0,0 +1,193 @@
+"""
+Lazy model for profiles that only need a few sections of the career page.
+
+When the page is downloaded it is only scanned for the position of each game mode, each dropdown and each div with a
+data-category-id, which is much cheaper than reading every element. Each section (the comparisons of a game mode, the
+career stats of a hero, an achievement type, ...) is parsed the first time it is accessed and then kept. The model is
+a tree of LazySections that can be used like the dictionaries of the _model, materialize() converts it into them.
+"""
+import collections.abc
+import re
+import threading
+
+import over_stats
+import over_stats.errors
+import over_stats.parser
+import over_stats.values
+
+DIV_TAG = re.compile(r'<(/?)div\b([^>]*)>', re.IGNORECASE)
+SELECT_TAG = re.compile(r'<select\b[^>]*\bdata-group-id\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+SELECT_END = re.compile(r'</select\s*>', re.IGNORECASE)
+ID_ATTRIBUTE = re.compile(r'(?:^|\s)id\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+CATEGORY_ATTRIBUTE = re.compile(r'\bdata-category-id\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+MATERIALIZE_LOCK = threading.Lock()
+
+
+class LazySection(collections.abc.Mapping):
+    """
+    A read only mapping whose keys are known up front and whose values are built the first time they are accessed.
+    loaders maps each key to a function without arguments that returns its value.
+    """
+
+    def __init__(self, loaders):
+        self._loaders = loaders
+        self._values = {}
+        self._materialized = None
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            # Threads that build the same value at the same time all get the one that was stored first.
+            return self._values.setdefault(key, self._loaders[key]())
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def materialize(self):
+        """
+        Build every value and return the section as a dictionary.
+        """
+        if self._materialized is None:
+            materialized = {key: materialize(self[key]) for key in self._loaders}
+            # Threads that materialize the section at the same time all get the dictionary that was stored first.
+            with MATERIALIZE_LOCK:
+                if self._materialized is None:
+                    self._materialized = materialized
+        return self._materialized
+
+
+def materialize(value):
+    """
+    Convert a LazySection into dictionaries. Any other value is returned unchanged.
+    """
+    if isinstance(value, LazySection):
+        return value.materialize()
+    return value
+
+
+class PageMap:
+    """
+    Position of the sections of a career page. The page is scanned for <div> and <select> tags only, the text inside
+    a section is not read until the section is indexed.
+    """
+
+    def __init__(self, page, parser=None):
+        self.page = page
+        self.parser = parser
+        self.modes = {}
+        self.blocks = {}
+        self.dropdowns = {}
+        stack = []
+        for match in DIV_TAG.finditer(page):
+            if not match.group(1):
+                attrs = match.group(2)
+                if attrs.endswith('/'):
+                    continue
+                landmark = None
+                # Most divs only have a class, skip the attribute search for them.
+                if 'id' in attrs:
+                    element_id = ID_ATTRIBUTE.search(attrs)
+                    if element_id is not None and element_id.group(1) in over_stats.MODE_LIST:
+                        landmark = (self.modes, element_id.group(1))
+                    category_id = CATEGORY_ATTRIBUTE.search(attrs)
+                    if category_id is not None:
+                        landmark = (self.blocks, category_id.group(1))
+                stack.append((match.start(), landmark))
+            elif stack:
+                start, landmark = stack.pop()
+                if landmark is not None:
+                    sections, key = landmark
+                    sections.setdefault(key, []).append((start, match.end()))
+        # Any div that was left open runs until the end of the page.
+        for start, landmark in stack:
+            if landmark is not None:
+                sections, key = landmark
+                sections.setdefault(key, []).append((start, len(page)))
+        for match in SELECT_TAG.finditer(page):
+            end = SELECT_END.search(page, match.end())
+            self.dropdowns.setdefault(match.group(1), []).append(
+                (match.start(), end.end() if end is not None else len(page)))
+
+    def scope(self, mode):
+        """
+        Get the (start, end) of the game mode, or None if the player has no data for it.
+        """
+        spans = self.modes.get(mode, [])
+        if len(spans) == 0:
+            return None
+        if len(spans) != 1:
+            raise over_stats.errors.UnexpectedBehaviour('Finding the element for this game mode returned more than 1 element')
+        return spans[0]
+
+    def index(self, span):
+        """
+        Index the part of the page inside span.
+        """
+        start, end = span
+        return over_stats.parser.index_page(self.page[start:end], self.parser)
+
+    def find_blocks(self, category_id, scope=None):
+        """
+        Index the Blocks that match the category_id. If scope is None the whole page is searched.
+        """
+        blocks = []
+        for span in within(self.blocks.get(category_id, []), scope):
+            blocks.append(self.index(span).find_blocks(category_id)[0])
+        return blocks
+
+    def find_dropdowns(self, group_id, scope=None):
+        """
+        Index the Dropdowns that match the group_id. If scope is None the whole page is searched.
+        """
+        return [self.index(span).find_dropdowns(group_id)[0]
+                for span in within(self.dropdowns.get(group_id, []), scope)]
+
+
+def within(spans, scope):
+    """
+    Keep the spans that are inside scope.
+    """
+    if scope is None:
+        return spans
+    scope_start, scope_end = scope
+    return [(start, end) for start, end in spans if scope_start < start and end <= scope_end]
+
+
+def lazy_model(page, use_decimal=False, parser=None, use_seconds=False):
+    """
+    Build a LazySection with the same structure as the _model dictionary built by parse_career_page().
+    """
+    page_map = PageMap(over_stats.parser.decode_page(page), parser)
+    convert = over_stats.values.ValueConverter(use_decimal, use_seconds)
+
+    def mode_section(scope):
+        def comparisons():
+            options = over_stats.parser.dropdown_options(page_map.find_dropdowns(over_stats.COMPARISON, scope))
+            return LazySection({name: section(over_stats.parser.comparison_stats, value, scope, convert)
+                                for name, value in options.items()})
+
+        def heroes():
+            options = over_stats.parser.dropdown_options(page_map.find_dropdowns(over_stats.STATS, scope))
+            return LazySection({name: section(over_stats.parser.hero_stats, value, scope, convert)
+                                for name, value in options.items()})
+
+        return LazySection({over_stats.COMPARISON: comparisons, over_stats.STATS: heroes})
+
+    def section(build, category_id, scope, *args):
+        return lambda: build(page_map.find_blocks(category_id, scope), *args)
+
+    def achievements():
+        options = over_stats.parser.dropdown_options(page_map.find_dropdowns(over_stats.ACHIEVEMENTS))
+        return LazySection({name: section(over_stats.parser.achievement_list, value, None)
+                            for name, value in options.items()})
+
+    modes = {}
+    for mode in over_stats.MODE_LIST:
+        scope = page_map.scope(mode)
+        if scope is not None:
+            modes[mode] = (lambda scope: lambda: mode_section(scope))(scope)
+    return LazySection({over_stats.MODES: lambda: LazySection(modes), over_stats.ACHIEVEMENTS: achievements})
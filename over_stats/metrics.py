@@ -0,0 +1,307 @@
+"""
+Instrumentation of the load and parse phases.
+
+Every phase of loading a profile is timed and reported to a metrics sink, together with the size of the page and the
+number of elements that were found in it:
+
+    collector = over_stats.metrics.MemoryCollector()
+    player_data = over_stats.PlayerProfile('zappis#21285', metrics=collector)
+    player_data.raw_data
+    print(over_stats.metrics.prometheus_text(collector))
+
+A sink can also be installed for every profile with set_default_sink(). When there is no sink nothing is measured,
+the only cost left is a check for None in each phase.
+
+Timings are in seconds:
+    fetch                download the page (DNS, connection and HTTP)
+    decode               convert the body into text
+    index                tokenize the page and file its elements, or build the DOM for requests_html
+    parse.comparisons    build the comparison sections of a game mode
+    parse.stats          build the career stats of every hero of a game mode
+    parse.achievements   build the achievement sections
+    stream               download and parse a page in streaming mode, the phases overlap
+    load                 load_data_if_needed from start to end
+    refresh              refresh from start to end
+
+Counters:
+    bytes                size of the downloaded pages
+    elements.blocks, elements.cards, elements.achievement_cards, elements.dropdowns
+                         elements found on the pages
+    refresh.parsed, refresh.reused
+                         sections parsed again and sections taken from the previous model by refresh
+"""
+import socket
+import threading
+import time
+
+FETCH = 'fetch'
+DECODE = 'decode'
+INDEX = 'index'
+PARSE_COMPARISONS = 'parse.comparisons'
+PARSE_STATS = 'parse.stats'
+PARSE_ACHIEVEMENTS = 'parse.achievements'
+STREAM = 'stream'
+LOAD = 'load'
+REFRESH = 'refresh'
+BYTES = 'bytes'
+BLOCKS = 'elements.blocks'
+CARDS = 'elements.cards'
+ACHIEVEMENT_CARDS = 'elements.achievement_cards'
+DROPDOWNS = 'elements.dropdowns'
+SECTIONS_PARSED = 'refresh.parsed'
+SECTIONS_REUSED = 'refresh.reused'
+
+TIMING = 'timing'
+COUNT = 'count'
+
+
+class Sink:
+    """
+    Base class for metrics sinks. Sinks can be called from several threads at the same time.
+    """
+
+    def timing(self, name, seconds):
+        """
+        Record that the phase name took seconds.
+        """
+        raise NotImplementedError
+
+    def count(self, name, value=1):
+        """
+        Add value to the counter name.
+        """
+        raise NotImplementedError
+
+
+class CallbackSink(Sink):
+    """
+    Sends every measurement to callback(kind, name, value), kind is TIMING or COUNT.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def timing(self, name, seconds):
+        self.callback(TIMING, name, seconds)
+
+    def count(self, name, value=1):
+        self.callback(COUNT, name, value)
+
+
+class EventRecorder(Sink):
+    """
+    Keeps every measurement as a (kind, name, value) tuple, so they can be sent to another sink with replay(). This
+    is used to bring back the measurements taken in a worker process.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def timing(self, name, seconds):
+        self.events.append((TIMING, name, seconds))
+
+    def count(self, name, value=1):
+        self.events.append((COUNT, name, value))
+
+
+def replay(events, sink):
+    """
+    Send the (kind, name, value) tuples recorded by an EventRecorder to sink.
+    """
+    for kind, name, value in events:
+        if kind == TIMING:
+            sink.timing(name, value)
+        else:
+            sink.count(name, value)
+
+
+class TimingStats:
+    """
+    Summary of the timings recorded for a phase.
+    """
+    __slots__ = ('count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class MemoryCollector(Sink):
+    """
+    Keeps a TimingStats for every phase and the value of every counter in memory.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def timing(self, name, seconds):
+        with self._lock:
+            stats = self.timings.get(name)
+            if stats is None:
+                stats = self.timings[name] = TimingStats()
+            stats.add(seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        Get a dictionary with the summary of every timing and the value of every counter.
+        """
+        with self._lock:
+            return {
+                'timings': {name: {'count': stats.count, 'total': stats.total, 'mean': stats.mean, 'min': stats.min,
+                                   'max': stats.max} for name, stats in self.timings.items()},
+                'counters': dict(self.counters),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+
+def metric_name(name, prefix):
+    return (prefix + '_' if prefix else '') + name.replace('.', '_')
+
+
+def prometheus_text(collector, prefix='over_stats'):
+    """
+    Format the contents of a MemoryCollector in the Prometheus text exposition format. Timings are exported as
+    summaries in seconds and counters as counters.
+    """
+    snapshot = collector.snapshot()
+    lines = []
+    for name, stats in sorted(snapshot['timings'].items()):
+        metric = metric_name(name, prefix) + '_seconds'
+        lines.append(f'# TYPE {metric} summary')
+        lines.append(f'{metric}_sum {stats["total"]!r}')
+        lines.append(f'{metric}_count {stats["count"]}')
+    for name, value in sorted(snapshot['counters'].items()):
+        metric = metric_name(name, prefix) + '_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def statsd_line(kind, name, value, prefix='over_stats'):
+    """
+    Format a measurement in the StatsD line protocol. Timings are sent in milliseconds.
+    """
+    name = (prefix + '.' if prefix else '') + name
+    if kind == TIMING:
+        return f'{name}:{value * 1000:.3f}|ms'
+    return f'{name}:{value}|c'
+
+
+class StatsDSink(Sink):
+    """
+    Sends every measurement to a StatsD server over UDP. Sending never raises, measurements that cannot be sent are
+    lost.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='over_stats'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, kind, name, value):
+        try:
+            self._socket.sendto(statsd_line(kind, name, value, self.prefix).encode('ascii'), self.address)
+        except OSError:
+            pass
+
+    def timing(self, name, seconds):
+        self.send(TIMING, name, seconds)
+
+    def count(self, name, value=1):
+        self.send(COUNT, name, value)
+
+    def close(self):
+        self._socket.close()
+
+
+class Timer:
+    """
+    Context manager that reports the time spent inside it to a sink.
+    """
+    __slots__ = ('sink', 'name', 'start_time')
+
+    def __init__(self, sink, name):
+        self.sink = sink
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sink.timing(self.name, time.perf_counter() - self.start_time)
+
+
+class NullTimer:
+    """
+    Context manager used when there is no sink, it does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def timer(sink, name):
+    """
+    Get a context manager that times a phase, or one that does nothing if sink is None.
+    """
+    if sink is None:
+        return NULL_TIMER
+    return Timer(sink, name)
+
+
+def count_elements(sink, index):
+    """
+    Report the number of elements found in a PageIndex.
+    """
+    blocks = [block for category_blocks in index.blocks.values() for block in category_blocks]
+    sink.count(BLOCKS, len(blocks))
+    sink.count(CARDS, sum(len(block.cards) for block in blocks))
+    sink.count(ACHIEVEMENT_CARDS, sum(len(block.achievements) for block in blocks))
+    sink.count(DROPDOWNS, sum(len(dropdowns) for dropdowns in index.dropdowns.values()))
+
+
+_default_sink = None
+
+
+def set_default_sink(sink):
+    """
+    Install the sink used by every PlayerProfile that was not given one. None disables the measurements.
+    """
+    global _default_sink
+    _default_sink = sink
+
+
+def default_sink():
+    return _default_sink
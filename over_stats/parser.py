@@ -0,0 +1,544 @@
+"""
+Single pass parser for the career page.
+
+The page is walked once from top to bottom. Every div with a data-category-id, every .card-stat-block, every
+.achievement-card and every <select data-group-id> is filed into a PageIndex while the page is being read, together
+with the text it contains. The _model dictionary is then built from that index without searching the page again.
+
+The page can be tokenized by lxml or by the standard library html.parser. lxml is used when it is installed. The
+requests_html parser runs CSS selectors over the whole page and it is kept for compatibility.
+"""
+from html.parser import HTMLParser
+
+import over_stats
+import over_stats.errors
+import over_stats.metrics
+import over_stats.values
+
+# Elements that do not break the text into a new line, this mirrors how the text of an element is extracted when
+# using CSS selectors.
+INLINE_TAGS = frozenset(['a', 'abbr', 'b', 'bdi', 'bdo', 'cite', 'code', 'data', 'dfn', 'em', 'font', 'i', 'kbd',
+                         'label', 'mark', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'tt',
+                         'u', 'var'])
+VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                       'source', 'track', 'wbr'])
+RAW_TEXT_TAGS = frozenset(['script', 'style'])
+
+CARD_CLASS = 'card-stat-block'
+ACHIEVEMENT_CLASS = 'achievement-card'
+DISABLED_CLASS = 'm-disabled'
+
+
+class Block:
+    """
+    A div with a data-category-id attribute. scope is the game mode the div was found in, or None if it is not
+    inside a game mode.
+    """
+    __slots__ = ('category_id', 'scope', 'lines', 'cards', 'achievements')
+
+    def __init__(self, category_id, scope):
+        self.category_id = category_id
+        self.scope = scope
+        self.lines = []
+        self.cards = []
+        self.achievements = []
+
+
+class Card:
+    """
+    A .card-stat-block inside a Block. The first line is the title of the card followed by stat names and values.
+    """
+    __slots__ = ('lines',)
+
+    def __init__(self):
+        self.lines = []
+
+
+class AchievementCard:
+    """
+    An .achievement-card inside a Block.
+    """
+    __slots__ = ('lines', 'disabled')
+
+    def __init__(self, disabled):
+        self.lines = []
+        self.disabled = disabled
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+
+class Dropdown:
+    """
+    A <select> with a data-group-id attribute. options is a list of (text, value) tuples.
+    """
+    __slots__ = ('group_id', 'scope', 'options')
+
+    def __init__(self, group_id, scope):
+        self.group_id = group_id
+        self.scope = scope
+        self.options = []
+
+
+class Option:
+    """
+    An <option> that is still being read.
+    """
+    __slots__ = ('value', 'lines')
+
+    def __init__(self, value):
+        self.value = value
+        self.lines = []
+
+
+class PageIndex:
+    """
+    The elements of a career page that are needed to build the _model dictionary.
+    """
+
+    def __init__(self):
+        self.mode_counts = {}
+        self.blocks = {}
+        self.dropdowns = {}
+
+    def find_blocks(self, category_id, scope=None):
+        """
+        Get the list of Blocks that match the category_id. If scope is None the whole page is searched.
+        """
+        blocks = self.blocks.get(category_id, [])
+        if scope is None:
+            return blocks
+        return [block for block in blocks if block.scope == scope]
+
+    def find_dropdowns(self, group_id, scope=None):
+        """
+        Get the list of Dropdowns that match the group_id. If scope is None the whole page is searched.
+        """
+        dropdowns = self.dropdowns.get(group_id, [])
+        if scope is None:
+            return dropdowns
+        return [dropdown for dropdown in dropdowns if dropdown.scope == scope]
+
+
+class PageIndexer:
+    """
+    Receives the start, end and data events of the page and files the elements we care about into a PageIndex.
+    The event methods follow the parser target interface so the indexer is not tied to a specific tokenizer.
+    """
+
+    def __init__(self):
+        self.index = PageIndex()
+        self._stack = []
+        self._collectors = []
+        self._pieces = []
+        self._scope = None
+        self._blocks = 0
+        self._card = None
+        self._achievement = None
+        self._dropdown = None
+        self._raw_text = 0
+
+    def _flush(self):
+        """
+        Terminate the current line of text and hand it to every element that is collecting text.
+        """
+        if self._pieces:
+            line = ' '.join(''.join(self._pieces).split())
+            self._pieces = []
+            if line:
+                for collector in self._collectors:
+                    collector.lines.append(line)
+
+    def start(self, tag, attrs):
+        if tag not in INLINE_TAGS:
+            self._flush()
+        collector = None
+        previous_scope = self._scope
+        if tag == 'div':
+            element_id = attrs.get('id')
+            if element_id in over_stats.MODE_LIST:
+                self.index.mode_counts[element_id] = self.index.mode_counts.get(element_id, 0) + 1
+                self._scope = element_id
+            category_id = attrs.get('data-category-id')
+            if category_id is not None:
+                collector = Block(category_id, self._scope)
+                self.add_block(collector)
+                self._blocks += 1
+        if self._blocks:
+            classes = attrs.get('class')
+            if classes:
+                classes = classes.split()
+                if self._achievement is not None and DISABLED_CLASS in classes:
+                    self._achievement.disabled = True
+                if collector is None:
+                    if self._card is None and CARD_CLASS in classes:
+                        collector = self._card = Card()
+                        self._block().cards.append(collector)
+                    elif self._achievement is None and ACHIEVEMENT_CLASS in classes:
+                        collector = self._achievement = AchievementCard(DISABLED_CLASS in classes)
+                        self._block().achievements.append(collector)
+        if tag == 'select':
+            group_id = attrs.get('data-group-id')
+            if group_id is not None and self._dropdown is None:
+                collector = self._dropdown = Dropdown(group_id, self._scope)
+                self.index.dropdowns.setdefault(group_id, []).append(collector)
+        elif tag == 'option' and self._dropdown is not None and collector is None:
+            collector = Option(attrs.get('value'))
+        elif tag in RAW_TEXT_TAGS:
+            self._raw_text += 1
+
+        if collector is not None and collector is not self._dropdown:
+            self._collectors.append(collector)
+        entry = (tag, collector, previous_scope)
+        if tag in VOID_TAGS:
+            self._close(entry)
+        else:
+            self._stack.append(entry)
+
+    def end(self, tag):
+        # Find the element that is being closed. Any element opened after it was left unclosed in the page and it
+        # is closed now as well. End tags without a matching start tag are ignored.
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                break
+        else:
+            return
+        if tag not in INLINE_TAGS:
+            self._flush()
+        while len(self._stack) > position:
+            self._close(self._stack.pop())
+
+    def data(self, text):
+        if self._collectors and not self._raw_text:
+            self._pieces.append(text)
+
+    def close(self):
+        self._flush()
+        while self._stack:
+            self._close(self._stack.pop())
+        return self.index
+
+    def add_block(self, block):
+        """
+        Called when a Block is opened. The block is filed into the index.
+        """
+        self.index.blocks.setdefault(block.category_id, []).append(block)
+
+    def block_closed(self, block):
+        """
+        Called when all the text of a Block has been read.
+        """
+        pass
+
+    def scope_closed(self, scope):
+        """
+        Called when the element of a game mode is closed.
+        """
+        pass
+
+    def _block(self):
+        for collector in reversed(self._collectors):
+            if isinstance(collector, Block):
+                return collector
+
+    def _close(self, entry):
+        tag, collector, previous_scope = entry
+        if self._scope != previous_scope:
+            self.scope_closed(self._scope)
+        self._scope = previous_scope
+        if tag in RAW_TEXT_TAGS and tag not in VOID_TAGS:
+            self._raw_text -= 1
+        if collector is None:
+            return
+        if collector is self._dropdown:
+            self._dropdown = None
+            return
+        self._collectors.remove(collector)
+        if collector is self._card:
+            self._card = None
+        elif collector is self._achievement:
+            self._achievement = None
+        elif isinstance(collector, Block):
+            self._blocks -= 1
+            self.block_closed(collector)
+        elif isinstance(collector, Option):
+            self._dropdown.options.append(('\n'.join(collector.lines), collector.value))
+
+
+class StdlibTokenizer(HTMLParser):
+    """
+    Feeds the events produced by the standard library html.parser into a PageIndexer.
+    """
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self):
+        super().close()
+        return self.target.close()
+
+
+def decode_page(content, encoding=None):
+    """
+    Convert the body of the response into text. Career pages are served as utf-8 unless the response says otherwise.
+    """
+    if isinstance(content, str):
+        return content
+    return content.decode(encoding or 'utf-8', 'replace')
+
+
+def create_tokenizer(parser, target):
+    """
+    Create a tokenizer that sends the events of the page to target. The tokenizer has a feed() method and a close()
+    method that returns the result of target.close().
+    """
+    if parser == over_stats.PARSER_LXML:
+        import lxml.etree
+        return lxml.etree.HTMLParser(target=target)
+    if parser == over_stats.PARSER_STDLIB:
+        return StdlibTokenizer(target)
+    raise over_stats.errors.InvalidArgument(f'parser="{parser}" cannot be used to index a page')
+
+
+_default_parser = None
+
+
+def default_parser():
+    """
+    Get the fastest parser available. lxml is only imported the first time a page is parsed.
+    """
+    global _default_parser
+    if _default_parser is None:
+        try:
+            import lxml.etree
+            _default_parser = over_stats.PARSER_LXML
+        except ImportError:
+            _default_parser = over_stats.PARSER_STDLIB
+    return _default_parser
+
+
+def index_page(page, parser=None):
+    """
+    Walk the page once and return the PageIndex for it.
+    """
+    tokenizer = create_tokenizer(parser or default_parser(), PageIndexer())
+    tokenizer.feed(decode_page(page))
+    return tokenizer.close()
+
+
+def pairs(lines):
+    """
+    Iterate over a list of lines two at a time. Lines come in the form of ['dva' , '3' , 'reaper' , '6' , ....]
+    """
+    it = iter(lines)
+    return zip(it, it)
+
+
+MULTIPLE_COMPARISONS = 'Found multiple comparison stats for this value.'
+MULTIPLE_HEROES = 'Found multiple heros for this value.'
+MULTIPLE_ACHIEVEMENT_TYPES = 'Found multiple achievement types for this value.'
+
+
+def single(values, message):
+    """
+    Get the only value of a list, or None if the list is empty. message is raised as UnexpectedBehaviour when there is
+    more than one value.
+    """
+    if len(values) == 0:
+        return None
+    if len(values) != 1:
+        raise over_stats.errors.UnexpectedBehaviour(message)
+    return values[0]
+
+
+def comparison_stats(blocks, convert=None):
+    """
+    Convert the Block holding a comparison into a dictionary that uses a hero as it's key and the stat value as the
+    value. convert is the over_stats.values.ValueConverter of the page.
+    """
+    block = single(blocks, MULTIPLE_COMPARISONS)
+    if block is None:
+        return []
+    return comparison_values(block, convert)
+
+
+def comparison_values(block, convert=None):
+    """
+    Convert a single comparison Block into its dictionary.
+    """
+    convert = convert or over_stats.values.ValueConverter()
+    return convert.convert_pairs(pairs(block.lines))
+
+
+def hero_stats(blocks, convert=None):
+    """
+    Convert the Block holding the stat cards of a hero into a dictionary of stat categories names that link to a
+    dictionary of stat names and values. convert is the over_stats.values.ValueConverter of the page.
+    """
+    block = single(blocks, MULTIPLE_HEROES)
+    if block is None:
+        return []
+    return hero_values(block, convert)
+
+
+def hero_values(block, convert=None):
+    """
+    Convert a single hero Block into its dictionary.
+    """
+    convert = convert or over_stats.values.ValueConverter()
+    card_dict = {}
+    for card in block.cards:
+        if not card.lines:
+            continue
+        card_dict[card.lines[0]] = convert.convert_pairs(pairs(card.lines[1:]))
+    return card_dict
+
+
+def achievement_list(blocks):
+    """
+    Convert the Block holding an achievement type into a dictionary containing two lists, one for acquired and one for
+    missing achievements.
+    """
+    block = single(blocks, MULTIPLE_ACHIEVEMENT_TYPES)
+    if block is None:
+        return []
+    return achievement_values(block)
+
+
+def achievement_values(block):
+    """
+    Convert a single achievement type Block into its dictionary.
+    """
+    earned_achievement = []
+    missing_achievement = []
+    for achievement in block.achievements:
+        if achievement.disabled:
+            missing_achievement.append(achievement.text)
+        else:
+            earned_achievement.append(achievement.text)
+    return {over_stats.ACH_EARNED: earned_achievement, over_stats.ACH_MISSING: missing_achievement}
+
+
+def dropdown_options(dropdowns):
+    """
+    Convert the list of Dropdowns that matched a data-group-id into a dictionary that uses the option text as the key
+    and the option value as the value.
+    """
+    if len(dropdowns) == 0:
+        return {}
+    if len(dropdowns) > 1:
+        raise over_stats.errors.UnexpectedBehaviour('Found multiple dropdowns found.')
+    return dict(dropdowns[0].options)
+
+
+def mode_scope(index, mode):
+    """
+    Check that the page has exactly one element for this game mode. Returns False when the player has no data for it.
+    """
+    count = index.mode_counts.get(mode, 0)
+    if count == 0:
+        return False
+    if count != 1:
+        raise over_stats.errors.UnexpectedBehaviour('Finding the element for this game mode returned more than 1 element')
+    return True
+
+
+def build_model(index, use_decimal=False, metrics=None, use_seconds=False):
+    """
+    Build the _model dictionary from a PageIndex. The time spent building each group of sections is reported to the
+    metrics sink, if any.
+    """
+    timer = over_stats.metrics.timer
+    convert = over_stats.values.ValueConverter(use_decimal, use_seconds)
+    modes = {}
+    for mode in over_stats.MODE_LIST:
+        # If the player has not played in a mode, then the html element will be missing. We can safely skip it.
+        if not mode_scope(index, mode):
+            continue
+        with timer(metrics, over_stats.metrics.PARSE_COMPARISONS):
+            comparisons = dropdown_options(index.find_dropdowns(over_stats.COMPARISON, mode))
+            comparisons = {comp_name: comparison_stats(index.find_blocks(comp_value, mode), convert)
+                           for comp_name, comp_value in comparisons.items()}
+        with timer(metrics, over_stats.metrics.PARSE_STATS):
+            heroes = dropdown_options(index.find_dropdowns(over_stats.STATS, mode))
+            heroes = {hero_name: hero_stats(index.find_blocks(hero_value, mode), convert)
+                      for hero_name, hero_value in heroes.items()}
+        modes[mode] = {over_stats.COMPARISON: comparisons, over_stats.STATS: heroes}
+
+    with timer(metrics, over_stats.metrics.PARSE_ACHIEVEMENTS):
+        achievements = dropdown_options(index.find_dropdowns(over_stats.ACHIEVEMENTS))
+        achievements_dict = {achievement_type: achievement_list(index.find_blocks(achievement_type_value))
+                             for achievement_type, achievement_type_value in achievements.items()}
+    return {over_stats.MODES: modes, over_stats.ACHIEVEMENTS: achievements_dict}
+
+
+def selector_model(page, use_decimal=False, metrics=None, use_seconds=False):
+    """
+    Build the _model dictionary by running a CSS selector over the page for every dropdown option. This needs
+    requests_html.
+    """
+    import requests_html
+    timer = over_stats.metrics.timer
+    with timer(metrics, over_stats.metrics.INDEX):
+        html = requests_html.HTML(html=decode_page(page))
+        # The DOM is built the first time it is searched.
+        html_modes = {mode: html.find(f'div[id="{mode}"]') for mode in over_stats.MODE_LIST}
+    profile = over_stats.PlayerProfile
+    modes = {}
+    for mode in over_stats.MODE_LIST:
+        html_mode = html_modes[mode]
+        if len(html_mode) == 0:
+            continue
+        if len(html_mode) != 1:
+            raise over_stats.errors.UnexpectedBehaviour('Finding the element for this game mode returned more than 1 element')
+        html_mode = html_mode[0]
+        with timer(metrics, over_stats.metrics.PARSE_COMPARISONS):
+            comparisons = profile.get_dict_from_dropdown(over_stats.COMPARISON, html_mode)
+            comparisons = {comp_name: profile.generate_comparison_stats(html_mode, comp_value, use_decimal,
+                                                                                use_seconds)
+                           for comp_name, comp_value in comparisons.items()}
+        with timer(metrics, over_stats.metrics.PARSE_STATS):
+            heroes = profile.get_dict_from_dropdown(over_stats.STATS, html_mode)
+            heroes = {hero_name: profile.generate_hero_stats(html_mode, hero_value, use_decimal, use_seconds)
+                      for hero_name, hero_value in heroes.items()}
+        modes[mode] = {over_stats.COMPARISON: comparisons, over_stats.STATS: heroes}
+    with timer(metrics, over_stats.metrics.PARSE_ACHIEVEMENTS):
+        achievements = profile.get_dict_from_dropdown(over_stats.ACHIEVEMENTS, html)
+        achievements_dict = {achievement_type: profile.generate_achievement_list(html, achievement_type_value)
+                             for achievement_type, achievement_type_value in achievements.items()}
+    return {over_stats.MODES: modes, over_stats.ACHIEVEMENTS: achievements_dict}
+
+
+def parse_career_page(page, use_decimal=False, parser=None, encoding=None, metrics=None, use_seconds=False):
+    """
+    Parse the career page, given as text or as the raw bytes of the response, into the _model dictionary.
+    parser is one of over_stats.PARSERS, when it is None the fastest parser available is used. encoding is the
+    charset of the response when page is given as bytes. metrics is an over_stats.metrics.Sink that receives the time
+    spent in each phase and the number of elements found in the page. If use_seconds is true, durations are
+    converted into seconds.
+    """
+    with over_stats.metrics.timer(metrics, over_stats.metrics.DECODE):
+        page = decode_page(page, encoding)
+    if parser == over_stats.PARSER_REQUESTS_HTML:
+        return selector_model(page, use_decimal, metrics, use_seconds)
+    with over_stats.metrics.timer(metrics, over_stats.metrics.INDEX):
+        index = index_page(page, parser)
+    if metrics is not None:
+        over_stats.metrics.count_elements(metrics, index)
+    return build_model(index, use_decimal, metrics, use_seconds)
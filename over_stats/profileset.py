@@ -0,0 +1,261 @@
+"""
+Aggregation of the stats of many profiles.
+
+A ProfileSet aligns the numeric stats of several profiles into a matrix with one row per stat and one column per
+player, so statistics across a team or a league are computed by NumPy instead of walking stats() for every profile:
+
+    team = over_stats.ProfileSet([over_stats.PlayerProfile(battletag) for battletag in battletags])
+    reaper = team.select(over_stats.MODE_CP, hero='Reaper')
+    reaper.mean()[reaper.row(over_stats.MODE_CP, 'Reaper', 'Average', 'Eliminations - Avg per 10 Min')]
+
+Every row is identified by its (mode, hero, category, stat_name) key, comparisons use over_stats.COMPARISON as their
+category like in over_stats.columnar. Values are floats, durations are in seconds. A player that does not have a stat,
+or whose value is '--', is masked out instead of raising DataNotFound: mask is True where the player has a value and
+values holds NaN everywhere else.
+
+NumPy is required to build a ProfileSet, it is imported the first time one is created.
+"""
+import warnings
+
+import over_stats
+import over_stats.columnar
+import over_stats.errors
+
+
+class ProfileSet:
+    """
+    The numeric stats of several profiles aligned into a stat x player matrix.
+
+    keys is the list of (mode, hero, category, stat_name) of each row, labels identifies each column, values is the
+    float64 matrix, mask is a boolean matrix that is True where a player has a value and kinds holds the
+    over_stats.columnar KIND of each row.
+    """
+
+    def __init__(self, profiles, labels=None, names=None):
+        """
+        profiles is a list of PlayerProfiles, which are loaded if needed, or of over_stats.columnar.CompactProfiles.
+        labels identify each profile, by default the battletag of each PlayerProfile or its position in the list is
+        used. Labels have to be unique: profiles of players with the same battletag on different platforms need
+        labels, such as (platform, battletag). names is the NameTable used to encode the names, by default the table
+        shared by every profile.
+        """
+        import numpy
+        profiles = list(profiles)
+        if labels is None:
+            labels = [getattr(profile, 'battletag', position) for position, profile in enumerate(profiles)]
+        elif len(labels) != len(profiles):
+            raise over_stats.errors.InvalidArgument('There has to be one label per profile')
+        names = names if names is not None else over_stats.columnar.NAMES
+
+        codes = []
+        columns = []
+        values = []
+        kinds = []
+        for column, profile in enumerate(profiles):
+            if isinstance(profile, over_stats.columnar.CompactProfile):
+                compact = profile
+            else:
+                compact = profile.compact(names)
+            arrays = compact.to_arrays()
+            profile_codes = numpy.stack([arrays['mode'].astype(numpy.int64), arrays['hero'].astype(numpy.int64),
+                                         arrays['category'].astype(numpy.int64), arrays['stat'].astype(numpy.int64)],
+                                        axis=1)
+            if compact.names is not names and len(compact):
+                # Translate the codes of a profile built with another NameTable.
+                translate = numpy.array([names.code(name) for name in compact.names.names()], dtype=numpy.int64)
+                profile_codes[:, 1:] = translate[profile_codes[:, 1:]]
+            codes.append(profile_codes)
+            columns.append(numpy.full(len(compact), column, dtype=numpy.int64))
+            values.append(arrays['value'])
+            kinds.append(arrays['kind'])
+
+        if codes:
+            codes = numpy.concatenate(codes)
+            columns = numpy.concatenate(columns)
+            values = numpy.concatenate(values)
+            kinds = numpy.concatenate(kinds)
+        else:
+            codes = numpy.zeros((0, 4), dtype=numpy.int64)
+            columns = numpy.zeros(0, dtype=numpy.int64)
+            values = numpy.zeros(0)
+            kinds = numpy.zeros(0, dtype=numpy.uint8)
+        key_codes, rows = numpy.unique(codes, axis=0, return_inverse=True)
+        rows = rows.reshape(-1)
+
+        matrix = numpy.full((len(key_codes), len(profiles)), numpy.nan)
+        matrix[rows, columns] = values
+        mask = numpy.zeros(matrix.shape, dtype=bool)
+        present = kinds != over_stats.columnar.KIND_MISSING
+        mask[rows[present], columns[present]] = True
+        row_kinds = numpy.full(len(key_codes), over_stats.columnar.KIND_MISSING, dtype=numpy.uint8)
+        # A stat is a duration if it is a duration for any player that has it.
+        row_kinds[rows[present]] = over_stats.columnar.KIND_NUMBER
+        durations = kinds == over_stats.columnar.KIND_DURATION
+        row_kinds[rows[durations]] = over_stats.columnar.KIND_DURATION
+
+        name = names.name
+        keys = [(over_stats.MODE_LIST[mode], name(hero), name(category), name(stat))
+                for mode, hero, category, stat in key_codes.tolist()]
+        self._set(keys, list(labels), matrix, mask, row_kinds)
+
+    def _set(self, keys, labels, values, mask, kinds):
+        self.keys = keys
+        self.labels = labels
+        self.values = values
+        self.mask = mask
+        self.kinds = kinds
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._columns = {label: column for column, label in enumerate(labels)}
+        if len(self._columns) != len(labels):
+            duplicates = sorted({repr(label) for label in labels if labels.count(label) > 1})
+            raise over_stats.errors.InvalidArgument(f'Labels have to be unique, found {", ".join(duplicates)} more '
+                                                    f'than once')
+
+    @classmethod
+    def from_matrix(cls, keys, labels, values, mask, kinds):
+        """
+        Build a ProfileSet from already aligned arrays. values and mask are copied only if they are not NumPy arrays.
+        """
+        import numpy
+        profile_set = cls.__new__(cls)
+        profile_set._set(list(keys), list(labels), numpy.asarray(values, dtype=numpy.float64),
+                         numpy.asarray(mask, dtype=bool), numpy.asarray(kinds, dtype=numpy.uint8))
+        return profile_set
+
+    def row(self, mode, hero, category, stat_name):
+        """
+        Get the index of the row of a stat. Raises DataNotFound if no player has the stat.
+        """
+        try:
+            return self._rows[(mode, hero, category, stat_name)]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
+
+    def column(self, label):
+        """
+        Get the index of the column of a player. Raises DataNotFound if there is no player with that label.
+        """
+        try:
+            return self._columns[label]
+        except KeyError:
+            raise over_stats.errors.DataNotFound('Data not available')
+
+    def stat(self, mode, hero, category, stat_name):
+        """
+        Get the value of a stat for every player as a NumPy masked array. If no player has the stat every value is
+        masked.
+        """
+        import numpy
+        row = self._rows.get((mode, hero, category, stat_name))
+        if row is None:
+            return numpy.ma.masked_all(len(self.labels))
+        return numpy.ma.MaskedArray(self.values[row], ~self.mask[row])
+
+    def matrix(self):
+        """
+        Get the values as a NumPy masked array.
+        """
+        import numpy
+        return numpy.ma.MaskedArray(self.values, ~self.mask)
+
+    def select(self, mode=None, hero=None, category=None, stat_name=None):
+        """
+        Get a ProfileSet with the rows that match every argument that is not None, for example select(MODE_CP,
+        hero='Reaper') keeps the competitive stats and comparisons of Reaper.
+        """
+        import numpy
+        wanted = (mode, hero, category, stat_name)
+        selected = numpy.array([all(value is None or value == part for value, part in zip(wanted, key))
+                                for key in self.keys], dtype=bool).reshape(-1)
+        return self.take(numpy.flatnonzero(selected))
+
+    def take(self, rows):
+        """
+        Get a ProfileSet with the rows at the given indexes.
+        """
+        return ProfileSet.from_matrix([self.keys[row] for row in rows], self.labels, self.values[rows],
+                                      self.mask[rows], self.kinds[rows])
+
+    def players(self, labels):
+        """
+        Get a ProfileSet with the columns of the given players.
+        """
+        columns = [self.column(label) for label in labels]
+        return ProfileSet.from_matrix(self.keys, labels, self.values[:, columns], self.mask[:, columns], self.kinds)
+
+    def count(self):
+        """
+        Get the number of players that have each stat.
+        """
+        return self.mask.sum(axis=1)
+
+    def sum(self):
+        """
+        Get the sum of each stat over the players that have it.
+        """
+        import numpy
+        return numpy.where(self.mask, self.values, 0).sum(axis=1)
+
+    def mean(self):
+        """
+        Get the mean of each stat over the players that have it. Stats that no player has are NaN.
+        """
+        import numpy
+        count = self.count()
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return numpy.where(count > 0, self.sum() / count, numpy.nan)
+
+    def percentile(self, q):
+        """
+        Get the q-th percentile of each stat over the players that have it. q can be a number or a list of numbers,
+        in which case the result has one row per number. Stats that no player has are NaN.
+        """
+        import numpy
+        values = numpy.where(self.mask, self.values, numpy.nan)
+        with warnings.catch_warnings():
+            # Rows without any value produce a RuntimeWarning and NaN, which is the expected result.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return numpy.nanpercentile(values, q, axis=1)
+
+    def rank(self, ascending=False):
+        """
+        Get the rank of each player for each stat, 1 being the highest value (the lowest if ascending is true).
+        Players with the same value get the same rank. Players that do not have a stat get rank 0.
+        """
+        import numpy
+        missing = numpy.inf if ascending else -numpy.inf
+        values = numpy.where(self.mask, self.values, missing)
+        if not ascending:
+            values = -values
+        order = numpy.argsort(values, axis=1, kind='stable')
+        ordered = numpy.take_along_axis(values, order, axis=1)
+        # The rank of each position in the sorted rows, positions that tie with the previous one keep its rank.
+        positions = numpy.arange(1, values.shape[1] + 1)
+        new_value = numpy.ones(ordered.shape, dtype=bool)
+        new_value[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        sorted_ranks = numpy.maximum.accumulate(numpy.where(new_value, positions, 0), axis=1)
+        ranks = numpy.empty(values.shape, dtype=numpy.int64)
+        numpy.put_along_axis(ranks, order, sorted_ranks, axis=1)
+        ranks[~self.mask] = 0
+        return ranks
+
+    def diff(self, other):
+        """
+        Get a ProfileSet with the change of each stat since other, an older snapshot of the same players. Players are
+        matched by label and stats by key. A value is masked unless both snapshots have it.
+        """
+        import numpy
+        rows = numpy.array([other._rows.get(key, -1) for key in self.keys], dtype=numpy.int64).reshape(-1)
+        columns = numpy.array([other._columns.get(label, -1) for label in self.labels], dtype=numpy.int64).reshape(-1)
+        mask = self.mask & (rows >= 0)[:, None] & (columns >= 0)[None, :]
+        if len(other.keys) and len(other.labels):
+            mask &= other.mask[rows[:, None], columns[None, :]]
+            previous = other.values[rows[:, None], columns[None, :]]
+        else:
+            previous = numpy.zeros(self.values.shape)
+        with numpy.errstate(invalid='ignore'):
+            values = numpy.where(mask, self.values - previous, numpy.nan)
+        return ProfileSet.from_matrix(self.keys, self.labels, values, mask, self.kinds)
+
+    def __len__(self):
+        return len(self.labels)
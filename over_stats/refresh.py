@@ -0,0 +1,263 @@
+"""
+Incremental refresh of a profile.
+
+Profiles that are polled often rarely change between two downloads. refresh() downloads the career page again and
+fingerprints each section of it: the comparisons of each game mode, the career stats of each hero and each achievement
+type. Only the sections whose fingerprint changed are parsed, the others are taken from the previous model. The result
+is a Delta with every stat that changed:
+
+    player_data = over_stats.PlayerProfile('zappis#21285')
+    player_data.raw_data
+    ...
+    for change in player_data.refresh():
+        print(change.path, change.old, change.new)
+
+A fingerprint is a hash of the markup of a section, so the page is only scanned for the position of its sections, as
+the lazy model does, and the text of the unchanged sections is never read.
+"""
+import functools
+import hashlib
+
+import over_stats
+import over_stats.lazy
+import over_stats.metrics
+import over_stats.parser
+import over_stats.values
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+class Change:
+    """
+    A value of the model that changed. path is the list of keys that lead to the value in the _model, for example
+    (over_stats.MODES, over_stats.MODE_QP, over_stats.STATS, 'Reaper', 'Combat', 'Eliminations'). old is None when
+    the value was added and new is None when it was removed.
+    """
+    __slots__ = ('path', 'old', 'new')
+
+    def __init__(self, path, old, new):
+        self.path = path
+        self.old = old
+        self.new = new
+
+    @property
+    def kind(self):
+        if self.old is None:
+            return ADDED
+        if self.new is None:
+            return REMOVED
+        return CHANGED
+
+    def __eq__(self, other):
+        return isinstance(other, Change) and (self.path, self.old, self.new) == (other.path, other.old, other.new)
+
+    def __repr__(self):
+        return f'Change({self.path!r}, {self.old!r}, {self.new!r})'
+
+
+class Delta:
+    """
+    The changes found by a refresh, in the order of the model. sections lists the path of every section that was
+    parsed again and reused is the number of sections that were taken from the previous model. not_modified is true
+    when the server answered with a 304 and nothing was downloaded.
+    """
+
+    def __init__(self, changes=None, sections=None, reused=0, not_modified=False):
+        self.changes = changes or []
+        self.sections = sections or []
+        self.reused = reused
+        self.not_modified = not_modified
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def __repr__(self):
+        return f'Delta({len(self.changes)} changes, {len(self.sections)} sections parsed, {self.reused} reused)'
+
+
+def fingerprint(page, spans):
+    """
+    Hash the markup found in spans.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for start, end in spans:
+        digest.update(page[start:end].encode('utf-8', 'surrogatepass'))
+    return digest.digest()
+
+
+def page_sections(page_map):
+    """
+    Get a dictionary that maps the path of every section of the page to its fingerprint and to the function that
+    builds it. The paths are the keys of the _model, in the same order, and the modes and groups of the page are
+    included with a None fingerprint so sections can be reassembled into a model.
+    """
+    sections = {}
+    groups = []
+    for mode in over_stats.MODE_LIST:
+        scope = page_map.scope(mode)
+        if scope is None:
+            continue
+        groups.append(((over_stats.MODES, mode, over_stats.COMPARISON), over_stats.COMPARISON, scope,
+                       over_stats.parser.comparison_stats))
+        groups.append(((over_stats.MODES, mode, over_stats.STATS), over_stats.STATS, scope,
+                       over_stats.parser.hero_stats))
+    groups.append(((over_stats.ACHIEVEMENTS,), over_stats.ACHIEVEMENTS, None,
+                   lambda blocks, convert: over_stats.parser.achievement_list(blocks)))
+
+    for group_path, group_id, scope, build in groups:
+        sections[group_path] = (None, None)
+        options = over_stats.parser.dropdown_options(page_map.find_dropdowns(group_id, scope))
+        for name, category_id in options.items():
+            spans = over_stats.lazy.within(page_map.blocks.get(category_id, []), scope)
+            sections[group_path + (name,)] = (fingerprint(page_map.page, spans),
+                                              functools.partial(build_section, page_map, build, category_id, scope))
+    return sections
+
+
+def build_section(page_map, build, category_id, scope, convert):
+    return build(page_map.find_blocks(category_id, scope), convert)
+
+
+def model_sections(model):
+    """
+    Iterate over the path of every section of a _model.
+    """
+    for mode, groups in model.get(over_stats.MODES, {}).items():
+        for group_id, group in groups.items():
+            for name in group:
+                yield (over_stats.MODES, mode, group_id, name)
+    for name in model.get(over_stats.ACHIEVEMENTS, {}):
+        yield (over_stats.ACHIEVEMENTS, name)
+
+
+def fingerprints(sections):
+    return {path: fingerprint for path, (fingerprint, _) in sections.items() if fingerprint is not None}
+
+
+def page_map(response, parser=None):
+    page = over_stats.parser.decode_page(response.content, response.encoding)
+    if parser == over_stats.PARSER_REQUESTS_HTML:
+        # Sections are indexed on their own, which needs one of the single pass parsers.
+        parser = None
+    return over_stats.lazy.PageMap(page, parser)
+
+
+def get_path(model, path):
+    for key in path:
+        if not isinstance(model, dict) or key not in model:
+            return None
+        model = model[key]
+    return model
+
+
+def set_path(model, path, value):
+    for key in path[:-1]:
+        model = model.setdefault(key, {})
+    model[path[-1]] = value
+
+
+def diff(path, old, new, changes):
+    """
+    Add a Change to changes for every value that is different between old and new.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            diff(path + (key,), old.get(key), value, changes)
+        for key, value in old.items():
+            if key not in new:
+                diff(path + (key,), value, None, changes)
+    elif isinstance(new, dict) and old is None:
+        for key, value in new.items():
+            diff(path + (key,), None, value, changes)
+    elif isinstance(old, dict) and new is None:
+        for key, value in old.items():
+            diff(path + (key,), value, None, changes)
+    elif old != new or type(old) is not type(new):
+        changes.append(Change(path, old, new))
+
+
+def refresh(profile):
+    """
+    Download the page of a PlayerProfile again, parse the sections that changed and return a Delta. The model of the
+    profile is replaced with the new one, the previous model is not modified. If the profile has not been loaded yet
+    it is loaded and every value is reported as added.
+    """
+    with over_stats.metrics.timer(profile.metrics, over_stats.metrics.REFRESH):
+        generation = profile._generation
+        old_model, old_fingerprints, headers = previous_state(profile)
+        response = profile.fetch(headers, stream=False)
+        return update(profile, response, old_model, old_fingerprints, generation)
+
+
+def previous_state(profile):
+    """
+    Get the model of a profile before it is refreshed, the fingerprints of its sections and the headers that make the
+    request conditional, or None if it cannot be.
+    """
+    old_model = over_stats.lazy.materialize(profile._model) if profile._model is not None else {}
+    old_fingerprints = profile._fingerprints
+    previous = profile._r
+    if old_fingerprints is None and previous is not None and previous.content is not None and old_model:
+        old_fingerprints = fingerprints(page_sections(page_map(previous, profile._parser)))
+
+    headers = None
+    if old_model and previous is not None:
+        headers = {}
+        if previous.header('ETag'):
+            headers['If-None-Match'] = previous.header('ETag')
+        if previous.header('Last-Modified'):
+            headers['If-Modified-Since'] = previous.header('Last-Modified')
+    return old_model, old_fingerprints, headers or None
+
+
+def update(profile, response, old_model, old_fingerprints, generation=None):
+    """
+    Build the new model of a profile from the page it was refreshed with, store it and return the Delta. If generation
+    is given, the model is only stored if no other model was stored since then, so a load that finished during the
+    refresh is not overwritten.
+    """
+    if response.status == 304:
+        return Delta(not_modified=True)
+
+    metrics = profile.metrics
+    sections = page_sections(page_map(response, profile._parser))
+    convert = over_stats.values.ValueConverter(profile._use_decimal, profile._use_seconds)
+    old_fingerprints = old_fingerprints or {}
+    model = {over_stats.MODES: {}, over_stats.ACHIEVEMENTS: {}}
+    delta = Delta()
+    for path, (section_fingerprint, build) in sections.items():
+        if section_fingerprint is None:
+            # A group, it holds the sections that follow it.
+            set_path(model, path, {})
+            continue
+        old_value = get_path(old_model, path)
+        if old_value is not None and old_fingerprints.get(path) == section_fingerprint:
+            value = old_value
+            delta.reused += 1
+        else:
+            value = build(convert)
+            delta.sections.append(path)
+            diff(path, old_value, value, delta.changes)
+        set_path(model, path, value)
+    for path in model_sections(old_model):
+        if path not in sections:
+            diff(path, get_path(old_model, path), None, delta.changes)
+
+    if metrics is not None:
+        metrics.count(over_stats.metrics.SECTIONS_PARSED, len(delta.sections))
+        metrics.count(over_stats.metrics.SECTIONS_REUSED, delta.reused)
+    with profile._lock:
+        if generation is not None and profile._generation != generation:
+            return delta
+        profile.swap(model, response, fingerprints(sections))
+    if profile._cache is not None:
+        profile._cache.store(profile, model, response)
+    return delta
@@ -0,0 +1,117 @@
+"""
+In-process registry of loaded profiles.
+
+A server that creates a PlayerProfile for every request downloads and parses popular profiles over and over. The
+registry keeps the most recently used profiles loaded and hands the same instance to every caller until it expires:
+
+    registry = over_stats.registry.ProfileRegistry(maxsize=1000, ttl=60)
+    player_data = registry.get('zappis#21285')
+
+When several threads ask for a profile that is not loaded, only one of them downloads it and the others wait for its
+result. The returned profiles are shared, callers must not modify the dictionaries they return.
+"""
+import collections
+import threading
+import time
+
+import over_stats
+import over_stats.flight
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 60
+
+
+class ProfileRegistry:
+    """
+    Thread safe LRU of loaded PlayerProfiles keyed by (platform, battletag, use_decimal, use_seconds), the '#' and '-'
+    forms of a pc battletag are the same profile. Profiles are kept for ttl seconds and at most maxsize profiles are
+    kept. The remaining arguments are passed to every PlayerProfile created.
+
+    The counters are hits (loaded profiles returned), misses (profiles that had to be loaded) and coalesced (callers
+    that waited for a load started by another thread).
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, parser=None, transport=None,
+                 base_url=over_stats.CAREER_URL, cache=None, lazy=False, stream=False, metrics=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._profile_args = dict(parser=parser, transport=transport, base_url=base_url, cache=cache, lazy=lazy,
+                                  stream=stream, metrics=metrics)
+        self._entries = collections.OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, battletag, platform=over_stats.PLAT_PC, use_decimal=False, use_seconds=False):
+        """
+        Get a loaded PlayerProfile. Errors raised while loading, such as PlayerNotFound, are raised to every caller
+        waiting for that profile and nothing is stored.
+        """
+        key = self.key(battletag, platform, use_decimal, use_seconds)
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                profile, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return profile
+                del self._entries[key]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                flight = self._flights[key] = over_stats.flight.Flight()
+                leader = True
+        if not leader:
+            return flight.wait()
+
+        try:
+            profile = over_stats.PlayerProfile(battletag, platform, use_decimal, use_seconds=use_seconds,
+                                               **self._profile_args)
+            profile.load_data()
+            flight.result = profile
+        except BaseException as e:
+            # Even a KeyboardInterrupt has to reach the waiting threads, or they would wait forever.
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._entries[key] = (flight.result, time.monotonic() + self.ttl)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            flight.finish()
+        return flight.result
+
+    def invalidate(self, battletag, platform=over_stats.PLAT_PC, use_decimal=False, use_seconds=False):
+        """
+        Forget a profile so the next call to get() loads it again.
+        """
+        key = self.key(battletag, platform, use_decimal, use_seconds)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    @staticmethod
+    def key(battletag, platform=over_stats.PLAT_PC, use_decimal=False, use_seconds=False):
+        return platform, over_stats.url_battletag(battletag, platform), bool(use_decimal), bool(use_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def counters(self):
+        """
+        Get a dictionary with the value of every counter.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
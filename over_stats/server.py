@@ -0,0 +1,217 @@
+"""
+HTTP service that serves profiles as JSON, so several services can share one copy of each profile. It needs aiohttp,
+install it with:
+
+    pip install over_stats[aio]
+
+Run it with 'python -m over_stats.server --port 8080' or create the application with create_app(). The endpoints
+follow the accessors of PlayerProfile:
+
+    GET /{platform}/{battletag}/modes
+    GET /{platform}/{battletag}/comparisons/{mode}[/{comparison_type}[/{hero}]]
+    GET /{platform}/{battletag}/stats/{mode}[/{hero}[/{category}[/{stat_name}]]]
+    GET /{platform}/{battletag}/achievements[/{achievement_type}[/{list_name}]]
+    GET /status
+
+The battletag of a pc profile can be written with a '-' instead of the '#'. Loaded profiles are kept in a ProfileStore,
+an LRU shared by every request, for ttl seconds. Concurrent requests for a profile that is not loaded wait for a single
+download. Responses carry an ETag and a Cache-Control header, a request with a matching If-None-Match gets a 304.
+Errors are answered with {"error": message}: 404 for profiles or data that do not exist, 400 for invalid arguments
+and 502 when the career site cannot be reached.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+import over_stats
+import over_stats.aio
+import over_stats.errors
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 60
+DEFAULT_PORT = 8080
+
+
+class ProfileStore:
+    """
+    LRU of loaded AsyncPlayerProfiles keyed by (platform, battletag), shared by the requests of a server. Profiles
+    are kept for ttl seconds and at most maxsize profiles are kept. The battletag of the key is the one of the url of
+    the career page, so player#0 and player-0 are the same pc profile.
+
+    The counters are hits (loaded profiles returned), misses (profiles that had to be loaded) and coalesced (requests
+    that waited for a load started by another request), like over_stats.registry.ProfileRegistry.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, session=None, executor=None, parser=None,
+                 base_url=over_stats.CAREER_URL, use_seconds=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.session = session
+        self.executor = executor
+        self.parser = parser
+        self.base_url = base_url
+        self.use_seconds = use_seconds
+        self._entries = collections.OrderedDict()
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, battletag, platform=over_stats.PLAT_PC):
+        """
+        Get a loaded profile and the time.monotonic() at which it expires. Errors raised while loading are raised to
+        every request waiting for that profile and nothing is stored.
+        """
+        key = self.key(battletag, platform)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            del self._entries[key]
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = self._flights[key] = asyncio.ensure_future(self.load(key, battletag))
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        # A request that is cancelled must not cancel the load the other requests are waiting for.
+        return await asyncio.shield(flight)
+
+    async def load(self, key, battletag):
+        platform = key[0]
+        profile = over_stats.aio.AsyncPlayerProfile(battletag, platform, parser=self.parser, session=self.session,
+                                                    executor=self.executor, base_url=self.base_url,
+                                                    use_seconds=self.use_seconds)
+        await profile.load_data()
+        entry = self._entries[key] = (profile, time.monotonic() + self.ttl)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, battletag, platform=over_stats.PLAT_PC):
+        self._entries.pop(self.key(battletag, platform), None)
+
+    @staticmethod
+    def key(battletag, platform=over_stats.PLAT_PC):
+        return platform, over_stats.url_battletag(battletag, platform)
+
+    def counters(self):
+        return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced, 'profiles': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# The key of the ProfileStore in the application, AppKey is only available in recent versions of aiohttp.
+STORE = web.AppKey('store', ProfileStore) if hasattr(web, 'AppKey') else 'store'
+
+
+def json_response(request, value, max_age=0):
+    """
+    Encode value as JSON with an ETag, or answer with a 304 if the client already has it.
+    """
+    # Decimals are written as strings so they keep every digit.
+    body = json.dumps(value, default=str).encode('utf-8')
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={max(0, int(max_age))}'}
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type='application/json', headers=headers)
+
+
+def error_response(status, message):
+    return web.json_response({'error': message}, status=status)
+
+
+def accessor(read):
+    """
+    Turn read(profile, match_info), which calls an accessor of the profile, into a request handler.
+    """
+    async def handler(request):
+        store = request.app[STORE]
+        info = request.match_info
+        try:
+            profile, expires_at = await store.get(info['battletag'], info['platform'])
+            value = read(profile, info)
+        except (over_stats.errors.PlayerNotFound, over_stats.errors.DataNotFound) as e:
+            return error_response(404, str(e))
+        except (over_stats.errors.InvalidArgument, over_stats.errors.InvalidBattletag) as e:
+            return error_response(400, str(e))
+        except (over_stats.errors.UnexpectedBehaviour, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return error_response(502, str(e) or type(e).__name__)
+        return json_response(request, value, expires_at - time.monotonic())
+    return handler
+
+
+def read_comparisons(profile, info):
+    return profile.comparisons(info['mode'], info.get('comparison_type'), info.get('hero'))
+
+
+def read_stats(profile, info):
+    return profile.stats(info['mode'], info.get('hero'), info.get('category'), info.get('stat_name'))
+
+
+def read_achievements(profile, info):
+    return profile.achievements(info.get('achievement_type'), info.get('list_name'))
+
+
+async def status(request):
+    return web.json_response(request.app[STORE].counters())
+
+
+def create_app(maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, concurrency=over_stats.aio.DEFAULT_CONCURRENCY,
+               executor=None, parser=None, base_url=over_stats.CAREER_URL, use_seconds=False):
+    """
+    Create the aiohttp application. The career pages are downloaded with at most concurrency connections and parsed
+    in executor, by default the loop's executor. If use_seconds is true, durations are served as seconds.
+    """
+    app = web.Application()
+    app[STORE] = ProfileStore(maxsize, ttl, executor=executor, parser=parser, base_url=base_url,
+                              use_seconds=use_seconds)
+
+    async def session(app):
+        async with over_stats.aio.create_session(concurrency) as client_session:
+            app[STORE].session = client_session
+            yield
+
+    app.cleanup_ctx.append(session)
+    profile = '/{platform}/{battletag}'
+    app.router.add_get('/status', status)
+    app.router.add_get(profile + '/modes', accessor(lambda profile, info: profile.modes()))
+    for path in ('/comparisons/{mode}', '/comparisons/{mode}/{comparison_type}',
+                 '/comparisons/{mode}/{comparison_type}/{hero}'):
+        app.router.add_get(profile + path, accessor(read_comparisons))
+    for path in ('/stats/{mode}', '/stats/{mode}/{hero}', '/stats/{mode}/{hero}/{category}',
+                 '/stats/{mode}/{hero}/{category}/{stat_name}'):
+        app.router.add_get(profile + path, accessor(read_stats))
+    for path in ('/achievements', '/achievements/{achievement_type}', '/achievements/{achievement_type}/{list_name}'):
+        app.router.add_get(profile + path, accessor(read_achievements))
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m over_stats.server', description='Serve profiles as JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--maxsize', type=int, default=DEFAULT_MAXSIZE, help='number of profiles kept in memory')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='seconds a profile is kept')
+    parser.add_argument('--concurrency', type=int, default=over_stats.aio.DEFAULT_CONCURRENCY,
+                        help='connections to the career site')
+    parser.add_argument('--base-url', default=over_stats.CAREER_URL, help='address of the career pages')
+    parser.add_argument('--seconds', action='store_true', help='convert durations into seconds')
+    options = parser.parse_args(argv)
+    web.run_app(create_app(options.maxsize, options.ttl, options.concurrency, base_url=options.base_url,
+                           use_seconds=options.seconds), host=options.host, port=options.port)
+
+
+if __name__ == '__main__':
+    main()
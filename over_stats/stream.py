@@ -0,0 +1,172 @@
+"""
+Streaming parser for the career page.
+
+The page is fed to the tokenizer chunk by chunk while it is being downloaded, so parsing overlaps with the network and
+the whole body is never held in memory. Each section (the comparisons of a game mode, the career stats of a hero, an
+achievement type) is converted into its dictionary as soon as the closing tag of its div arrives and the text that was
+collected for it is dropped. A game mode is complete when its div is closed.
+
+    parser = over_stats.stream.StreamParser(emit=print)
+    for chunk in chunks:
+        parser.feed(chunk)
+    model = parser.close()
+
+emit is called with the path of every section in the _model, for example
+(over_stats.MODES, over_stats.MODE_CP, over_stats.STATS, 'Reaper'), and its value. The model returned by close() is the
+same one parse_career_page() builds from the whole page.
+"""
+import codecs
+
+import over_stats
+import over_stats.errors
+import over_stats.metrics
+import over_stats.parser
+import over_stats.values
+
+
+def builders():
+    """
+    Get the function that converts a Block and the error raised for duplicated Blocks, for each data-group-id.
+    """
+    return {
+        over_stats.COMPARISON: (over_stats.parser.comparison_values, over_stats.parser.MULTIPLE_COMPARISONS),
+        over_stats.STATS: (over_stats.parser.hero_values, over_stats.parser.MULTIPLE_HEROES),
+        over_stats.ACHIEVEMENTS: (lambda block, convert: over_stats.parser.achievement_values(block),
+                                  over_stats.parser.MULTIPLE_ACHIEVEMENT_TYPES),
+    }
+
+
+class StreamingIndexer(over_stats.parser.PageIndexer):
+    """
+    PageIndexer that converts each Block into its section when the Block is closed instead of keeping it in the index.
+    Blocks are converted for every dropdown that lists their data-category-id. A Block that closes before the dropdown
+    that lists it has been read is kept in the index until the end of its game mode, or of the page for achievements.
+    """
+
+    def __init__(self, use_decimal=False, emit=None, use_seconds=False):
+        super().__init__()
+        self.convert = over_stats.values.ValueConverter(use_decimal, use_seconds)
+        self.emit = emit
+        self.modes = {}
+        self._builders = builders()
+        # The converted sections keyed by (group_id, scope, category_id). Achievements are not scoped to a mode.
+        self._sections = {}
+
+    def add_block(self, block):
+        # Blocks are filed when they are closed, see block_closed().
+        pass
+
+    def block_closed(self, block):
+        consumed = False
+        groups = [(over_stats.ACHIEVEMENTS, None)]
+        if block.scope is not None:
+            groups = [(over_stats.COMPARISON, block.scope), (over_stats.STATS, block.scope)] + groups
+        for group_id, scope in groups:
+            names = self._option_names(group_id, scope, block.category_id)
+            if not names:
+                continue
+            build, _ = self._builders[group_id]
+            value = build(block, self.convert)
+            self._sections.setdefault((group_id, scope, block.category_id), []).append(value)
+            for name in names:
+                self._emit(self._path(group_id, scope, name), value)
+            consumed = True
+        if not consumed:
+            self.index.blocks.setdefault(block.category_id, []).append(block)
+
+    def scope_closed(self, scope):
+        if scope in self.modes:
+            # The page has this game mode more than once, close() raises the same error as parse_career_page().
+            return
+        self.modes[scope] = {group_id: self._group(group_id, scope)
+                             for group_id in (over_stats.COMPARISON, over_stats.STATS)}
+        self._emit((over_stats.MODES, scope), self.modes[scope])
+
+    def close(self):
+        index = super().close()
+        modes = {}
+        for mode in over_stats.MODE_LIST:
+            if over_stats.parser.mode_scope(index, mode):
+                modes[mode] = self.modes[mode]
+        return {over_stats.MODES: modes, over_stats.ACHIEVEMENTS: self._group(over_stats.ACHIEVEMENTS, None)}
+
+    def _option_names(self, group_id, scope, category_id):
+        """
+        Get the text of the options that point to category_id in the dropdowns read so far.
+        """
+        return [text for dropdown in self.index.find_dropdowns(group_id, scope)
+                for text, value in dropdown.options if value == category_id]
+
+    def _group(self, group_id, scope):
+        """
+        Build the dictionary of every section listed by a dropdown.
+        """
+        options = over_stats.parser.dropdown_options(self.index.find_dropdowns(group_id, scope))
+        return {name: self._section(group_id, scope, name, category_id) for name, category_id in options.items()}
+
+    def _section(self, group_id, scope, name, category_id):
+        """
+        Get the value of a section, converting the Blocks that were kept because their dropdown came after them.
+        """
+        build, message = self._builders[group_id]
+        converted = self._sections.get((group_id, scope, category_id))
+        values = list(converted or [])
+        values.extend(build(block, self.convert) for block in self.index.find_blocks(category_id, scope))
+        value = over_stats.parser.single(values, message)
+        if value is None:
+            value = []
+        if converted is None:
+            self._emit(self._path(group_id, scope, name), value)
+        return value
+
+    @staticmethod
+    def _path(group_id, scope, name):
+        if group_id == over_stats.ACHIEVEMENTS:
+            return (over_stats.ACHIEVEMENTS, name)
+        return (over_stats.MODES, scope, group_id, name)
+
+    def _emit(self, path, value):
+        if self.emit is not None:
+            self.emit(path, value)
+
+
+class StreamParser:
+    """
+    Parses a career page that is received in chunks. Chunks can be bytes, which are decoded with encoding (utf-8 by
+    default), or text. The number of bytes received is reported to the metrics sink, if any.
+    """
+
+    def __init__(self, use_decimal=False, parser=None, encoding=None, emit=None, metrics=None, use_seconds=False):
+        if parser == over_stats.PARSER_REQUESTS_HTML:
+            raise over_stats.errors.InvalidArgument(f'parser="{parser}" cannot parse a stream')
+        self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')('replace')
+        self._metrics = metrics
+        self._bytes = 0
+        self._tokenizer = over_stats.parser.create_tokenizer(parser or over_stats.parser.default_parser(),
+                                                             StreamingIndexer(use_decimal, emit, use_seconds))
+
+    def feed(self, chunk):
+        if not isinstance(chunk, str):
+            self._bytes += len(chunk)
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._tokenizer.feed(chunk)
+
+    def close(self):
+        """
+        Finish parsing and return the _model dictionary.
+        """
+        self.feed(self._decoder.decode(b'', final=True))
+        if self._metrics is not None:
+            self._metrics.count(over_stats.metrics.BYTES, self._bytes)
+        return self._tokenizer.close()
+
+
+def parse_stream(chunks, use_decimal=False, parser=None, encoding=None, emit=None, metrics=None, use_seconds=False):
+    """
+    Parse a career page from an iterable of chunks into the _model dictionary.
+    """
+    stream_parser = StreamParser(use_decimal, parser, encoding, emit, metrics, use_seconds)
+    for chunk in chunks:
+        stream_parser.feed(chunk)
+    return stream_parser.close()
@@ -0,0 +1,99 @@
+import asyncio
+import concurrent.futures
+import over_stats
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+aio = pytest.importorskip('over_stats.aio')
+
+PAGES = {f'pc/player-{number}': render_career_page(seed=number, heroes=4) for number in range(12)}
+
+'''
+Test loading a single profile.
+'''
+def test_load_data():
+    with StubServer(PAGES) as server:
+        player_data = aio.AsyncPlayerProfile('player#0', base_url=server.base_url)
+        with pytest.raises(over_stats.errors.DataNotLoaded):
+            player_data.modes()
+        asyncio.run(player_data.load_data())
+        assert player_data.raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-0'])
+        assert player_data.modes() == over_stats.MODE_LIST
+
+'''
+Test that fetch_many returns the profiles in order and never runs more requests than allowed at the same time.
+'''
+def test_fetch_many():
+    battletags = [f'player#{number}' for number in range(12)]
+    with StubServer(PAGES, latency=0.05) as server:
+        profiles = asyncio.run(aio.fetch_many(battletags, concurrency=4, base_url=server.base_url))
+        assert len(server.requests) == 12
+        assert server.max_active == 4
+    assert [profile.raw_data for profile in profiles] == [
+        over_stats.parser.parse_career_page(PAGES[f'pc/player-{number}']) for number in range(12)]
+
+'''
+Test that errors are returned in place of the profile when return_exceptions is set.
+'''
+def test_fetch_many_errors():
+    with StubServer(PAGES) as server:
+        with pytest.raises(over_stats.errors.PlayerNotFound):
+            asyncio.run(aio.fetch_many(['player#1', 'missing#1'], base_url=server.base_url))
+        results = asyncio.run(aio.fetch_many(['player#1', 'missing#1'], base_url=server.base_url,
+                                             return_exceptions=True))
+    assert type(results[0]) is aio.AsyncPlayerProfile
+    assert type(results[1]) is over_stats.errors.PlayerNotFound
+
+'''
+Test parsing in a process pool.
+'''
+def test_process_pool():
+    with StubServer(PAGES) as server, concurrent.futures.ProcessPoolExecutor(2) as executor:
+        profiles = asyncio.run(aio.fetch_many(['player#2', 'player#3'], executor=executor, base_url=server.base_url))
+    assert profiles[1].raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-3'])
+
+'''
+Test that durations are converted into seconds when use_seconds is set.
+'''
+def test_use_seconds():
+    with StubServer(PAGES) as server:
+        profiles = asyncio.run(aio.fetch_many(['player#4'], base_url=server.base_url, use_seconds=True))
+    assert profiles[0].raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-4'], use_seconds=True)
+    assert profiles[0].raw_data != over_stats.parser.parse_career_page(PAGES['pc/player-4'])
+
+'''
+Test refreshing a profile that was loaded asynchronously.
+'''
+def test_refresh():
+    pages = {'pc/player-5': PAGES['pc/player-5']}
+    with StubServer(pages) as server:
+        player_data = aio.AsyncPlayerProfile('player#5', base_url=server.base_url)
+
+        async def refresh():
+            await player_data.load_data()
+            not_modified = await player_data.refresh()
+            pages['pc/player-5'] = PAGES['pc/player-6']
+            return not_modified, await player_data.refresh()
+
+        not_modified, delta = asyncio.run(refresh())
+        assert len(server.requests) == 3
+    assert not_modified.not_modified and not not_modified
+    assert delta and delta.sections
+    assert player_data.raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-6'])
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        player_data.load_model(force=True)
+
+'''
+Test that the measurements taken while parsing in a process pool reach the sink of the profiles.
+'''
+def test_process_pool_metrics():
+    collector = over_stats.metrics.MemoryCollector()
+    with StubServer(PAGES) as server, concurrent.futures.ProcessPoolExecutor(2) as executor:
+        profiles = asyncio.run(aio.fetch_many(['player#7', 'player#8'], executor=executor, base_url=server.base_url,
+                                              metrics=collector))
+    assert profiles[0].raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-7'])
+    timings = collector.snapshot()['timings']
+    assert timings[over_stats.metrics.LOAD]['count'] == 2
+    assert timings[over_stats.metrics.INDEX]['count'] == 2
@@ -0,0 +1,121 @@
+import datetime
+import over_stats
+import over_stats.archive
+import over_stats.columnar
+import over_stats.parser
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+DAY = datetime.date(2019, 3, 1)
+
+
+def fill(path, players=3, days=4):
+    """
+    Write an archive with a snapshot per player and day, and return the models by (platform, battletag, date).
+    """
+    models = {}
+    with over_stats.archive.ProfileArchive(path, 'a') as archive:
+        for day in range(days):
+            for player in range(players):
+                key = (over_stats.PLAT_PC, f'player#{player}', DAY + datetime.timedelta(days=day))
+                models[key] = over_stats.parser.parse_career_page(render_career_page(seed=day * players + player))
+                archive.append_model(*key, models[key])
+    return models
+
+'''
+Test that every stat of every snapshot is read back without loading the profiles.
+'''
+def test_stats(tmp_path):
+    path = str(tmp_path / 'history.ovsa')
+    models = fill(path)
+    with over_stats.archive.ProfileArchive(path) as archive:
+        assert len(archive) == len(models)
+        assert archive.keys() == sorted(models)
+        for key, model in models.items():
+            assert key in archive
+            names = over_stats.columnar.NameTable()
+            for mode, hero, category, stat_name, value, _ in \
+                    over_stats.columnar.CompactProfile.from_model(model, names).rows():
+                assert archive.stats(*key, mode, hero, category, stat_name) == value
+            assert list(archive.snapshot(*key).rows()) == sorted(
+                over_stats.columnar.CompactProfile.from_model(model, names).rows(),
+                key=lambda row: (over_stats.MODE_LIST.index(row[0]), archive.names.find(row[1]),
+                                 archive.names.find(row[2]), archive.names.find(row[3])))
+        with pytest.raises(over_stats.errors.DataNotFound):
+            archive.stats(over_stats.PLAT_PC, 'player#0', DAY, over_stats.MODE_QP, 'Reaper', 'Combat', 'Unknown')
+        with pytest.raises(over_stats.errors.DataNotFound):
+            archive.stats(over_stats.PLAT_PC, 'nobody#1', DAY, over_stats.MODE_QP, 'ALL HEROES', 'Combat', 'Deaths')
+
+'''
+Test the time series of a stat across players and dates.
+'''
+def test_series(tmp_path):
+    path = str(tmp_path / 'history.ovsa')
+    models = fill(path)
+    with over_stats.archive.ProfileArchive(path) as archive:
+        stat = (over_stats.MODE_QP, 'ALL HEROES', 'Combat', 'Deaths')
+        expected = [key + (archive.stats(*key, *stat),) for key in sorted(models)]
+        assert list(archive.series(*stat)) == expected
+        assert list(archive.series(*stat, battletag='player#1')) == [row for row in expected if row[1] == 'player#1']
+        end = DAY + datetime.timedelta(days=1)
+        assert list(archive.series(*stat, start=DAY, end=end)) == [row for row in expected if row[2] <= end]
+        assert archive.dates(over_stats.PLAT_PC, 'player#2') == [key[2] for key in sorted(models)
+                                                                  if key[1] == 'player#2']
+        assert list(archive.series(over_stats.MODE_QP, 'ALL HEROES', 'Combat', 'Unknown')) == []
+
+'''
+Test appending to an existing archive, from a PlayerProfile, and replacing a snapshot.
+'''
+def test_append(tmp_path):
+    path = str(tmp_path / 'history.ovsa')
+    fill(path, players=1, days=1)
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: render_career_page(seed=9)}))
+    key = (over_stats.PLAT_PC, 'zappis#21285', DAY)
+    stat = (over_stats.MODE_CP, 'ALL HEROES', 'Combat', 'Deaths')
+    with over_stats.archive.ProfileArchive(path, 'a') as archive:
+        archive.append(player_data, DAY)
+        # Snapshots can be read before the archive is closed.
+        assert archive.stats(*key, *stat) == player_data.stats(over_stats.MODE_CP, 'ALL HEROES', 'Combat', 'Deaths')
+        archive.append_model(*key, over_stats.parser.parse_career_page(render_career_page(seed=10)))
+        replaced = archive.stats(*key, *stat)
+    with over_stats.archive.ProfileArchive(path) as archive:
+        assert len(archive) == 2
+        assert archive.stats(*key, *stat) == replaced
+        with pytest.raises(over_stats.errors.InvalidArgument):
+            archive.append(player_data, DAY)
+
+'''
+Test that an archive that was not closed is read by scanning its segments and indexed again on the next close.
+'''
+def test_not_closed(tmp_path):
+    path = str(tmp_path / 'history.ovsa')
+    models = fill(path, players=2, days=1)
+    archive = over_stats.archive.ProfileArchive(path, 'a')
+    key = (over_stats.PLAT_PSN, 'EhhFreezy', DAY)
+    archive.append_model(*key, over_stats.parser.parse_career_page(render_career_page(seed=20)))
+    archive._file.flush()
+    with open(path, 'ab') as file:
+        # A segment that was cut while being written.
+        file.write(over_stats.archive.SEGMENT.pack(over_stats.archive.RECORD, 1000) + b'\0' * 16)
+    with over_stats.archive.ProfileArchive(path) as reader:
+        assert reader.keys() == sorted(list(models) + [key])
+    archive._file.close()
+    with over_stats.archive.ProfileArchive(path, 'a') as archive:
+        assert len(archive) == 3
+    with over_stats.archive.ProfileArchive(path) as archive:
+        assert archive._new_records == []
+        assert archive.keys() == sorted(list(models) + [key])
+
+'''
+Test that files that are not archives are rejected.
+'''
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'other.ovsa'
+    for content in (b'', b'{"a": 1}' * 10, b'OVSA\x09' + b'\0' * 11):
+        path.write_bytes(content)
+        with pytest.raises(over_stats.errors.InvalidFormat):
+            over_stats.archive.ProfileArchive(str(path))
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.archive.ProfileArchive(str(path), 'w')
@@ -0,0 +1,42 @@
+import over_stats
+import over_stats.batch
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+pytest.importorskip('requests')
+
+PAGES = {f'xbl/player{number}': render_career_page(seed=number, heroes=3) for number in range(10)}
+
+'''
+Test that every battletag produces a result and that errors are returned instead of raised.
+'''
+def test_load_profiles():
+    battletags = [f'player{number}' for number in range(10)] + ['missing']
+    with StubServer(PAGES) as server:
+        results = dict(over_stats.batch.load_profiles(battletags, over_stats.PLAT_XBL, workers=2, fetch_workers=3,
+                                                      base_url=server.base_url))
+    assert sorted(results.keys()) == sorted(battletags)
+    assert type(results['missing']) is over_stats.errors.PlayerNotFound
+    for number in range(10):
+        assert results[f'player{number}'] == over_stats.parser.parse_career_page(PAGES[f'xbl/player{number}'])
+
+'''
+Test that battletags are consumed lazily and invalid battletags do not stop the batch.
+'''
+def test_lazy_input():
+    consumed = []
+
+    def battletags():
+        for battletag in [None, 'player1', 'player2']:
+            consumed.append(battletag)
+            yield battletag
+
+    with StubServer(PAGES) as server:
+        results = over_stats.batch.load_profiles(battletags(), workers=1, fetch_workers=1, base_url=server.base_url)
+        assert consumed == []
+        battletag, error = next(results)
+        assert battletag is None
+        assert type(error) is over_stats.errors.InvalidBattletag
+        results.close()
@@ -0,0 +1,66 @@
+import json
+import math
+
+import over_stats
+import over_stats.binary
+import pytest
+
+from decimal import Decimal
+from over_stats.tests.career_pages import HEROES, render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+
+def same(first, second):
+    """
+    Compare two models, including the type of every value.
+    """
+    if type(first) is not type(second):
+        return False
+    if isinstance(first, dict):
+        return list(first) == list(second) and all(same(first[key], second[key]) for key in first)
+    if isinstance(first, list):
+        return len(first) == len(second) and all(same(a, b) for a, b in zip(first, second))
+    if isinstance(first, float) and math.isnan(first):
+        return math.isnan(second)
+    if isinstance(first, Decimal):
+        return str(first) == str(second)
+    return first == second
+
+'''
+Test that a profile round trips with every value and type, in each conversion mode.
+'''
+@pytest.mark.parametrize('options', [{}, {'use_decimal': True}, {'use_seconds': True},
+                                     {'use_decimal': True, 'use_seconds': True}])
+def test_profile_round_trip(options):
+    page = render_career_page(seed=8, heroes=len(HEROES))
+    transport = PageTransport({URL: page})
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport, **options)
+    data = player_data.dumps()
+    loaded = over_stats.PlayerProfile.loads(data, transport=PageTransport({}))
+    assert same(loaded.raw_data, player_data.raw_data)
+    assert loaded.url == URL
+    assert loaded.battletag == 'zappis#21285'
+    assert loaded.stats(over_stats.MODE_QP) == player_data.stats(over_stats.MODE_QP)
+    assert len(data) < len(json.dumps(player_data.raw_data, default=str).encode('utf-8')) / 2
+
+'''
+Test values that the career page does not produce but the format supports.
+'''
+def test_values():
+    model = {'ints': [0, -1, 127, -129, 2 ** 40, 2 ** 70, -2 ** 70], 'floats': [0.1, -0.0, float('inf'), float('nan')],
+             'decimals': [Decimal('1.00'), Decimal('-0.125'), Decimal('1E+3')], 'text': ['', '--', 'Ünïcødé', '12:34'],
+             'nested': {'empty': {}, 'list': [], 'mixed': [['12', 'hours'], 3]}}
+    decoded = over_stats.binary.loads_model(over_stats.binary.dumps_model(model, battletag='EhhFreezy', platform='psn'))
+    assert same(decoded.model, model)
+    assert decoded.battletag == 'EhhFreezy' and decoded.platform == 'psn'
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.binary.dumps_model({'value': None})
+
+'''
+Test that data that is not a dump is rejected.
+'''
+def test_invalid_data():
+    data = over_stats.binary.dumps_model({'a': [1, 2.5, 'b']})
+    for invalid in (b'', b'{"a": 1}' * 10, data[:-1], data + b'\0', b'OVST\x09' + data[5:]):
+        with pytest.raises(over_stats.errors.InvalidFormat):
+            over_stats.binary.loads_model(invalid)
@@ -0,0 +1,81 @@
+import over_stats
+import over_stats.cache
+import pytest
+import time
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+pytest.importorskip('requests')
+
+PAGES = {f'pc/player-{number}': render_career_page(seed=number, heroes=2) for number in range(4)}
+
+
+def load(server, cache, battletag='player#0', use_decimal=False):
+    return over_stats.PlayerProfile(battletag, use_decimal=use_decimal, base_url=server.base_url, cache=cache).raw_data
+
+'''
+Test that a cached profile is not downloaded again while it is fresh, and that it is shared between caches using the
+same database.
+'''
+def test_hit_and_miss(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    cache = over_stats.cache.SQLiteCache(path)
+    with StubServer(PAGES) as server:
+        model = load(server, cache)
+        assert load(server, cache) == model
+        assert load(server, over_stats.cache.SQLiteCache(path)) == model
+        assert load(server, cache, use_decimal=True) == over_stats.parser.parse_career_page(PAGES['pc/player-0'], True)
+        assert len(server.requests) == 2
+    assert model == over_stats.parser.parse_career_page(PAGES['pc/player-0'])
+    assert cache.counters() == {'hits': 1, 'misses': 2, 'revalidations': 0, 'not_modified': 0, 'evictions': 0}
+    assert len(cache) == 2
+
+'''
+Test that expired entries are revalidated and that unchanged profiles are not parsed again.
+'''
+def test_revalidation(tmp_path, monkeypatch):
+    cache = over_stats.cache.SQLiteCache(str(tmp_path / 'profiles.db'), ttl=-1)
+    parsed = []
+    parse = over_stats.PlayerProfile.parse
+    monkeypatch.setattr(over_stats.PlayerProfile, 'parse', lambda self, response: parsed.append(1) or parse(self, response))
+    with StubServer(dict(PAGES)) as server:
+        load(server, cache)
+        load(server, cache)
+        assert len(parsed) == 1
+        server.pages['pc/player-0'] = PAGES['pc/player-1']
+        assert load(server, cache) == over_stats.parser.parse_career_page(PAGES['pc/player-1'])
+        assert len(parsed) == 2
+    assert cache.counters() == {'hits': 0, 'misses': 1, 'revalidations': 2, 'not_modified': 1, 'evictions': 0}
+
+'''
+Test that load_data(force=True) revalidates an entry that is still fresh.
+'''
+def test_force(tmp_path):
+    cache = over_stats.cache.SQLiteCache(str(tmp_path / 'profiles.db'))
+    with StubServer(dict(PAGES)) as server:
+        profile = over_stats.PlayerProfile('player#0', base_url=server.base_url, cache=cache)
+        profile.load_data()
+        profile.load_data(force=True)
+        assert len(server.requests) == 2
+        server.pages['pc/player-0'] = PAGES['pc/player-1']
+        profile.load_data(force=True)
+        assert profile.raw_data == over_stats.parser.parse_career_page(PAGES['pc/player-1'])
+    assert cache.counters() == {'hits': 0, 'misses': 1, 'revalidations': 2, 'not_modified': 1, 'evictions': 0}
+
+'''
+Test that the least recently used entries are evicted when the cache is full.
+'''
+def test_eviction(tmp_path):
+    cache = over_stats.cache.SQLiteCache(str(tmp_path / 'profiles.db'))
+    with StubServer(PAGES) as server:
+        load(server, cache, 'player#0')
+        cache.max_bytes = cache.size() * 2.5
+        load(server, cache, 'player#1')
+        time.sleep(0.01)
+        load(server, cache, 'player#0')
+        load(server, cache, 'player#2')
+        assert cache.counters()['evictions'] == 1
+        assert len(cache) == 2
+        load(server, cache, 'player#0')
+        assert cache.counters()['hits'] == 2
@@ -0,0 +1,242 @@
+"""
+Generator for offline career pages.
+
+The pages follow the markup of the playoverwatch.com career profile: one div per game mode holding the 'Top Heroes'
+comparison section and the 'Career Stats' section, followed by the achievements section. They are rendered from a
+seeded random generator so the same arguments always produce the same page.
+"""
+import html
+import random
+
+HEROES = [
+    ('Ana', '0x02E000000000013B'), ('Ashe', '0x02E0000000000200'), ('Bastion', '0x02E0000000000015'),
+    ('Brigitte', '0x02E0000000000195'), ('D.Va', '0x02E000000000007A'), ('Doomfist', '0x02E000000000012F'),
+    ('Genji', '0x02E0000000000029'), ('Hanzo', '0x02E0000000000005'), ('Junkrat', '0x02E0000000000065'),
+    ('Lúcio', '0x02E0000000000079'), ('McCree', '0x02E0000000000042'), ('Mei', '0x02E00000000000DD'),
+    ('Mercy', '0x02E0000000000004'), ('Moira', '0x02E00000000001A2'), ('Orisa', '0x02E000000000013E'),
+    ('Pharah', '0x02E0000000000008'), ('Reaper', '0x02E0000000000002'), ('Reinhardt', '0x02E0000000000007'),
+    ('Roadhog', '0x02E0000000000040'), ('Soldier: 76', '0x02E000000000006E'), ('Sombra', '0x02E000000000012E'),
+    ('Symmetra', '0x02E0000000000016'), ('Torbjörn', '0x02E0000000000006'), ('Tracer', '0x02E0000000000003'),
+    ('Widowmaker', '0x02E000000000000A'), ('Winston', '0x02E0000000000009'), ('Wrecking Ball', '0x02E00000000001CA'),
+    ('Zarya', '0x02E0000000000068'), ('Zenyatta', '0x02E0000000000020'),
+]
+ALL_HEROES = ('ALL HEROES', '0x02E00000FFFFFFFF')
+
+COMPARISONS = [
+    ('Time Played', '0x0860000000000021', 'time'),
+    ('Games Won', '0x0860000000000039', 'count'),
+    ('Weapon Accuracy', '0x086000000000002F', 'percent'),
+    ('Eliminations per Life', '0x08600000000003D2', 'ratio'),
+    ('Multikill - Best', '0x0860000000000346', 'count'),
+    ('Objective Kills - Avg per 10 Min', '0x086000000000039C', 'ratio'),
+]
+
+CARDS = [
+    ('Combat', [
+        ('Barrier Damage Done', 'count'), ('Damage Done', 'count'), ('Deaths', 'count'), ('Eliminations', 'count'),
+        ('Environmental Kills', 'count'), ('Final Blows', 'count'), ('Hero Damage Done', 'count'),
+        ('Melee Final Blows', 'count'), ('Multikills', 'count'), ('Objective Kills', 'count'),
+        ('Objective Time', 'clock'), ('Solo Kills', 'count'), ('Time Spent on Fire', 'clock'),
+        ('Weapon Accuracy', 'percent'),
+    ]),
+    ('Assists', [
+        ('Defensive Assists', 'count'), ('Healing Done', 'count'), ('Offensive Assists', 'count'),
+        ('Recon Assists', 'count'),
+    ]),
+    ('Best', [
+        ('All Damage Done - Most in Game', 'count'), ('Eliminations - Most in Game', 'count'),
+        ('Final Blows - Most in Game', 'count'), ('Kill Streak - Best', 'count'),
+        ('Objective Time - Most in Game', 'clock'), ('Solo Kills - Most in Game', 'count'),
+        ('Weapon Accuracy - Best in Game', 'percent'),
+    ]),
+    ('Average', [
+        ('All Damage Done - Avg per 10 Min', 'count'), ('Deaths - Avg per 10 Min', 'ratio'),
+        ('Eliminations - Avg per 10 Min', 'ratio'), ('Final Blows - Avg per 10 Min', 'ratio'),
+        ('Objective Time - Avg per 10 Min', 'clock'), ('Time Spent on Fire - Avg per 10 Min', 'clock'),
+    ]),
+    ('Game', [
+        ('Games Lost', 'count'), ('Games Played', 'count'), ('Games Won', 'count'), ('Games Tied', 'count'),
+        ('Time Played', 'time'),
+    ]),
+    ('Match Awards', [
+        ('Cards', 'count'), ('Medals', 'count'), ('Medals - Bronze', 'count'), ('Medals - Gold', 'count'),
+        ('Medals - Silver', 'count'),
+    ]),
+    ('Miscellaneous', [
+        ('Teleporter Pads Destroyed', 'count'), ('Turrets Destroyed', 'count'), ('Shield Generators Destroyed', 'missing'),
+    ]),
+]
+
+ACHIEVEMENT_TYPES = [
+    ('General', 'overwatch.achievementCategory.0', 24),
+    ('Offense', 'overwatch.achievementCategory.1', 18),
+    ('Defense', 'overwatch.achievementCategory.2', 18),
+    ('Tank', 'overwatch.achievementCategory.3', 21),
+    ('Support', 'overwatch.achievementCategory.4', 18),
+    ('Maps', 'overwatch.achievementCategory.5', 30),
+    ('Special', 'overwatch.achievementCategory.6', 6),
+]
+
+HEADER = """<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+<head>
+<meta charset="utf-8">
+<meta http-equiv="X-UA-Compatible" content="IE=edge">
+<title>{title} - Overwatch</title>
+<link rel="stylesheet" href="https://static.playoverwatch.com/app-1.css">
+<script>window.app = {{"locale": "en-us", "environment": "production"}};</script>
+<style>.toggle-display {{ display: none; }} .toggle-display.is-active {{ display: block; }}</style>
+</head>
+<body class="career-detail">
+<nav class="navbar" id="navbar"><ul class="navbar-list">
+<li class="navbar-item"><a class="navbar-link" href="/en-us/">Home</a></li>
+<li class="navbar-item"><a class="navbar-link" href="/en-us/heroes/">Heroes</a></li>
+<li class="navbar-item"><a class="navbar-link" href="/en-us/media/">Media</a></li>
+<li class="navbar-item"><a class="navbar-link" href="/en-us/search/">Search <span class="icon">&#8250;</span></a></li>
+</ul></nav>
+<div class="page-wrapper">
+<section id="overview-section" class="masthead">
+<div class="masthead-player">
+<img src="https://d1u1mce87gyfbn.cloudfront.net/game/unlocks/0x0250000000000EF7.png" class="player-portrait">
+<h1 class="header-masthead">{title}</h1>
+<div class="masthead-player-progression"><div class="player-level"><div class="u-vertical-center">{level}</div></div>
+<div class="competitive-rank"><img src="https://d1u1mce87gyfbn.cloudfront.net/game/rank-icons/rank-GoldTier.png"><div class="u-align-center h5">{rank}</div></div></div>
+<p class="masthead-detail h4"><svg class="icon" viewBox="0 0 32 32"><use xlink:href="#0x02500000000002F7"></use></svg><span>{games} games won</span></p>
+</div>
+<div class="masthead-buttons button-group"><a href="#quickplay" class="button" data-mode="quickplay">Quick Play</a>
+<a href="#competitive" class="button" data-mode="competitive">Competitive Play</a></div>
+</section>
+"""
+
+FOOTER = """</div>
+<footer class="footer"><div class="footer-links"><a href="https://www.blizzard.com/en-us/legal/">Legal</a>
+<a href="https://www.blizzard.com/en-us/company/about/privacy.html">Privacy</a>
+<span class="copyright">&copy;2018 Blizzard Entertainment, Inc. All rights reserved.</span></div></footer>
+<script src="https://static.playoverwatch.com/app-1.js"></script>
+<script>document.documentElement.className = "js";</script>
+</body>
+</html>
+"""
+
+
+def _value(rng, kind, scale):
+    """
+    Render a stat value in the same formats used by the site.
+    """
+    if kind == 'count':
+        return f'{int(rng.random() * 5000 * scale):,}'
+    if kind == 'percent':
+        return f'{rng.randint(5, 70)}%'
+    if kind == 'ratio':
+        return f'{rng.random() * 30:.2f}'
+    if kind == 'clock':
+        seconds = int(rng.random() * 36000 * scale)
+        if seconds >= 3600:
+            return f'{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}'
+        return f'{seconds // 60:02}:{seconds % 60:02}'
+    if kind == 'time':
+        hours = int(rng.random() * 120 * scale)
+        if hours == 0:
+            return f'{rng.randint(1, 59)} minutes'
+        return f'{hours} hour' if hours == 1 else f'{hours} hours'
+    return '--'
+
+
+def _dropdown(lines, group_id, options):
+    lines.append(f'<select data-js="career-select" data-group-id="{group_id}">')
+    for name, value in options:
+        name = html.escape(name)
+        lines.append(f'<option value="{value}" option-id="{name}">{name}</option>')
+    lines.append('</select>')
+
+
+def _mode(lines, rng, mode, heroes):
+    lines.append(f'<div id="{mode}" data-js="career-category" data-mode="{mode}" class="toggle-display is-active">')
+    lines.append('<section class="content-box u-max-width-container hero-comparison-section">')
+    lines.append('<div class="m-header"><h2 class="h2 u-align-center">Top Heroes</h2><div class="m-header-controls">')
+    _dropdown(lines, 'comparisons', [(name, value) for name, value, _ in COMPARISONS])
+    lines.append('</div></div>')
+    for index, (_, value, kind) in enumerate(COMPARISONS):
+        active = ' is-active' if index == 0 else ''
+        lines.append(f'<div data-group-id="comparisons" data-category-id="{value}" '
+                     f'class="progress-category toggle-display{active}">')
+        for hero, guid in heroes:
+            percent = rng.random()
+            lines.append(f'<div class="ProgressBar ProgressBar--small" data-hero-guid="{guid}" '
+                         f'data-overwatch-progress-percent="{percent:.4f}">')
+            lines.append(f'<img class="ProgressBar-thumb" src="https://d1u1mce87gyfbn.cloudfront.net/game/heroes/small/{guid}.png">')
+            lines.append('<div class="ProgressBar-container"><div class="ProgressBar-textWrapper">')
+            lines.append(f'<div class="ProgressBar-title">{html.escape(hero)}</div>')
+            lines.append(f'<div class="ProgressBar-description">{_value(rng, kind, 1)}</div>')
+            lines.append(f'</div><div class="ProgressBar-bar" style="width: {percent * 100:.2f}%"></div></div></div>')
+        lines.append('</div>')
+    lines.append('</section>')
+    lines.append('<section class="content-box u-max-width-container career-stats-section">')
+    lines.append('<div class="m-header"><h2 class="h2 u-align-center">Career Stats</h2><div class="m-header-controls">')
+    stat_heroes = [ALL_HEROES] + heroes
+    _dropdown(lines, 'stats', stat_heroes)
+    lines.append('</div></div>')
+    for index, (hero, guid) in enumerate(stat_heroes):
+        active = ' is-active' if index == 0 else ''
+        scale = len(heroes) if guid == ALL_HEROES[1] else 1
+        lines.append(f'<div data-group-id="stats" data-category-id="{guid}" class="row js-stats toggle-display{active}">')
+        cards = CARDS if guid == ALL_HEROES[1] else rng.sample(CARDS, rng.randint(3, len(CARDS)))
+        for title, stats in cards:
+            lines.append('<div class="column xs-12 md-6 xl-4"><div class="card-stat-block">')
+            lines.append('<table class="DataTable"><thead><tr><th class="DataTable-tableHeading" colspan="2">'
+                         f'<h5 class="stat-title">{html.escape(title)}</h5></th></tr></thead><tbody>')
+            for stat_name, kind in stats:
+                lines.append(f'<tr class="DataTable-tableRow" data-stat-id="{rng.getrandbits(32):#x}">'
+                             f'<td class="DataTable-tableColumn">{html.escape(stat_name)}</td>'
+                             f'<td class="DataTable-tableColumn">{_value(rng, kind, scale)}</td></tr>')
+            lines.append('</tbody></table></div></div>')
+        lines.append('</div>')
+    lines.append('</section>')
+    lines.append('</div>')
+
+
+def _achievements(lines, rng):
+    lines.append('<section id="achievements-section" class="content-box u-max-width-container">')
+    lines.append('<div class="m-header"><h2 class="h2 u-align-center">Achievements</h2><div class="m-header-controls">')
+    _dropdown(lines, 'achievements', [(name, value) for name, value, _ in ACHIEVEMENT_TYPES])
+    lines.append('</div></div>')
+    for index, (name, value, total) in enumerate(ACHIEVEMENT_TYPES):
+        active = ' is-active' if index == 0 else ''
+        lines.append(f'<div id="achievements-section-{index}" data-group-id="achievements" '
+                     f'data-category-id="{value}" class="toggle-display{active}"><ul>')
+        for number in range(total):
+            disabled = ' m-disabled' if rng.random() < 0.4 else ''
+            guid = f'0x0{index}{number:014X}'
+            lines.append('<li class="column xs-6 sm-4 md-3 lg-2"><div class="achievement-card-container">'
+                         f'<div class="achievement-card{disabled}" data-tooltip="achievement-{guid}">'
+                         f'<img src="https://d1u1mce87gyfbn.cloudfront.net/game/achievements/{guid}.png" class="media-card-fill">'
+                         '<div class="media-card-caption"><div class="media-card-title">'
+                         f'{html.escape(name)} Achievement {number}</div></div></div>'
+                         f'<div id="achievement-{guid}" class="tooltip-tip"><h6 class="h5">{html.escape(name)} Achievement {number}</h6>'
+                         f'<p class="h6">Complete challenge {number} in {html.escape(name)}.</p></div></div></li>')
+        lines.append('</ul></div>')
+    lines.append('</section>')
+
+
+def render_career_page(seed=0, heroes=12, modes=('quickplay', 'competitive'), title='Player'):
+    """
+    Render a career page. heroes is the number of heroes the player has played, use len(HEROES) to produce an
+    'every hero played' profile. modes lists the game modes the player has data for.
+    """
+    rng = random.Random(seed)
+    played = sorted(rng.sample(HEROES, min(heroes, len(HEROES))), key=lambda hero: hero[0])
+    lines = [HEADER.format(title=html.escape(title), level=rng.randint(1, 100), rank=rng.randint(1000, 4500),
+                           games=rng.randint(10, 2000))]
+    for mode in modes:
+        _mode(lines, rng, mode, played)
+    _achievements(lines, rng)
+    lines.append(FOOTER)
+    return '\n'.join(lines)
+
+
+def render_missing_page():
+    """
+    Render the page served for a battletag that does not exist.
+    """
+    return (HEADER.format(title='Profile Not Found', level=0, rank=0, games=0) +
+            '<section class="u-align-center"><h1 class="h5">Profile Not Found</h1></section>' + FOOTER)
@@ -0,0 +1,102 @@
+import csv
+import gzip
+import io
+import json
+
+import over_stats
+import over_stats.binary
+import over_stats.cli
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+
+PAGES = {('pc', 'zappis-21285'): render_career_page(seed=1, heroes=3),
+         ('psn', 'acesarramsan'): render_career_page(seed=2, heroes=2, modes=(over_stats.MODE_QP,))}
+BATTLETAGS = 'zappis#21285\n\n# a comment\npsn/acesarramsan\nmissing#1234\n'
+
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return False
+
+
+class BinaryOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.buffer = io.BytesIO()
+
+
+@pytest.fixture
+def pages(tmp_path):
+    for (platform, battletag), page in PAGES.items():
+        (tmp_path / platform).mkdir(exist_ok=True)
+        # Pages can be saved as they are or gzipped.
+        if platform == over_stats.PLAT_PC:
+            (tmp_path / platform / (battletag + '.html')).write_text(page, encoding='utf-8')
+        else:
+            (tmp_path / platform / (battletag + '.html.gz')).write_bytes(gzip.compress(page.encode('utf-8')))
+    return str(tmp_path)
+
+
+def run(pages, *arguments, stdout=None):
+    stdout = stdout or Terminal()
+    stderr = Terminal()
+    status = over_stats.cli.main(['--directory', pages, '--workers', '1', *arguments], stdin=io.StringIO(BATTLETAGS),
+                                 stdout=stdout, stderr=stderr)
+    return status, stdout, stderr.getvalue()
+
+'''
+Test exporting profiles as NDJSON from battletags read on stdin, with a summary and the failures on stderr.
+'''
+def test_ndjson(pages):
+    status, stdout, stderr = run(pages)
+    assert status == 1
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert sorted((line['platform'], line['battletag']) for line in lines) == [('pc', 'zappis#21285'),
+                                                                               ('psn', 'acesarramsan')]
+    for line in lines:
+        battletag = line['battletag'].replace('#', '-')
+        assert line['data'] == over_stats.parser.parse_career_page(PAGES[(line['platform'], battletag)])
+    assert 'pc/missing#1234: There is no profile' in stderr
+    assert '2 profiles exported, 1 failed' in stderr
+
+'''
+Test that the CSV has one row per stat and comparison.
+'''
+def test_csv(pages, tmp_path):
+    output = str(tmp_path / 'stats.csv')
+    status, _, stderr = run(pages, '--format', 'csv', '--output', output, '--quiet')
+    assert status == 1
+    assert 'exported' not in stderr
+    with open(output, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == over_stats.cli.CSV_HEADER
+    model = over_stats.parser.parse_career_page(PAGES[('psn', 'acesarramsan')])
+    expected = [['psn', 'acesarramsan', mode, hero, category, stat_name, over_stats.cli.csv_value(value)]
+                for mode, hero, category, stat_name, value in over_stats.cli.stat_rows(model)]
+    assert [row for row in rows[1:] if row[1] == 'acesarramsan'] == expected
+    assert any(row[4] == over_stats.COMPARISON for row in expected)
+
+'''
+Test that the binary output is a sequence of dumps that read_models() reads back.
+'''
+def test_binary(pages):
+    stdout = BinaryOutput()
+    run(pages, '--format', 'binary', '--decimal', stdout=stdout)
+    decoded = list(over_stats.binary.read_models(io.BytesIO(stdout.buffer.getvalue())))
+    assert sorted(profile.battletag for profile in decoded) == ['acesarramsan', 'zappis#21285']
+    for profile in decoded:
+        assert profile.use_decimal
+        assert profile.url.endswith(profile.battletag.replace('#', '-'))
+        page = PAGES[(profile.platform, profile.battletag.replace('#', '-'))]
+        assert profile.model == over_stats.parser.parse_career_page(page, use_decimal=True)
+
+'''
+Test that the directory transport only serves pages inside its directory.
+'''
+def test_directory_transport(pages):
+    transport = over_stats.transport.DirectoryTransport(pages)
+    assert transport.get(over_stats.CAREER_URL + 'pc/zappis-21285').status == 200
+    assert transport.get(over_stats.CAREER_URL + 'pc/..').status == 404
+    assert transport.get(over_stats.CAREER_URL + '..%2F..%2Fetc%2Fpasswd').status == 404
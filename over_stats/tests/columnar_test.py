@@ -0,0 +1,96 @@
+import over_stats
+import over_stats.columnar
+import over_stats.values
+import pytest
+import sys
+
+from over_stats.tests.career_pages import HEROES, render_career_page
+
+'''
+Test the conversion of values stored in the model.
+'''
+def test_values():
+    assert over_stats.values.duration_seconds('12:34') == 754
+    assert over_stats.values.duration_seconds('01:02:03') == 3723
+    assert over_stats.values.duration_seconds(['2', 'hours']) == 7200
+    assert over_stats.values.duration_seconds(['1', 'minute']) == 60
+    assert over_stats.values.duration_seconds('--') is None
+    assert over_stats.values.numeric_value('--') is None
+    assert over_stats.values.numeric_value(['12', 'minutes']) == 720
+    assert over_stats.values.numeric_value(over_stats.PlayerProfile.handle_stat_value('45%', True)) == 0.45
+
+def size_in_memory(value):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_in_memory(key) + size_in_memory(item) for key, item in value.items())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(size_in_memory(item) for item in value)
+    return sys.getsizeof(value)
+
+'''
+Test that every stat of the model is stored in the compact profile.
+'''
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_from_model(use_decimal):
+    model = over_stats.parser.parse_career_page(render_career_page(seed=1), use_decimal)
+    names = over_stats.columnar.NameTable()
+    compact = over_stats.columnar.CompactProfile.from_model(model, names)
+    rows = 0
+    for mode, mode_dict in model[over_stats.MODES].items():
+        for hero, categories in mode_dict[over_stats.STATS].items():
+            for category, stats in categories.items():
+                for stat_name, value in stats.items():
+                    rows += 1
+                    assert compact.get(mode, hero, category, stat_name) == over_stats.values.numeric_value(value)
+        for comparison_type, comparison in mode_dict[over_stats.COMPARISON].items():
+            for hero, value in comparison.items():
+                rows += 1
+                expected = over_stats.values.numeric_value(value)
+                assert compact.get(mode, hero, over_stats.COMPARISON, comparison_type) == expected
+    assert len(compact) == rows
+    assert len(list(compact.rows())) == rows
+    assert compact.nbytes < size_in_memory(model[over_stats.MODES]) / 5
+    with pytest.raises(over_stats.errors.DataNotFound):
+        compact.get(over_stats.MODE_CP, 'Nobody', 'Combat', 'Deaths')
+
+'''
+Test that rows added after a lookup are found, and that the first of two rows with the same key is returned.
+'''
+def test_get_after_append():
+    compact = over_stats.columnar.CompactProfile(over_stats.columnar.NameTable())
+    compact.append(over_stats.MODE_QP, 'Reaper', 'Combat', 'Deaths', 3)
+    assert compact.get(over_stats.MODE_QP, 'Reaper', 'Combat', 'Deaths') == 3
+    compact.append(over_stats.MODE_CP, 'Reaper', 'Combat', 'Deaths', '--')
+    compact.append(over_stats.MODE_QP, 'Reaper', 'Combat', 'Deaths', 4)
+    compact.append(over_stats.MODE_QP, 'Mercy', 'Combat', 'Deaths', 5)
+    assert compact.get(over_stats.MODE_CP, 'Reaper', 'Combat', 'Deaths') is None
+    assert compact.get(over_stats.MODE_QP, 'Reaper', 'Combat', 'Deaths') == 3
+    assert compact.get(over_stats.MODE_QP, 'Mercy', 'Combat', 'Deaths') == 5
+
+'''
+Test the NumPy export and that profiles sharing a NameTable can be compared.
+'''
+def test_to_arrays():
+    numpy = pytest.importorskip('numpy')
+    names = over_stats.columnar.NameTable()
+    first = over_stats.columnar.CompactProfile.from_model(
+        over_stats.parser.parse_career_page(render_career_page(seed=1, heroes=len(HEROES))), names).to_arrays()
+    second = over_stats.columnar.CompactProfile.from_model(
+        over_stats.parser.parse_career_page(render_career_page(seed=2, heroes=len(HEROES))), names).to_arrays()
+    assert first['value'].dtype == numpy.float64
+    assert set(first.keys()) == {'mode', 'hero', 'category', 'stat', 'value', 'kind'}
+    deaths = names.find('Deaths')
+    assert deaths is not None
+    assert (second['stat'] == deaths).sum() > 0
+    missing = first['kind'] == over_stats.columnar.KIND_MISSING
+    assert numpy.isnan(first['value'][missing]).all()
+    assert not numpy.isnan(first['value'][~missing]).any()
+
+'''
+Test the pandas export.
+'''
+def test_to_frame():
+    pytest.importorskip('pandas')
+    compact = over_stats.columnar.CompactProfile.from_model(over_stats.parser.parse_career_page(render_career_page(seed=3)))
+    frame = compact.to_frame()
+    assert len(frame) == len(compact)
+    assert set(frame['mode']) == set(over_stats.MODE_LIST)
@@ -0,0 +1,153 @@
+import concurrent.futures
+import threading
+import time
+
+import over_stats
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+THREADS = 16
+
+
+class SlowTransport(PageTransport):
+    """
+    PageTransport that takes latency seconds to answer and counts the requests made for each url.
+    """
+
+    def __init__(self, pages, latency=0.05):
+        super().__init__(pages)
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        time.sleep(self.latency)
+        with self.lock:
+            return super().get(url, headers)
+
+
+def read(player_data):
+    """
+    Read the profile the way several callers would and return the model that was seen.
+    """
+    model = player_data.raw_data
+    assert set(model[over_stats.MODES]) == set(over_stats.MODE_LIST)
+    player_data.stats(over_stats.MODE_CP, 'ALL HEROES', 'Game', 'Games Won')
+    player_data.stat_locations(over_stats.MODE_QP, 'Deaths')
+    return model
+
+'''
+Test that many threads reading a profile that is not loaded share a single download and see the same model.
+'''
+@pytest.mark.parametrize('lazy', [False, True])
+def test_one_profile(lazy):
+    transport = SlowTransport({URL: render_career_page(seed=3)})
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport, lazy=lazy)
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as pool:
+        models = list(pool.map(lambda _: read(player_data), range(THREADS * 4)))
+    assert transport.requests == [URL]
+    assert all(model is models[0] for model in models)
+
+'''
+Test that many threads reading many profiles download each profile once.
+'''
+def test_many_profiles():
+    pages = {f'https://playoverwatch.com/en-us/career/psn/player{number}': render_career_page(seed=number, heroes=2)
+             for number in range(8)}
+    transport = SlowTransport(pages, latency=0.01)
+    profiles = [over_stats.PlayerProfile(f'player{number}', over_stats.PLAT_PSN, transport=transport)
+                for number in range(8)]
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(lambda number: read(profiles[number % len(profiles)]), range(THREADS * 8)))
+    assert sorted(transport.requests) == sorted(pages)
+
+'''
+Test that readers always see a complete model while the profile is loaded again, and that errors are shared.
+'''
+def test_reload_while_reading():
+    transport = SlowTransport({URL: render_career_page(seed=3)}, latency=0.02)
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport)
+    player_data.load_data()
+    stop = threading.Event()
+
+    def reload():
+        while not stop.is_set():
+            player_data.load_data(force=True)
+
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as pool:
+        reloaders = [pool.submit(reload) for _ in range(2)]
+        try:
+            list(pool.map(lambda _: read(player_data), range(THREADS * 50)))
+        finally:
+            stop.set()
+        for reloader in reloaders:
+            reloader.result()
+    assert len(transport.requests) > 1
+
+    missing = over_stats.PlayerProfile('missing', over_stats.PLAT_PSN, transport=transport)
+    errors = []
+
+    def load_missing():
+        try:
+            missing.load_data()
+        except over_stats.errors.PlayerNotFound as e:
+            errors.append(e)
+
+    requests = len(transport.requests)
+    threads = [threading.Thread(target=load_missing) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == THREADS
+    # Threads that arrive after the failed load try again, but the ones waiting for it share its error.
+    assert len(transport.requests) - requests < THREADS
+
+'''
+Test that a load interrupted by a BaseException does not leave the threads that need the profile waiting for it.
+'''
+def test_interrupted_load():
+    class InterruptedTransport(PageTransport):
+        def get(self, url, headers=None):
+            if not self.requests:
+                self.requests.append(url)
+                raise KeyboardInterrupt()
+            return super().get(url, headers)
+
+    transport = InterruptedTransport({URL: render_career_page(seed=3)})
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport)
+    with pytest.raises(KeyboardInterrupt):
+        player_data.load_data()
+    assert player_data._flight is None
+    assert player_data.modes()
+    assert len(transport.requests) == 2
+
+'''
+Test that a session of the pool is never used by two threads at once and that no more than size are created.
+'''
+def test_session_pool():
+    in_use = set()
+    lock = threading.Lock()
+    created = []
+
+    def create():
+        session = object()
+        created.append(session)
+        return session
+
+    def borrow(_):
+        with pool.session() as session:
+            with lock:
+                assert session not in in_use
+                in_use.add(session)
+            time.sleep(0.001)
+            with lock:
+                in_use.remove(session)
+
+    pool = over_stats.transport.SessionPool(create, size=4)
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(borrow, range(THREADS * 20)))
+    assert 1 <= len(created) <= 4
+    assert len(pool) == len(created)
@@ -0,0 +1,122 @@
+import math
+
+import over_stats
+import over_stats.columnar
+import over_stats.history
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+DAY = over_stats.history.DAY
+HOUR = over_stats.history.HOUR
+START = 1550000000 // DAY * DAY
+DEATHS = (over_stats.MODE_CP, 'ALL HEROES', 'Combat', 'Deaths')
+
+
+def with_deaths(model, deaths):
+    """
+    Copy a model with another value for DEATHS.
+    """
+    mode, hero, category, stat_name = DEATHS
+    copy = {over_stats.MODES: {mode: {over_stats.COMPARISON: {}, over_stats.STATS: {}}}, over_stats.ACHIEVEMENTS: {}}
+    stats = model[over_stats.MODES][mode][over_stats.STATS]
+    copy[over_stats.MODES][mode][over_stats.STATS] = {
+        name: {category_name: dict(values) for category_name, values in categories.items()}
+        for name, categories in stats.items()}
+    copy[over_stats.MODES][mode][over_stats.STATS][hero][category][stat_name] = deaths
+    return copy
+
+'''
+Test that the first snapshot writes every stat and the next ones only the stats that changed.
+'''
+def test_only_changes(tmp_path):
+    history = over_stats.history.History(str(tmp_path / 'history.db'))
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: render_career_page(seed=1)}))
+    rows = list(over_stats.columnar.CompactProfile.from_model(player_data.raw_data).rows())
+    assert history.record(player_data, START) == len(rows)
+    assert history.record(player_data, START + 60) == 0
+    latest = history.latest(over_stats.PLAT_PC, 'zappis#21285')
+    assert latest == {row[:4]: row[4] for row in rows}
+
+    # A snapshot with only the competitive stats and a new value for DEATHS.
+    model = with_deaths(player_data.raw_data, 12345)
+    removed = [row for row in rows if (row[0] != over_stats.MODE_CP or row[2] == over_stats.COMPARISON)
+               and row[5] != over_stats.columnar.KIND_MISSING]
+    assert history.record_model(over_stats.PLAT_PC, 'zappis#21285', model, START + 120) == len(removed) + 1
+    latest = history.latest(over_stats.PLAT_PC, 'zappis#21285')
+    assert latest[DEATHS] == 12345
+    assert latest[(over_stats.MODE_QP, 'ALL HEROES', 'Combat', 'Deaths')] is None
+    assert history.players() == [(over_stats.PLAT_PC, 'zappis#21285', START + 120, 3)]
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        history.record(player_data, START)
+    history.close()
+
+'''
+Test the series of a stat and its hourly and daily rollups.
+'''
+def test_series_and_rollups(tmp_path):
+    model = over_stats.parser.parse_career_page(render_career_page(seed=2))
+    values = [10, 10, 12, 11, 11, 20, 25]
+    times = [START, START + 600, START + HOUR + 5, START + HOUR + 50, START + DAY, START + DAY + 1, START + 2 * DAY]
+    with over_stats.history.History(str(tmp_path / 'history.db')) as history:
+        for timestamp, deaths in zip(times, values):
+            history.record_model(over_stats.PLAT_PSN, 'EhhFreezy', with_deaths(model, deaths), timestamp)
+        series_times, series_values = history.series(over_stats.PLAT_PSN, 'EhhFreezy', *DEATHS)
+        assert list(series_times) == [START, START + HOUR + 5, START + HOUR + 50, START + DAY + 1, START + 2 * DAY]
+        assert list(series_values) == [10, 12, 11, 20, 25]
+        assert list(history.series(over_stats.PLAT_PSN, 'EhhFreezy', *DEATHS, start=START + DAY)[1]) == [20, 25]
+
+        daily = history.rollup(over_stats.PLAT_PSN, 'EhhFreezy', *DEATHS, DAY)
+        assert list(daily['bucket']) == [START, START + DAY, START + 2 * DAY]
+        assert list(daily['first']) == [10, 20, 25]
+        assert list(daily['last']) == [11, 20, 25]
+        assert list(daily['low']) == [10, 20, 25]
+        assert list(daily['high']) == [12, 20, 25]
+        assert list(daily['changes']) == [3, 1, 1]
+        hourly = history.rollup(over_stats.PLAT_PSN, 'EhhFreezy', *DEATHS, HOUR, start=START + 1, end=START + DAY - 1)
+        assert list(hourly['bucket']) == [START + hour * HOUR for hour in range(24)]
+        assert list(hourly['last']) == [10] + [11] * 23
+        assert list(hourly['changes']) == [1, 2] + [0] * 22
+
+        with pytest.raises(over_stats.errors.DataNotFound):
+            history.series(over_stats.PLAT_PSN, 'nobody', *DEATHS)
+        with pytest.raises(over_stats.errors.DataNotFound):
+            history.series(over_stats.PLAT_PSN, 'EhhFreezy', over_stats.MODE_CP, 'ALL HEROES', 'Combat', 'Unknown')
+        with pytest.raises(over_stats.errors.InvalidArgument):
+            history.rollup(over_stats.PLAT_PSN, 'EhhFreezy', *DEATHS, 60)
+
+'''
+Test that the buckets in which a stat did not change hold its last value, from start to end.
+'''
+def test_rollup_gaps(tmp_path):
+    model = over_stats.parser.parse_career_page(render_career_page(seed=4))
+    with over_stats.history.History(str(tmp_path / 'history.db')) as history:
+        for timestamp, deaths in ((START, 3), (START + 5, 4), (START + 3 * DAY, 9)):
+            history.record_model(over_stats.PLAT_PC, 'zappis#21285', with_deaths(model, deaths), timestamp)
+        daily = history.rollup(over_stats.PLAT_PC, 'zappis#21285', *DEATHS)
+        assert list(daily['bucket']) == [START + day * DAY for day in range(4)]
+        assert list(daily['first']) == [3, 4, 4, 9]
+        assert list(daily['last']) == [4, 4, 4, 9]
+        assert list(daily['low']) == [3, 4, 4, 9]
+        assert list(daily['high']) == [4, 4, 4, 9]
+        assert list(daily['changes']) == [2, 0, 0, 1]
+        # The value before start is carried into the buckets from start, the ones after the last change up to end.
+        daily = history.rollup(over_stats.PLAT_PC, 'zappis#21285', *DEATHS, start=START + DAY + 1, end=START + 5 * DAY)
+        assert list(daily['bucket']) == [START + day * DAY for day in range(1, 6)]
+        assert list(daily['last']) == [4, 4, 9, 9, 9]
+        assert list(daily['changes']) == [0, 0, 1, 0, 0]
+        assert len(history.rollup(over_stats.PLAT_PC, 'zappis#21285', *DEATHS, end=START - 1)['bucket']) == 0
+
+'''
+Test that missing values are stored as NaN and do not change the bounds of the rollups.
+'''
+def test_missing_values(tmp_path):
+    model = over_stats.parser.parse_career_page(render_career_page(seed=3))
+    with over_stats.history.History(str(tmp_path / 'history.db')) as history:
+        for timestamp, deaths in ((START, 5), (START + 1, '--'), (START + 2, 7)):
+            history.record_model(over_stats.PLAT_XBL, 'Dethroned', with_deaths(model, deaths), timestamp)
+        values = history.series(over_stats.PLAT_XBL, 'Dethroned', *DEATHS)[1]
+        assert values[0] == 5 and math.isnan(values[1]) and values[2] == 7
+        daily = history.rollup(over_stats.PLAT_XBL, 'Dethroned', *DEATHS)
+        assert (daily['low'][0], daily['high'][0], daily['changes'][0]) == (5, 7, 3)
@@ -0,0 +1,61 @@
+import over_stats
+import over_stats.index
+import pytest
+
+from over_stats.tests.career_pages import HEROES, render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+
+def load(lazy=False, seed=4):
+    transport = PageTransport({URL: render_career_page(seed=seed, heroes=len(HEROES))})
+    return over_stats.PlayerProfile('zappis#21285', transport=transport, lazy=lazy)
+
+'''
+Test that the index answers the same as walking the profile with the top-down accessors.
+'''
+@pytest.mark.parametrize('lazy', [False, True])
+def test_index_matches_accessors(lazy):
+    player_data = load(lazy)
+    index = player_data.index()
+    assert index.keys() == tuple(player_data.modes())
+    for mode in player_data.modes():
+        locations = {}
+        comparisons = {}
+        for hero in player_data.stat_heroes(mode):
+            assert index.keys(mode, over_stats.STATS, hero) == tuple(player_data.stat_categories(mode, hero))
+            for category in player_data.stat_categories(mode, hero):
+                for stat_name in player_data.stat_names(mode, hero, category):
+                    locations.setdefault(stat_name, []).append(
+                        (hero, category, player_data.stats(mode, hero, category, stat_name)))
+        for stat_name, expected in locations.items():
+            assert player_data.stat_locations(mode, stat_name) == tuple(expected)
+            assert index.stat_categories(mode, stat_name) == tuple(dict.fromkeys(row[1] for row in expected))
+        for comparison_type in player_data.comparison_types(mode):
+            for hero, value in player_data.comparisons(mode, comparison_type).items():
+                comparisons.setdefault(hero, {})[comparison_type] = value
+        for hero, expected in comparisons.items():
+            assert player_data.hero_comparisons(mode, hero) == expected
+    for achievement_type in player_data.achievement_types():
+        for list_name in (over_stats.ACH_EARNED, over_stats.ACH_MISSING):
+            for name in player_data.achievements(achievement_type, list_name):
+                assert player_data.achievement(name) == (achievement_type, list_name)
+
+'''
+Test that the index is built once per model and queries for missing data raise DataNotFound.
+'''
+def test_index_reuse():
+    player_data = load()
+    index = player_data.index()
+    assert player_data.index() is index
+    with pytest.raises(over_stats.errors.DataNotFound):
+        player_data.stat_locations(over_stats.MODE_QP, 'Unknown')
+    with pytest.raises(over_stats.errors.DataNotFound):
+        player_data.hero_comparisons(over_stats.MODE_QP, 'Unknown')
+    with pytest.raises(over_stats.errors.DataNotFound):
+        player_data.achievement('Unknown')
+    with pytest.raises(over_stats.errors.DataNotFound):
+        index.keys(over_stats.MODE_QP, over_stats.STATS, 'Unknown')
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        player_data.stat_locations('arcade', 'Deaths')
+    player_data.load_data(force=True)
+    assert player_data.index() is not index
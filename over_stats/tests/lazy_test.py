@@ -0,0 +1,72 @@
+import json
+import over_stats
+import over_stats.lazy
+import pytest
+
+from over_stats.tests.career_pages import HEROES, render_career_page, render_missing_page
+from over_stats.tests.profile_test import PageTransport, URL
+
+'''
+Test that materializing the lazy model builds the same model as the single pass parser.
+'''
+@pytest.mark.parametrize('page', [
+    render_career_page(seed=1),
+    render_career_page(seed=2, heroes=len(HEROES)),
+    render_career_page(seed=3, modes=(over_stats.MODE_CP,)),
+    render_missing_page(),
+])
+@pytest.mark.parametrize('parser', [over_stats.PARSER_STDLIB, over_stats.PARSER_LXML])
+def test_same_model(page, parser):
+    if parser == over_stats.PARSER_LXML:
+        pytest.importorskip('lxml')
+    model = over_stats.lazy.lazy_model(page, True, parser)
+    assert over_stats.lazy.materialize(model) == over_stats.parser.parse_career_page(page, True, parser)
+
+'''
+Test that sections are parsed only when they are accessed.
+'''
+def test_sections_parsed_on_access(monkeypatch):
+    page = render_career_page(seed=1)
+    expected = over_stats.parser.parse_career_page(page)[over_stats.MODES][over_stats.MODE_CP][over_stats.COMPARISON]
+    indexed = []
+    index_page = over_stats.parser.index_page
+    monkeypatch.setattr(over_stats.parser, 'index_page', lambda page, parser=None: indexed.append(page) or index_page(page, parser))
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: page}), lazy=True)
+    assert player_data.comparisons(over_stats.MODE_CP, 'Time Played') == expected['Time Played']
+    # One dropdown and one comparison block
+    assert len(indexed) == 2
+    hero = list(expected['Time Played'].keys())[0]
+    assert player_data.comparisons(over_stats.MODE_CP, 'Time Played', hero) == expected['Time Played'][hero]
+    assert len(indexed) == 2
+
+'''
+Test that the accessors return dictionaries and raw_data returns the whole model.
+'''
+def test_accessors():
+    page = render_career_page(seed=6, heroes=4)
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: page}), lazy=True)
+    expected = over_stats.parser.parse_career_page(page)
+    assert type(player_data.stats(over_stats.MODE_QP)) is dict
+    assert player_data.stats(over_stats.MODE_QP) == expected[over_stats.MODES][over_stats.MODE_QP][over_stats.STATS]
+    assert player_data.achievements() == expected[over_stats.ACHIEVEMENTS]
+    with pytest.raises(over_stats.errors.DataNotFound):
+        player_data.stats(over_stats.MODE_QP, 'Nobody')
+    assert json.loads(json.dumps(player_data.raw_data)) == expected
+
+'''
+Test that lazy is not silently ignored when it cannot be used.
+'''
+def test_unsupported_combinations(tmp_path):
+    import over_stats.cache
+    transport = PageTransport({})
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.PlayerProfile('zappis#21285', transport=transport, lazy=True, stream=True)
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.PlayerProfile('zappis#21285', transport=transport, lazy=True,
+                                 parser=over_stats.PARSER_REQUESTS_HTML)
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.PlayerProfile('zappis#21285', transport=transport, stream=True,
+                                 parser=over_stats.PARSER_REQUESTS_HTML)
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.PlayerProfile('zappis#21285', transport=transport, lazy=True,
+                                 cache=over_stats.cache.SQLiteCache(str(tmp_path / 'profiles.db')))
@@ -0,0 +1,123 @@
+import over_stats
+import over_stats.batch
+import over_stats.metrics
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+from over_stats.tests.stub_server import StubServer
+
+PAGE = render_career_page(seed=1, heroes=4)
+PARSE_PHASES = [over_stats.metrics.DECODE, over_stats.metrics.INDEX, over_stats.metrics.PARSE_COMPARISONS,
+                over_stats.metrics.PARSE_STATS, over_stats.metrics.PARSE_ACHIEVEMENTS]
+
+'''
+Test that every phase of a load is reported to the sink of the profile.
+'''
+@pytest.mark.parametrize('parser', [over_stats.PARSER_STDLIB, over_stats.PARSER_REQUESTS_HTML])
+def test_profile_phases(parser):
+    if parser == over_stats.PARSER_REQUESTS_HTML:
+        pytest.importorskip('requests_html')
+    collector = over_stats.metrics.MemoryCollector()
+    profile = over_stats.PlayerProfile('zappis#21285', parser=parser, transport=PageTransport({URL: PAGE}),
+                                       metrics=collector)
+    profile.raw_data
+    snapshot = collector.snapshot()
+    for phase in [over_stats.metrics.LOAD, over_stats.metrics.FETCH] + PARSE_PHASES:
+        assert snapshot['timings'][phase]['count'] >= 1
+    assert snapshot['timings'][over_stats.metrics.PARSE_STATS]['count'] == len(over_stats.MODE_LIST)
+    assert snapshot['timings'][over_stats.metrics.LOAD]['total'] >= snapshot['timings'][over_stats.metrics.FETCH]['total']
+    assert snapshot['counters'][over_stats.metrics.BYTES] == len(PAGE.encode('utf-8'))
+    if parser == over_stats.PARSER_STDLIB:
+        # Two modes with 6 comparisons and 5 heroes each, plus 7 achievement types.
+        assert snapshot['counters'][over_stats.metrics.BLOCKS] == 2 * (6 + 5) + 7
+        assert snapshot['counters'][over_stats.metrics.DROPDOWNS] == 2 * 2 + 1
+        assert snapshot['counters'][over_stats.metrics.ACHIEVEMENT_CARDS] == sum(
+            len(achievements[over_stats.ACH_EARNED]) + len(achievements[over_stats.ACH_MISSING])
+            for achievements in profile.achievements().values())
+
+'''
+Test the default sink and that nothing is measured without a sink.
+'''
+def test_default_sink():
+    events = []
+    over_stats.metrics.set_default_sink(over_stats.metrics.CallbackSink(lambda *event: events.append(event)))
+    try:
+        over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: PAGE})).raw_data
+    finally:
+        over_stats.metrics.set_default_sink(None)
+    assert (over_stats.metrics.COUNT, over_stats.metrics.BYTES, len(PAGE.encode('utf-8'))) in events
+    assert any(kind == over_stats.metrics.TIMING and name == over_stats.metrics.LOAD for kind, name, _ in events)
+    profile = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: PAGE}))
+    assert profile.metrics is None
+    assert over_stats.metrics.timer(None, over_stats.metrics.LOAD) is over_stats.metrics.NULL_TIMER
+
+class StreamTransport(PageTransport):
+    def stream(self, url, headers=None):
+        response = self.get(url, headers)
+        content = response.content
+        return over_stats.transport.Response(url, response.status, None, response.headers,
+                                             [content[position:position + 1000] for position in range(0, len(content), 1000)])
+
+'''
+Test the streaming and lazy modes.
+'''
+def test_other_modes():
+    collector = over_stats.metrics.MemoryCollector()
+    over_stats.PlayerProfile('zappis#21285', transport=StreamTransport({URL: PAGE}), stream=True,
+                             metrics=collector).raw_data
+    over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: PAGE}), lazy=True,
+                             metrics=collector).raw_data
+    snapshot = collector.snapshot()
+    assert snapshot['timings'][over_stats.metrics.STREAM]['count'] == 1
+    assert snapshot['timings'][over_stats.metrics.INDEX]['count'] == 1
+    assert snapshot['counters'][over_stats.metrics.BYTES] == 2 * len(PAGE.encode('utf-8'))
+
+'''
+Test that the measurements taken in the worker processes of a batch reach the sink.
+'''
+def test_batch():
+    collector = over_stats.metrics.MemoryCollector()
+    pages = {f'psn/player{number}': render_career_page(seed=number, heroes=2) for number in range(3)}
+    with StubServer(pages) as server:
+        results = dict(over_stats.batch.load_profiles([f'player{number}' for number in range(3)], over_stats.PLAT_PSN,
+                                                      workers=1, base_url=server.base_url, metrics=collector))
+    assert all(isinstance(model, dict) for model in results.values())
+    snapshot = collector.snapshot()
+    assert snapshot['timings'][over_stats.metrics.FETCH]['count'] == 3
+    assert snapshot['timings'][over_stats.metrics.INDEX]['count'] == 3
+    assert snapshot['counters'][over_stats.metrics.BYTES] == sum(len(page.encode('utf-8')) for page in pages.values())
+
+'''
+Test the Prometheus and StatsD formats.
+'''
+def test_formats():
+    collector = over_stats.metrics.MemoryCollector()
+    collector.timing(over_stats.metrics.PARSE_STATS, 0.25)
+    collector.timing(over_stats.metrics.PARSE_STATS, 0.5)
+    collector.count(over_stats.metrics.BYTES, 1024)
+    assert over_stats.metrics.prometheus_text(collector) == (
+        '# TYPE over_stats_parse_stats_seconds summary\n'
+        'over_stats_parse_stats_seconds_sum 0.75\n'
+        'over_stats_parse_stats_seconds_count 2\n'
+        '# TYPE over_stats_bytes_total counter\n'
+        'over_stats_bytes_total 1024\n')
+    assert over_stats.metrics.statsd_line(over_stats.metrics.TIMING, 'fetch', 0.0125) == 'over_stats.fetch:12.500|ms'
+    assert over_stats.metrics.statsd_line(over_stats.metrics.COUNT, 'bytes', 10, 'app') == 'app.bytes:10|c'
+    collector.reset()
+    assert collector.snapshot() == {'timings': {}, 'counters': {}}
+
+'''
+Test that the StatsD sink sends datagrams.
+'''
+def test_statsd_sink():
+    import socket
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(5)
+    sink = over_stats.metrics.StatsDSink(*receiver.getsockname())
+    sink.count(over_stats.metrics.BYTES, 3)
+    assert receiver.recv(1024) == b'over_stats.bytes:3|c'
+    sink.close()
+    receiver.close()
@@ -0,0 +1,81 @@
+import decimal
+import over_stats
+import over_stats.parser
+import pytest
+
+from over_stats.tests.career_pages import HEROES, render_career_page, render_missing_page
+
+'''
+Test that the single pass parser builds the same model as the selector based parser.
+'''
+@pytest.mark.parametrize('page_args', [
+    dict(seed=1),
+    dict(seed=2, heroes=len(HEROES)),
+    dict(seed=3, modes=(over_stats.MODE_QP,)),
+])
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_same_model_as_selectors(page_args, use_decimal):
+    pytest.importorskip('requests_html')
+    page = render_career_page(**page_args)
+    expected = over_stats.parser.parse_career_page(page, use_decimal, over_stats.PARSER_REQUESTS_HTML)
+    assert over_stats.parser.parse_career_page(page, use_decimal, over_stats.PARSER_STDLIB) == expected
+
+'''
+Test that lxml and html.parser build the same model.
+'''
+def test_same_model_with_lxml():
+    pytest.importorskip('lxml')
+    page = render_career_page(seed=5, heroes=len(HEROES))
+    expected = over_stats.parser.parse_career_page(page, parser=over_stats.PARSER_STDLIB)
+    assert over_stats.parser.parse_career_page(page, parser=over_stats.PARSER_LXML) == expected
+
+'''
+Test the structure of the model built from a page.
+'''
+def test_model_structure():
+    model = over_stats.parser.parse_career_page(render_career_page(seed=4, heroes=3).encode('utf-8'), True)
+    assert list(model[over_stats.MODES].keys()) == over_stats.MODE_LIST
+    competitive = model[over_stats.MODES][over_stats.MODE_CP]
+    assert 'Time Played' in competitive[over_stats.COMPARISON]
+    assert len(competitive[over_stats.STATS]) == 4
+    accuracy = competitive[over_stats.STATS]['ALL HEROES']['Combat']['Weapon Accuracy']
+    assert type(accuracy) is decimal.Decimal
+    for achievements in model[over_stats.ACHIEVEMENTS].values():
+        assert len(achievements[over_stats.ACH_EARNED]) + len(achievements[over_stats.ACH_MISSING]) > 0
+
+'''
+Test that a page without game modes or achievements produces an empty model.
+'''
+def test_missing_profile():
+    model = over_stats.parser.parse_career_page(render_missing_page())
+    assert model == {over_stats.MODES: {}, over_stats.ACHIEVEMENTS: {}}
+
+'''
+Test the elements that are filed into the index.
+'''
+@pytest.mark.parametrize('parser', [over_stats.PARSER_STDLIB, over_stats.PARSER_LXML])
+def test_index(parser):
+    if parser == over_stats.PARSER_LXML:
+        pytest.importorskip('lxml')
+    index = over_stats.parser.index_page(
+        '<div id="quickplay"><select data-group-id="stats"><option value="1">All <b>Heroes</b></option></select>'
+        '<div data-category-id="1"><div class="card-stat-block"><h5>Combat</h5><table><tr><td>Deaths</td>'
+        '<td>1,024</td></tr></table></div><p>Unclosed paragraph</div></div>'
+        '<div data-category-id="2"><div class="achievement-card"><span class="m-disabled">Missing</span></div>'
+        '<div class="achievement-card"><img src="a.png"><script>var name = "x";</script>Earned</div></div>', parser)
+    assert index.mode_counts == {over_stats.MODE_QP: 1}
+    assert index.find_dropdowns(over_stats.STATS, over_stats.MODE_QP)[0].options == [('All Heroes', '1')]
+    assert index.find_dropdowns(over_stats.STATS, over_stats.MODE_CP) == []
+    block = index.find_blocks('1', over_stats.MODE_QP)[0]
+    assert block.lines == ['Combat', 'Deaths', '1,024', 'Unclosed paragraph']
+    assert block.cards[0].lines == ['Combat', 'Deaths', '1,024']
+    achievements = index.find_blocks('2')[0].achievements
+    assert [(card.text, card.disabled) for card in achievements] == [('Missing', True), ('Earned', False)]
+    assert index.find_blocks('2', over_stats.MODE_QP) == []
+
+'''
+Test that finding a game mode more than once is reported.
+'''
+def test_duplicated_mode():
+    with pytest.raises(over_stats.errors.UnexpectedBehaviour):
+        over_stats.parser.parse_career_page('<div id="quickplay"></div><div id="quickplay"></div>')
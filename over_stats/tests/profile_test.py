@@ -0,0 +1,99 @@
+import over_stats
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+
+
+class PageTransport(over_stats.transport.Transport):
+    """
+    Transport that serves generated career pages without making network requests.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append(url)
+        if url not in self.pages:
+            return over_stats.transport.Response(url, 404, b'Not Found')
+        return over_stats.transport.Response(url, 200, self.pages[url].encode('utf-8'),
+                                             {'Content-Type': 'text/html; charset=utf-8'})
+
+
+URL = 'https://playoverwatch.com/en-us/career/pc/zappis-21285'
+
+'''
+Test loading a profile through a transport.
+'''
+def test_load_with_transport():
+    transport = PageTransport({URL: render_career_page(seed=1)})
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport)
+    assert transport.requests == []
+    assert player_data.modes() == over_stats.MODE_LIST
+    assert type(player_data.stats(over_stats.MODE_CP, 'ALL HEROES', 'Game', 'Games Won')) is int
+    player_data.achievement_types()
+    assert transport.requests == [URL]
+
+'''
+Test that every parser builds the same profile.
+'''
+@pytest.mark.parametrize('parser', over_stats.PARSERS)
+def test_parsers(parser):
+    if parser != over_stats.PARSER_STDLIB:
+        pytest.importorskip(parser)
+    transport = PageTransport({URL: render_career_page(seed=1)})
+    expected = over_stats.PlayerProfile('zappis#21285', parser=over_stats.PARSER_STDLIB, transport=transport)
+    player_data = over_stats.PlayerProfile('zappis#21285', parser=parser, transport=transport)
+    assert player_data.raw_data == expected.raw_data
+
+'''
+Test that get_html_for_mode() still returns the requests_html element of a game mode.
+'''
+def test_get_html_for_mode():
+    pytest.importorskip('requests_html')
+    transport = PageTransport({URL: render_career_page(seed=1)})
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport)
+    html = player_data.get_html_for_mode(over_stats.MODE_QP)
+    comparisons = over_stats.PlayerProfile.get_dict_from_dropdown(over_stats.COMPARISON, html)
+    assert list(comparisons) == player_data.comparison_types(over_stats.MODE_QP)
+    with pytest.raises(over_stats.errors.PlayerNotFound):
+        player_data.get_html_for_mode('arcade')
+    assert transport.requests == [URL]
+
+'''
+Test the errors raised for invalid parsers and missing profiles.
+'''
+def test_errors():
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.PlayerProfile('zappis#21285', parser='bs4')
+    player_data = over_stats.PlayerProfile('zappis#21286', transport=PageTransport({}))
+    with pytest.raises(over_stats.errors.PlayerNotFound):
+        player_data.raw_data
+
+'''
+Test that importing over_stats does not load the HTTP or HTML libraries, or the modules a plain load does not need.
+'''
+def test_lean_import():
+    import subprocess
+    import sys
+    code = 'import sys, over_stats; print(" ".join(sorted(set(sys.modules) & {"requests", "requests_html", "lxml"})))'
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    assert result.stdout.strip() == ''
+    modules = ['over_stats.' + name for name in ('archive', 'binary', 'cache', 'history', 'index', 'refresh', 'stream')]
+    code = f'import sys, over_stats; print(" ".join(sorted(set(sys.modules) & {set(modules)!r})))'
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    assert result.stdout.strip() == ''
+
+'''
+Test downloading a profile from a local server with the default transport.
+'''
+def test_load_from_server():
+    pytest.importorskip('requests')
+    from over_stats.tests.stub_server import StubServer
+    with StubServer({'psn/acesarramsan': render_career_page(seed=2)}) as server:
+        player_data = over_stats.PlayerProfile('acesarramsan', over_stats.PLAT_PSN, base_url=server.base_url)
+        assert player_data.raw_data == over_stats.parser.parse_career_page(render_career_page(seed=2))
+        with pytest.raises(over_stats.errors.PlayerNotFound):
+            over_stats.PlayerProfile('missing', over_stats.PLAT_PSN, base_url=server.base_url).raw_data
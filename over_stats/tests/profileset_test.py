@@ -0,0 +1,142 @@
+import math
+import over_stats
+import over_stats.columnar
+import over_stats.values
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+
+numpy = pytest.importorskip('numpy')
+
+def load_models(seeds, heroes=6):
+    return [over_stats.parser.parse_career_page(render_career_page(seed=seed, heroes=heroes)) for seed in seeds]
+
+def stat_values(model, key):
+    '''
+    Get a stat by walking the model the way callers did before ProfileSet, None if the player does not have it.
+    '''
+    mode, hero, category, stat_name = key
+    try:
+        if category == over_stats.COMPARISON:
+            value = model[over_stats.MODES][mode][over_stats.COMPARISON][stat_name][hero]
+        else:
+            value = model[over_stats.MODES][mode][over_stats.STATS][hero][category][stat_name]
+    except (KeyError, TypeError):
+        return None
+    return over_stats.values.numeric_value(value)
+
+def build_set(models, labels=None):
+    names = over_stats.columnar.NameTable()
+    return over_stats.ProfileSet([over_stats.columnar.CompactProfile.from_model(model, names) for model in models],
+                                 labels, names)
+
+'''
+Test that every stat of every profile is aligned in the matrix and that missing stats are masked.
+'''
+def test_alignment():
+    models = load_models(range(5))
+    profile_set = build_set(models, ['a', 'b', 'c', 'd', 'e'])
+    assert len(profile_set) == 5
+    assert profile_set.values.shape == (len(profile_set.keys), 5)
+    assert not profile_set.mask.all()
+    for row, key in enumerate(profile_set.keys):
+        for column, model in enumerate(models):
+            expected = stat_values(model, key)
+            if expected is None:
+                assert not profile_set.mask[row, column]
+                assert math.isnan(profile_set.values[row, column])
+            else:
+                assert profile_set.mask[row, column]
+                assert profile_set.values[row, column] == expected
+    stat = profile_set.stat(over_stats.MODE_CP, 'Nobody', 'Combat', 'Deaths')
+    assert stat.mask.all()
+    with pytest.raises(over_stats.errors.DataNotFound):
+        profile_set.row(over_stats.MODE_CP, 'Nobody', 'Combat', 'Deaths')
+
+'''
+Test the aggregations against the same computation done one profile at a time.
+'''
+def test_aggregations():
+    models = load_models(range(8))
+    profile_set = build_set(models)
+    mean = profile_set.mean()
+    median = profile_set.percentile(50)
+    count = profile_set.count()
+    ranks = profile_set.rank()
+    for row, key in enumerate(profile_set.keys):
+        values = [stat_values(model, key) for model in models]
+        present = [value for value in values if value is not None]
+        assert count[row] == len(present)
+        if present:
+            assert mean[row] == pytest.approx(sum(present) / len(present))
+            assert median[row] == pytest.approx(float(numpy.median(present)))
+        else:
+            assert math.isnan(mean[row]) and math.isnan(median[row])
+        for column, value in enumerate(values):
+            if value is None:
+                assert ranks[row, column] == 0
+            else:
+                assert ranks[row, column] == 1 + sum(1 for other in present if other > value)
+
+'''
+Test the per hero slices.
+'''
+def test_select():
+    profile_set = build_set(load_models(range(3)))
+    hero = profile_set.keys[0][1]
+    selection = profile_set.select(over_stats.MODE_CP, hero=hero)
+    assert len(selection.keys) > 0
+    assert all(key[0] == over_stats.MODE_CP and key[1] == hero for key in selection.keys)
+    key = selection.keys[-1]
+    assert numpy.array_equal(selection.stat(*key).filled(-1), profile_set.stat(*key).filled(-1))
+    players = profile_set.players([2, 0])
+    assert players.labels == [2, 0]
+    assert numpy.array_equal(players.mask, profile_set.mask[:, [2, 0]])
+
+'''
+Test the difference between two snapshots of the same players.
+'''
+def test_diff():
+    before = load_models([1, 2])
+    after = load_models([3, 4])
+    old = build_set(before, ['x', 'y'])
+    new = build_set([after[1], after[0]], ['y', 'x'])
+    delta = new.diff(old)
+    for row, key in enumerate(delta.keys):
+        for column, label in enumerate(delta.labels):
+            model_before = before[['x', 'y'].index(label)]
+            model_after = after[['x', 'y'].index(label)]
+            previous, current = stat_values(model_before, key), stat_values(model_after, key)
+            if previous is None or current is None:
+                assert not delta.mask[row, column]
+            else:
+                assert delta.values[row, column] == pytest.approx(current - previous)
+
+'''
+Test a ProfileSet built from PlayerProfiles.
+'''
+def test_from_profiles():
+    from over_stats.tests.profile_test import PageTransport
+    pages = {over_stats.CAREER_URL + 'pc/a-1': render_career_page(seed=1),
+             over_stats.CAREER_URL + 'pc/b-2': render_career_page(seed=2)}
+    profiles = [over_stats.PlayerProfile(battletag, transport=PageTransport(pages)) for battletag in ['a#1', 'b#2']]
+    profile_set = over_stats.ProfileSet(profiles)
+    assert profile_set.labels == ['a#1', 'b#2']
+    assert profile_set.mask[:, profile_set.column('a#1')].sum() > 0
+
+'''
+Test that players with the same label are rejected instead of sharing a column.
+'''
+def test_duplicate_labels():
+    from over_stats.tests.profile_test import PageTransport
+    pages = {over_stats.CAREER_URL + 'pc/same': render_career_page(seed=1),
+             over_stats.CAREER_URL + 'psn/same': render_career_page(seed=2)}
+    profiles = [over_stats.PlayerProfile('same', platform, transport=PageTransport(pages))
+                for platform in [over_stats.PLAT_PC, over_stats.PLAT_PSN]]
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.ProfileSet(profiles)
+    profile_set = over_stats.ProfileSet(profiles, [(profile._platform, profile.battletag) for profile in profiles])
+    assert profile_set.column((over_stats.PLAT_PSN, 'same')) == 1
+    assert len(profile_set.players([(over_stats.PLAT_PC, 'same'), (over_stats.PLAT_PSN, 'same')])) == 2
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        profile_set.players([(over_stats.PLAT_PC, 'same'), (over_stats.PLAT_PC, 'same')])
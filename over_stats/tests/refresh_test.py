@@ -0,0 +1,158 @@
+import re
+import threading
+
+import over_stats
+import over_stats.lazy
+import over_stats.metrics
+import over_stats.refresh
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import ALL_HEROES, render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+STAT_CELL = re.compile(r'(<td class="DataTable-tableColumn">[^<]*</td><td class="DataTable-tableColumn">)[^<]*(</td>)')
+
+
+class ChangingTransport(PageTransport):
+    """
+    PageTransport that sends an ETag and answers conditional requests for a page that did not change with a 304.
+    """
+
+    def get(self, url, headers=None):
+        response = super().get(url, headers)
+        etag = f'"{hash(response.content)}"'
+        if headers and headers.get('If-None-Match') == etag:
+            return over_stats.transport.Response(url, 304, b'', {'ETag': etag})
+        response.headers['ETag'] = etag
+        return response
+
+
+def change_stat(page, mode, category_id, value):
+    """
+    Change the value of the first stat of a Block of the page.
+    """
+    page_map = over_stats.lazy.PageMap(page)
+    start, end = over_stats.lazy.within(page_map.blocks[category_id], page_map.scope(mode))[0]
+    return page[:start] + STAT_CELL.sub(rf'\g<1>{value}\g<2>', page[start:end], count=1) + page[end:]
+
+
+def profile(transport, **options):
+    return over_stats.PlayerProfile('zappis#21285', transport=transport, **options)
+
+'''
+Test that refreshing a profile that did not change parses nothing and reports no changes.
+'''
+def test_unchanged():
+    page = render_career_page(seed=1)
+    transport = PageTransport({URL: page})
+    player_data = profile(transport)
+    model = player_data.raw_data
+    delta = player_data.refresh()
+    assert not delta
+    assert delta.sections == []
+    assert delta.reused == len(list(over_stats.refresh.model_sections(model)))
+    assert player_data.raw_data == model
+    assert len(transport.requests) == 2
+
+'''
+Test that only the section that changed is parsed and its stat is reported.
+'''
+@pytest.mark.parametrize('options', [{}, {'lazy': True}, {'use_decimal': True}])
+def test_changed_stat(options):
+    page = render_career_page(seed=2, heroes=5)
+    transport = PageTransport({URL: page})
+    player_data = profile(transport, **options)
+    old_model = player_data.raw_data
+    transport.pages[URL] = change_stat(page, over_stats.MODE_QP, ALL_HEROES[1], '999,999')
+    delta = player_data.refresh()
+    section = (over_stats.MODES, over_stats.MODE_QP, over_stats.STATS, ALL_HEROES[0])
+    assert delta.sections == [section]
+    assert len(delta) == 1
+    change = delta.changes[0]
+    assert change.path[:4] == section
+    assert change.new == 999999
+    assert change.kind == over_stats.refresh.CHANGED
+    expected = over_stats.parser.parse_career_page(transport.pages[URL], options.get('use_decimal', False))
+    assert player_data.raw_data == expected
+    # The previous model is left untouched for the consumers that still hold it.
+    assert over_stats.refresh.get_path(old_model, change.path) == change.old
+
+'''
+Test that sections that are no longer on the page are reported as removed.
+'''
+def test_removed_mode():
+    transport = PageTransport({URL: render_career_page(seed=3)})
+    player_data = profile(transport)
+    old_model = player_data.raw_data
+    transport.pages[URL] = render_career_page(seed=3, modes=(over_stats.MODE_QP,))
+    delta = player_data.refresh()
+    assert player_data.raw_data == over_stats.parser.parse_career_page(transport.pages[URL])
+    kinds = {change.kind for change in delta if change.path[:2] == (over_stats.MODES, over_stats.MODE_CP)}
+    assert kinds == {over_stats.refresh.REMOVED}
+    # The quickplay div is the same on both pages.
+    assert not any(path[:2] == (over_stats.MODES, over_stats.MODE_QP) for path in delta.sections)
+    assert delta.reused == len(old_model[over_stats.MODES][over_stats.MODE_QP][over_stats.COMPARISON]) + \
+        len(old_model[over_stats.MODES][over_stats.MODE_QP][over_stats.STATS])
+
+'''
+Test refreshing a profile that was not loaded and a profile whose page was answered with a 304.
+'''
+def test_not_loaded_and_not_modified():
+    page = render_career_page(seed=4, heroes=3)
+    transport = ChangingTransport({URL: page})
+    collector = over_stats.metrics.MemoryCollector()
+    player_data = profile(transport, metrics=collector)
+    delta = player_data.refresh()
+    assert delta and all(change.kind == over_stats.refresh.ADDED for change in delta)
+    assert player_data.raw_data == over_stats.parser.parse_career_page(page)
+    delta = player_data.refresh()
+    assert delta.not_modified and not delta
+    snapshot = collector.snapshot()
+    assert snapshot['timings'][over_stats.metrics.REFRESH]['count'] == 2
+    assert snapshot['counters'][over_stats.metrics.SECTIONS_REUSED] == 0
+
+'''
+Test that load_data(force=True) downloads the profile again.
+'''
+def test_load_data_force():
+    transport = PageTransport({URL: render_career_page(seed=5)})
+    player_data = profile(transport)
+    player_data.load_data()
+    player_data.load_data()
+    assert len(transport.requests) == 1
+    player_data.load_data(force=True)
+    assert len(transport.requests) == 2
+
+'''
+Test that a forced load that started before a refresh does not replace the model of the refresh when it finishes.
+'''
+def test_load_during_refresh():
+    class HeldTransport(PageTransport):
+        def __init__(self, pages):
+            super().__init__(pages)
+            self.hold = False
+            self.held = threading.Event()
+            self.release = threading.Event()
+
+        def get(self, url, headers=None):
+            response = super().get(url, headers)
+            if self.hold:
+                self.hold = False
+                self.held.set()
+                self.release.wait(5)
+            return response
+
+    page = render_career_page(seed=6, heroes=3)
+    transport = HeldTransport({URL: page})
+    player_data = profile(transport)
+    player_data.load_data()
+    transport.hold = True
+    load = threading.Thread(target=player_data.load_data, kwargs={'force': True})
+    load.start()
+    assert transport.held.wait(5)
+    transport.pages[URL] = change_stat(page, over_stats.MODE_QP, ALL_HEROES[1], '999,999')
+    assert player_data.refresh()
+    transport.release.set()
+    load.join()
+    assert player_data.raw_data == over_stats.parser.parse_career_page(transport.pages[URL])
@@ -0,0 +1,93 @@
+import concurrent.futures
+import over_stats
+import over_stats.registry
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+pytest.importorskip('requests')
+
+PAGES = {f'psn/player{number}': render_career_page(seed=number, heroes=2) for number in range(3)}
+
+'''
+Test that concurrent requests for the same profile share a single download.
+'''
+def test_single_flight():
+    with StubServer(PAGES, latency=0.2) as server:
+        registry = over_stats.registry.ProfileRegistry(base_url=server.base_url)
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            profiles = list(pool.map(lambda _: registry.get('player0', over_stats.PLAT_PSN), range(8)))
+        assert len(server.requests) == 1
+    assert all(profile is profiles[0] for profile in profiles)
+    counters = registry.counters()
+    assert counters['misses'] == 1
+    assert counters['hits'] + counters['coalesced'] == 7
+
+'''
+Test that profiles are keyed by platform, battletag and use_decimal, and that the least recently used is evicted.
+'''
+def test_lru():
+    with StubServer(PAGES) as server:
+        registry = over_stats.registry.ProfileRegistry(maxsize=2, base_url=server.base_url)
+        first = registry.get('player0', over_stats.PLAT_PSN)
+        assert registry.get('player0', over_stats.PLAT_PSN, True) is not first
+        assert registry.get('player0', over_stats.PLAT_PSN) is first
+        registry.get('player1', over_stats.PLAT_PSN)
+        assert len(registry) == 2
+        assert registry.get('player0', over_stats.PLAT_PSN) is first
+        assert len(server.requests) == 3
+
+'''
+Test that expired profiles and errors are not kept.
+'''
+def test_ttl_and_errors():
+    with StubServer(PAGES) as server:
+        registry = over_stats.registry.ProfileRegistry(ttl=-1, base_url=server.base_url)
+        first = registry.get('player2', over_stats.PLAT_PSN)
+        assert registry.get('player2', over_stats.PLAT_PSN) is not first
+        for _ in range(2):
+            with pytest.raises(over_stats.errors.PlayerNotFound):
+                registry.get('missing', over_stats.PLAT_PSN)
+        assert len(server.requests) == 4
+
+'''
+Test that a load interrupted by a BaseException does not leave later calls waiting for it.
+'''
+def test_interrupted_load():
+    from over_stats.tests.profile_test import PageTransport
+
+    class InterruptedTransport(PageTransport):
+        def get(self, url, headers=None):
+            if not self.requests:
+                self.requests.append(url)
+                raise KeyboardInterrupt()
+            return super().get(url, headers)
+
+    transport = InterruptedTransport({over_stats.CAREER_URL + 'psn/player0': PAGES['psn/player0']})
+    registry = over_stats.registry.ProfileRegistry(transport=transport)
+    with pytest.raises(KeyboardInterrupt):
+        registry.get('player0', over_stats.PLAT_PSN)
+    assert registry._flights == {}
+    assert registry.get('player0', over_stats.PLAT_PSN).modes()
+    assert len(transport.requests) == 2
+
+'''
+Test that both forms of a pc battletag are one entry, that use_seconds is part of the key and that the profile options
+are passed on.
+'''
+def test_keys_and_options():
+    from over_stats.tests.profile_test import PageTransport
+    pages = {over_stats.CAREER_URL + 'pc/player-0': render_career_page(seed=0)}
+    transport = PageTransport(pages)
+    collector = over_stats.metrics.MemoryCollector()
+    registry = over_stats.registry.ProfileRegistry(transport=transport, lazy=True, metrics=collector)
+    first = registry.get('player#0')
+    assert registry.get('player-0') is first
+    assert first._lazy and first.metrics is collector
+    seconds = registry.get('player#0', use_seconds=True)
+    assert seconds is not first and seconds._use_seconds
+    assert len(transport.requests) == 2
+    registry.invalidate('player-0')
+    assert registry.get('player#0') is not first
+    assert collector.snapshot()['timings'][over_stats.metrics.LOAD]['count'] == 3
@@ -0,0 +1,143 @@
+import asyncio
+import over_stats
+import pytest
+
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+server = pytest.importorskip('over_stats.server')
+aiohttp = pytest.importorskip('aiohttp')
+
+PAGES = {f'pc/player-{number}': render_career_page(seed=number, heroes=3) for number in range(3)}
+
+
+def serve(upstream, test, **options):
+    """
+    Run the server against the stub of the career site and call test(client, base_url, app).
+    """
+    async def run():
+        app = server.create_app(base_url=upstream.base_url, **options)
+        runner = aiohttp.web.AppRunner(app)
+        await runner.setup()
+        site = aiohttp.web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as client:
+                return await test(client, f'http://127.0.0.1:{port}', app)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+async def get(client, url, headers=None):
+    async with client.get(url, headers=headers) as response:
+        body = await response.json() if response.status != 304 else None
+        return response.status, body, response.headers
+
+'''
+Test that the endpoints return the same values as the accessors of PlayerProfile.
+'''
+def test_endpoints():
+    model = over_stats.parser.parse_career_page(PAGES['pc/player-0'])
+    profile = over_stats.PlayerProfile('player#0')
+    profile._model = model
+
+    async def test(client, base_url, app):
+        base_url += '/pc/player-0'
+        assert (await get(client, base_url + '/modes'))[1] == profile.modes()
+        assert (await get(client, base_url + '/comparisons/quickplay'))[1] == profile.comparisons(over_stats.MODE_QP)
+        assert (await get(client, base_url + '/stats/competitive/ALL HEROES/Combat'))[1] == \
+            profile.stats(over_stats.MODE_CP, 'ALL HEROES', 'Combat')
+        assert (await get(client, base_url + '/stats/competitive/ALL HEROES/Combat/Deaths'))[1] == \
+            profile.stats(over_stats.MODE_CP, 'ALL HEROES', 'Combat', 'Deaths')
+        assert (await get(client, base_url + '/achievements'))[1] == profile.achievements()
+        assert (await get(client, base_url + '/stats/arcade'))[0] == 400
+        assert (await get(client, base_url + '/stats/quickplay/Nobody'))[0] == 404
+        status, body, _ = await get(client, base_url.replace('player-0', 'missing-1') + '/modes')
+        assert status == 404 and 'error' in body
+
+    with StubServer(PAGES) as upstream:
+        serve(upstream, test)
+        assert len(upstream.requests) == 2
+
+'''
+Test that concurrent requests for a profile share one download and that later requests use the cached profile.
+'''
+def test_coalescing():
+    async def test(client, base_url, app):
+        urls = [f'{base_url}/pc/player-{number % 3}/modes' for number in range(30)]
+        results = await asyncio.gather(*[get(client, url) for url in urls])
+        assert all(status == 200 for status, _, _ in results)
+        await get(client, urls[0])
+        return (await get(client, base_url + '/status'))[1]
+
+    with StubServer(PAGES, latency=0.1) as upstream:
+        counters = serve(upstream, test)
+        assert len(upstream.requests) == 3
+    assert counters['misses'] == 3
+    assert counters['coalesced'] + counters['hits'] == 28
+    assert counters['profiles'] == 3
+
+'''
+Test that the spellings of a battletag that name the same career page share one profile.
+'''
+def test_battletag_spellings():
+    async def test(client, base_url, app):
+        for battletag in ('player-0', 'player%230', 'player-0'):
+            assert (await get(client, f'{base_url}/pc/{battletag}/modes'))[0] == 200
+        app[server.STORE].invalidate('player#0')
+        return (await get(client, base_url + '/status'))[1]
+
+    with StubServer(PAGES) as upstream:
+        counters = serve(upstream, test)
+        assert len(upstream.requests) == 1
+    assert counters['misses'] == 1 and counters['hits'] == 2
+    assert counters['profiles'] == 0
+
+'''
+Test that a request with the ETag of the current response gets a 304.
+'''
+def test_etag():
+    async def test(client, base_url, app):
+        url = base_url + '/pc/player-1/stats/quickplay'
+        status, body, headers = await get(client, url)
+        assert status == 200
+        assert 'max-age=' in headers['Cache-Control']
+        status, body, _ = await get(client, url, {'If-None-Match': headers['ETag']})
+        assert status == 304 and body is None
+        status, _, _ = await get(client, url, {'If-None-Match': '"other"'})
+        assert status == 200
+
+    with StubServer(PAGES) as upstream:
+        serve(upstream, test)
+
+'''
+Test that profiles expire and that the least recently used profile is evicted.
+'''
+def test_lru():
+    async def test(client, base_url, app):
+        for number in (0, 1, 0, 2):
+            await get(client, f'{base_url}/pc/player-{number}/modes')
+        assert list(app[server.STORE]._entries) == [('pc', 'player-0'), ('pc', 'player-2')]
+
+    with StubServer(PAGES) as upstream:
+        serve(upstream, test, maxsize=2)
+        assert len(upstream.requests) == 3
+        serve(upstream, test, maxsize=2, ttl=0)
+        assert len(upstream.requests) == 7
+
+'''
+Test that durations are served as seconds when the server is created with use_seconds.
+'''
+def test_use_seconds():
+    model = over_stats.parser.parse_career_page(PAGES['pc/player-2'], use_seconds=True)
+
+    async def test(client, base_url, app):
+        return (await get(client, base_url + '/pc/player-2/comparisons/competitive'))[1]
+
+    with StubServer(PAGES) as upstream:
+        comparisons = serve(upstream, test, use_seconds=True)
+    assert comparisons == model[over_stats.MODES][over_stats.MODE_CP][over_stats.COMPARISON]
+    assert comparisons['Time Played'] != over_stats.parser.parse_career_page(PAGES['pc/player-2'])[
+        over_stats.MODES][over_stats.MODE_CP][over_stats.COMPARISON]['Time Played']
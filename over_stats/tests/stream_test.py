@@ -0,0 +1,112 @@
+import over_stats
+import over_stats.errors
+import over_stats.parser
+import over_stats.stream
+import over_stats.transport
+import pytest
+
+from over_stats.tests.career_pages import HEROES, render_career_page, render_missing_page
+from over_stats.tests.stub_server import StubServer
+
+PARSERS = [over_stats.PARSER_STDLIB, over_stats.PARSER_LXML]
+
+def chunked(content, size):
+    return [content[position:position + size] for position in range(0, len(content), size)]
+
+def skip_missing(parser):
+    if parser == over_stats.PARSER_LXML:
+        pytest.importorskip('lxml')
+
+'''
+Test that the streaming parser builds the same model as the parser that reads the whole page, whatever the size of
+the chunks. Multi-byte characters are split between chunks with the smaller sizes.
+'''
+@pytest.mark.parametrize('parser', PARSERS)
+@pytest.mark.parametrize('size', [7, 1000, 64 * 1024])
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_same_model(parser, size, use_decimal):
+    skip_missing(parser)
+    page = render_career_page(seed=size, heroes=len(HEROES)).encode('utf-8')
+    expected = over_stats.parser.parse_career_page(page, use_decimal, parser)
+    assert over_stats.stream.parse_stream(chunked(page, size), use_decimal, parser) == expected
+
+'''
+Test pages without some of the sections.
+'''
+@pytest.mark.parametrize('page', [render_missing_page(), render_career_page(seed=1, modes=(over_stats.MODE_CP,))])
+def test_partial_pages(page):
+    expected = over_stats.parser.parse_career_page(page)
+    assert over_stats.stream.parse_stream(chunked(page, 100)) == expected
+
+'''
+Test that sections are emitted while the page is being read and that their text is not kept.
+'''
+def test_emit_sections():
+    page = render_career_page(seed=3).encode('utf-8')
+    emitted = []
+    stream_parser = over_stats.stream.StreamParser(parser=over_stats.PARSER_STDLIB,
+                                                   emit=lambda path, value: emitted.append((path, value, chunk)))
+    chunks = chunked(page, 4096)
+    for chunk, content in enumerate(chunks):
+        stream_parser.feed(content)
+    model = stream_parser.close()
+
+    paths = [path for path, _, _ in emitted]
+    assert len(paths) == len(set(paths))
+    first_mode = (over_stats.MODES, over_stats.MODE_QP)
+    assert first_mode in paths
+    for path, value, chunk in emitted:
+        section = model
+        for key in path:
+            section = section[key]
+        assert section == value
+        if path == first_mode:
+            assert chunk < len(chunks) // 2
+    heroes = [path for path in paths if len(path) == 4 and path[2] == over_stats.STATS]
+    assert len(heroes) == sum(len(mode[over_stats.STATS]) for mode in model[over_stats.MODES].values())
+    assert len([path for path in paths if path[0] == over_stats.ACHIEVEMENTS]) == len(model[over_stats.ACHIEVEMENTS])
+    assert stream_parser._tokenizer.target.index.blocks == {}
+
+'''
+Test sections that are read before the dropdown that lists them.
+'''
+def test_dropdown_after_sections():
+    page = ('<div id="competitive">'
+            '<div data-category-id="0x1"><div class="ProgressBar-title">Ana</div><div>12</div></div>'
+            '<select data-group-id="comparisons"><option value="0x1">Games Won</option>'
+            '<option value="0x2">Time Played</option></select>'
+            '</div>'
+            '<div data-category-id="a.0"><div class="achievement-card">First</div></div>'
+            '<select data-group-id="achievements"><option value="a.0">General</option></select>')
+    emitted = []
+    model = over_stats.stream.parse_stream(chunked(page, 10), emit=lambda path, value: emitted.append(path))
+    assert model == over_stats.parser.parse_career_page(page)
+    assert model[over_stats.MODES][over_stats.MODE_CP][over_stats.COMPARISON] == {'Games Won': {'Ana': 12},
+                                                                                  'Time Played': []}
+    assert (over_stats.ACHIEVEMENTS, 'General') in emitted
+
+'''
+Test that a section that is on the page more than once raises the same error as the parser for whole pages.
+'''
+def test_duplicate_sections():
+    page = ('<div id="quickplay"><select data-group-id="stats"><option value="0x1">Ana</option></select>'
+            '<div data-category-id="0x1"></div><div data-category-id="0x1"></div></div>')
+    with pytest.raises(over_stats.errors.UnexpectedBehaviour) as expected:
+        over_stats.parser.parse_career_page(page)
+    with pytest.raises(over_stats.errors.UnexpectedBehaviour) as error:
+        over_stats.stream.parse_stream([page])
+    assert str(error.value) == str(expected.value)
+
+'''
+Test a profile that is parsed while it is downloaded.
+'''
+def test_streamed_profile():
+    page = render_career_page(seed=9, heroes=len(HEROES))
+    with StubServer({'pc/player-9': page}) as server:
+        transport = over_stats.transport.RequestsTransport()
+        profile = over_stats.PlayerProfile('player#9', transport=transport, base_url=server.base_url, stream=True)
+        assert profile.raw_data == over_stats.parser.parse_career_page(page)
+        assert profile._r.content is None
+        with pytest.raises(over_stats.errors.PlayerNotFound):
+            over_stats.PlayerProfile('nobody#1', transport=transport, base_url=server.base_url, stream=True).load_data()
+        transport.close()
@@ -0,0 +1,118 @@
+"""
+Local HTTP server that stands in for the career site.
+
+Pages are served from a dictionary that maps 'platform/battletag' to the html of the career page, any other path
+returns a 404. Responses carry an ETag and requests with a matching If-None-Match are answered with a 304. Pages are
+gzipped when compress is true and the client accepts it. The first requests can be answered with errors by listing
+them in faults, each one is a status, a (status, headers) tuple or DROP to close the connection without answering.
+The server runs on a background thread:
+
+    with StubServer({'pc/zappis-21285': render_career_page()}) as server:
+        over_stats.PlayerProfile('zappis#21285', base_url=server.base_url)
+"""
+import gzip
+import hashlib
+import http.server
+import threading
+import time
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server.stub
+        with server.lock:
+            server.requests.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            with server.lock:
+                fault = server.faults.pop(0) if server.faults else None
+            if fault == StubServer.DROP:
+                self.close_connection = True
+            elif fault is not None:
+                status, headers = fault if isinstance(fault, tuple) else (fault, {})
+                self.send_body(status, b'Injected error', headers)
+            else:
+                self.serve_page(server)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def serve_page(self, server):
+        key = self.path[len(StubServer.PREFIX):] if self.path.startswith(StubServer.PREFIX) else None
+        page = server.pages.get(key)
+        if page is None:
+            self.send_body(404, b'Profile Not Found')
+            return
+        body = page.encode('utf-8') if isinstance(page, str) else page
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_body(304, b'', {'ETag': etag})
+        else:
+            headers = {'ETag': etag, 'Last-Modified': 'Mon, 01 Oct 2018 10:00:00 GMT'}
+            if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body)
+                headers['Content-Encoding'] = 'gzip'
+            self.send_body(200, body, headers)
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Serve career pages from a dictionary. latency is the number of seconds to wait before answering each request.
+    requests holds the path of every request received and max_active the highest number of requests that were being
+    answered at the same time.
+    """
+    PREFIX = '/en-us/career/'
+    DROP = 'drop'
+
+    def __init__(self, pages, latency=0, handler=StubHandler, faults=None, compress=False):
+        self.pages = pages
+        self.latency = latency
+        self.faults = list(faults or [])
+        self.compress = compress
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.PREFIX}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import over_stats
+import over_stats.transport
+import pytest
+
+from email.utils import formatdate
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.stub_server import StubServer
+
+requests = pytest.importorskip('requests')
+
+PAGES = {'psn/acesarramsan': render_career_page(seed=7, heroes=3)}
+
+
+def load(server, **options):
+    transport = over_stats.transport.RequestsTransport(backoff=0.01, **options)
+    try:
+        player_data = over_stats.PlayerProfile('acesarramsan', over_stats.PLAT_PSN, transport=transport,
+                                               base_url=server.base_url)
+        return player_data.raw_data
+    finally:
+        transport.close()
+
+'''
+Test that requests answered with a 429, a 5xx or a closed connection are sent again.
+'''
+def test_retries():
+    faults = [(429, {'Retry-After': '0'}), 503, StubServer.DROP, 502]
+    with StubServer(PAGES, faults=faults) as server:
+        assert load(server, retries=4) == over_stats.parser.parse_career_page(PAGES['psn/acesarramsan'])
+        assert len(server.requests) == 5
+
+'''
+Test that the last error is returned once every retry was used.
+'''
+def test_retries_exhausted():
+    with StubServer(PAGES, faults=[500, 500, 500]) as server:
+        with pytest.raises(over_stats.errors.UnexpectedBehaviour):
+            load(server, retries=2)
+        assert len(server.requests) == 3
+    with StubServer(PAGES, faults=[StubServer.DROP, StubServer.DROP]) as server:
+        with pytest.raises(requests.ConnectionError):
+            load(server, retries=1)
+
+'''
+Test that hung requests time out.
+'''
+def test_timeout():
+    with StubServer(PAGES, latency=1) as server:
+        start = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            load(server, timeout=0.1, retries=1)
+        assert time.monotonic() - start < 1
+        assert len(server.requests) == 2
+
+'''
+Test the Retry-After header, in seconds and as a date, and the limit on the time waited.
+'''
+def test_retry_after():
+    assert over_stats.transport.retry_after('3') == 3
+    assert over_stats.transport.retry_after('soon') is None
+    assert over_stats.transport.retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert 100 < over_stats.transport.retry_after(formatdate(time.time() + 120, usegmt=True)) <= 120
+    transport = over_stats.transport.RequestsTransport(backoff=0.01, max_backoff=0.2)
+    with StubServer(PAGES, faults=[(503, {'Retry-After': '3600'})]) as server:
+        start = time.monotonic()
+        assert transport.get(server.base_url + 'psn/acesarramsan').status == 200
+        assert 0.2 <= time.monotonic() - start < 2
+    transport.close()
+
+'''
+Test that gzipped pages are decoded and that connections are kept alive.
+'''
+def test_compression_and_keep_alive():
+    with StubServer(PAGES, compress=True) as server:
+        transport = over_stats.transport.RequestsTransport(pool_size=2)
+        for _ in range(3):
+            response = transport.get(server.base_url + 'psn/acesarramsan')
+            assert response.content == PAGES['psn/acesarramsan'].encode('utf-8')
+            assert response.header('Content-Encoding') == 'gzip'
+        assert len(transport.sessions) == 1
+        with transport.sessions.session() as session:
+            assert session.get_adapter(server.base_url)._pool_maxsize == 1
+        transport.close()
+
+'''
+Test that a token bucket shared by several threads limits the rate of requests.
+'''
+def test_token_bucket():
+    bucket = over_stats.transport.TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(3)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 12 tokens, 2 of them are available right away.
+    assert time.monotonic() - start >= 10 / 20 - 0.05
+    with pytest.raises(over_stats.errors.InvalidArgument):
+        over_stats.transport.TokenBucket(rate=0)
@@ -0,0 +1,92 @@
+import over_stats
+import over_stats.parser
+import over_stats.values
+import pytest
+
+from decimal import Decimal
+from over_stats.tests.career_pages import render_career_page
+from over_stats.tests.profile_test import URL, PageTransport
+
+VALUES = ['--', '0', '1,234', '12.34', '45%', '100%', '0.5%', '12:34', '01:23:45', '12 hours', '1 minute', '7']
+
+
+def legacy_stat_value(stat_value, use_decimal=False):
+    if '--' == stat_value or ':' in stat_value:
+        return stat_value
+    elif '%' in stat_value:
+        if use_decimal:
+            return Decimal(str(float(stat_value.replace('%', '')) / 100.0))
+        return float(stat_value.replace('%', '')) / 100.0
+    elif ' ' in stat_value:
+        return stat_value.split(' ')
+    stat_value = stat_value.replace(',', '')
+    if '.' in stat_value:
+        return float(stat_value)
+    return int(stat_value)
+
+'''
+Test that the values are the same ones the previous conversion returned.
+'''
+@pytest.mark.parametrize('use_decimal', [False, True])
+def test_legacy_values(use_decimal):
+    convert = over_stats.values.ValueConverter(use_decimal)
+    for stat_value in VALUES:
+        expected = legacy_stat_value(stat_value, use_decimal)
+        for value in (over_stats.values.convert_stat_value(stat_value, use_decimal), convert(stat_value)):
+            assert value == expected
+            assert type(value) is type(expected)
+    with pytest.raises(ValueError):
+        over_stats.values.convert_stat_value('abc%', True)
+
+'''
+Test that Decimal percentages are built from the text of the page.
+'''
+def test_decimal_percentages():
+    assert over_stats.values.convert_stat_value('45%', True) == Decimal('0.45')
+    assert str(over_stats.values.convert_stat_value('12.5%', True)) == '0.125'
+    assert over_stats.values.convert_stat_value('0.1%', True) == Decimal('0.001')
+
+'''
+Test the conversion of durations into seconds.
+'''
+def test_seconds():
+    convert = over_stats.values.ValueConverter(use_seconds=True)
+    assert convert('12:34') == 754
+    assert convert('01:23:45') == 5025
+    assert convert('12 hours') == 43200
+    assert convert('1 minute') == 60
+    assert convert('--') == '--'
+    assert convert('3 kills') == ['3', 'kills']
+
+'''
+Test that the values remembered by a ValueConverter are not shared between stats.
+'''
+def test_memo_copies_lists():
+    convert = over_stats.values.ValueConverter()
+    first = convert('12 hours')
+    first.append('changed')
+    assert convert('12 hours') == ['12', 'hours']
+    converted = convert.convert_pairs([('a', '3 kills'), ('b', '3 kills'), ('c', '45%')])
+    converted['a'].append('changed')
+    assert converted == {'a': ['3', 'kills', 'changed'], 'b': ['3', 'kills'], 'c': 0.45}
+    assert convert('3 kills') == ['3', 'kills']
+
+'''
+Test a profile that converts durations into seconds with each way of parsing the page.
+'''
+@pytest.mark.parametrize('options', [{}, {'lazy': True}, {'parser': over_stats.PARSER_STDLIB}])
+def test_profile_seconds(options):
+    page = render_career_page(seed=5, heroes=3)
+    profile = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: page}), use_seconds=True,
+                                       **options)
+    reference = over_stats.PlayerProfile('zappis#21285', transport=PageTransport({URL: page}))
+    for mode in profile.modes():
+        for hero in profile.stat_heroes(mode):
+            for category in profile.stat_categories(mode, hero):
+                for stat_name in profile.stat_names(mode, hero, category):
+                    value = profile.stats(mode, hero, category, stat_name)
+                    expected = over_stats.values.numeric_value(reference.stats(mode, hero, category, stat_name))
+                    if expected is None:
+                        assert value == '--'
+                    else:
+                        assert value == pytest.approx(expected)
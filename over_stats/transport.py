@@ -0,0 +1,385 @@
+"""
+Transports are used to download the career pages.
+
+The default transport is built on requests. It keeps a pool of connections alive, sets a timeout on every request and
+retries the requests that fail with a connection error, a timeout, a 429 or a 5xx, waiting longer after each attempt
+or as long as the Retry-After header asks. Responses are compressed with gzip, or brotli when the brotli package is
+installed. A TokenBucket limits the number of requests per second, it can be shared by several transports and threads:
+
+    limiter = over_stats.transport.TokenBucket(rate=5, capacity=10)
+    transport = over_stats.transport.RequestsTransport(pool_size=20, timeout=(3, 10), retries=5, rate_limiter=limiter)
+    player_data = over_stats.PlayerProfile('zappis#21285', transport=transport)
+
+A requests.Session is not meant to be used by several threads at once, so a RequestsTransport keeps a SessionPool and
+each request borrows a session for as long as it is sent. A transport can be shared by every thread of a process.
+
+requests_html can still be used by creating an HTMLSessionTransport, it is only imported when that transport makes
+its first request. A DirectoryTransport reads pages that were saved to disk, to load profiles offline.
+"""
+import contextlib
+import email.utils
+import gzip
+import importlib.util
+import os
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+import over_stats.errors
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_POOL_SIZE = 10
+# Seconds to connect and seconds to wait for data.
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class Response:
+    """
+    The parts of an HTTP response that are needed to build a profile. A streamed response has no content, its body is
+    read from chunks, an iterable of bytes.
+    """
+
+    def __init__(self, url, status, content, headers=None, chunks=None):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.headers = headers or {}
+        self.chunks = chunks
+
+    def iter_content(self):
+        """
+        Iterate over the body. The chunks of a streamed response can only be iterated once.
+        """
+        if self.chunks is not None:
+            yield from self.chunks
+        elif self.content:
+            yield self.content
+
+    def header(self, name, default=None):
+        """
+        Get the value of a response header, the name is not case sensitive.
+        """
+        name = name.lower()
+        for header_name, value in self.headers.items():
+            if header_name.lower() == name:
+                return value
+        return default
+
+    @property
+    def encoding(self):
+        """
+        Get the charset declared in the Content-Type header, or None if there is no charset.
+        """
+        content_type = self.header('Content-Type', '')
+        for parameter in content_type.split(';')[1:]:
+            name, _, value = parameter.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                return value.strip('"\'')
+        return None
+
+
+class Transport:
+    """
+    Base class for transports. Subclasses need to implement get().
+    """
+
+    def get(self, url, headers=None):
+        """
+        Download the url and return a Response.
+        """
+        raise NotImplementedError
+
+    def stream(self, url, headers=None):
+        """
+        Start downloading the url and return a Response whose body is read with iter_content() while it arrives. By
+        default the whole body is downloaded with get().
+        """
+        return self.get(url, headers)
+
+    def close(self):
+        """
+        Release any resources held by this transport.
+        """
+        pass
+
+
+class TokenBucket:
+    """
+    Rate limiter that lets rate requests per second through, with bursts of up to capacity requests. It can be shared
+    by any number of threads and transports, each request takes a token and waits when there are none left.
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0 or capacity < 1:
+            raise over_stats.errors.InvalidArgument('rate has to be positive and capacity at least 1')
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, waiting until one is available. Returns the number of seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # The token is reserved before waiting, so the threads that wait are let through in order.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class SessionPool:
+    """
+    Sessions shared by several threads, each one used by a single thread at a time. Sessions are created with create
+    when every existing one is in use, up to size sessions, after which threads wait for one to be returned.
+    """
+
+    def __init__(self, create, size=DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise over_stats.errors.InvalidArgument('size has to be at least 1')
+        self.create = create
+        self.size = size
+        self._idle = []
+        self._created = 0
+        self._available = threading.Condition()
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Borrow a session for the duration of a with block.
+        """
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                self._available.wait()
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                session = None
+                self._created += 1
+        if session is None:
+            try:
+                session = self.create()
+            except BaseException:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+        try:
+            yield session
+        finally:
+            with self._available:
+                self._idle.append(session)
+                self._available.notify()
+
+    def close(self):
+        """
+        Close the sessions that are not in use. The pool can still be used afterwards, it creates new sessions.
+        """
+        with self._available:
+            idle = self._idle
+            self._idle = []
+            self._created -= len(idle)
+            self._available.notify_all()
+        for session in idle:
+            session.close()
+
+    def __len__(self):
+        with self._available:
+            return self._created
+
+
+def retry_after(value):
+    """
+    Convert the value of a Retry-After header, a number of seconds or an HTTP date, into seconds. Returns None if the
+    value cannot be read.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def accept_encoding():
+    """
+    Get the encodings that requests can decode, brotli is only supported when a brotli package is installed.
+    """
+    if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+class RequestsTransport(Transport):
+    """
+    Transport built on requests. Sessions are created when they are first needed and kept in a SessionPool, so the
+    transport can be used by several threads at once.
+
+    pool_size is the number of sessions. A session is used by one request at a time and keeps one connection to
+    each host alive, so at most pool_size connections to a host are kept. A streamed body that is still being read
+    holds its connection after its session was returned, a request sent with that session meanwhile opens a
+    connection that is not kept.
+
+    timeout is the number of seconds to wait for the server, or a (connect, read) tuple. Requests that fail with a
+    connection error, a timeout or one of RETRY_STATUSES are sent again up to retries times, waiting backoff seconds
+    and twice as long after each attempt, or as long as the Retry-After header of the response asks, never more than
+    max_backoff seconds. rate_limiter is a TokenBucket that every request has to go through.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, rate_limiter=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.sessions = SessionPool(lambda: self.configure(self.create_session()), pool_size)
+
+    def create_session(self):
+        import requests
+        return requests.Session()
+
+    def configure(self, session):
+        """
+        Size the connection pool of a new session and ask for compressed responses.
+        """
+        import requests.adapters
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=1)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept-Encoding'] = accept_encoding()
+        return session
+
+    def backoff_delay(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def request(self, url, headers=None, stream=False):
+        """
+        Send a GET request, retrying it when it fails, and return the requests response. The last response is
+        returned once every retry was used, or the last error is raised.
+        """
+        import requests
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                with self.sessions.session() as session:
+                    r = session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                if r.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return r
+                delay = retry_after(r.headers.get('Retry-After'))
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                delay = min(delay, self.max_backoff)
+                r.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url, headers=None):
+        r = self.request(url, headers)
+        return Response(r.url, r.status_code, r.content, r.headers)
+
+    def stream(self, url, headers=None):
+        r = self.request(url, headers, stream=True)
+        if r.status_code != 200:
+            # Error pages and 304s are not parsed, read them now so the connection is released.
+            return Response(r.url, r.status_code, r.content, r.headers)
+        return Response(r.url, r.status_code, None, r.headers, self.read_chunks(r))
+
+    @staticmethod
+    def read_chunks(r):
+        """
+        Read the body of a streamed requests response and release its connection once it has been read.
+        """
+        try:
+            yield from r.iter_content(CHUNK_SIZE)
+        finally:
+            r.close()
+
+    def close(self):
+        self.sessions.close()
+
+
+class HTMLSessionTransport(RequestsTransport):
+    """
+    Transport built on a requests_html.HTMLSession. Install over_stats[requests_html] to use it.
+    """
+
+    def create_session(self):
+        import requests_html
+        return requests_html.HTMLSession()
+
+
+class DirectoryTransport(Transport):
+    """
+    Transport that serves career pages saved in a directory instead of downloading them, to work offline. The page of
+    a profile is read from directory/platform/battletag.html, or from battletag.html.gz, where the battletag is written
+    as in the url of the profile, for example pc/zappis-21285.html. Profiles without a page get a 404.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+    def page_path(self, url):
+        """
+        Get the path of the page of url without its extension, or None if the url does not name a page.
+        """
+        parts = urllib.parse.unquote(urllib.parse.urlsplit(url).path).rstrip('/').split('/')
+        if len(parts) < 2 or not parts[-1] or parts[-1] in ('.', '..') or parts[-2] in ('.', '..'):
+            return None
+        return os.path.join(self.directory, parts[-2], parts[-1])
+
+    def get(self, url, headers=None):
+        path = self.page_path(url)
+        if path is not None:
+            for extension, read in (('.html', open), ('.html.gz', gzip.open)):
+                try:
+                    with read(path + extension, 'rb') as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    continue
+                return Response(url, 200, content, {'Content-Type': 'text/html; charset=utf-8'})
+        return Response(url, 404, b'Not Found')
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def default_transport():
+    """
+    Get the transport shared by every PlayerProfile that was not given a transport.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = RequestsTransport()
+    return _default_transport
@@ -0,0 +1,137 @@
+"""
+Conversion of the stat values found on the career page.
+
+Values are shown as counts ('1,234'), ratios ('12.34'), percentages ('45%'), clocks ('12:34', '01:23:45'), durations
+with a unit ('12 hours') or '--' when the player has no value. convert_stat_value() classifies the text and converts
+it in a single pass. By default clocks are left as they appear on the page and durations with a unit are split into
+an [amount, unit] list, with use_seconds both become a number of seconds.
+
+A career page repeats the same text many times ('--', '0', '00:00', ...). A ValueConverter is created for each page
+and remembers the values it already converted.
+"""
+from decimal import Decimal, InvalidOperation
+
+MISSING = '--'
+UNIT_SECONDS = {
+    'second': 1, 'seconds': 1,
+    'minute': 60, 'minutes': 60,
+    'hour': 3600, 'hours': 3600,
+    'day': 86400, 'days': 86400,
+}
+
+
+def convert_stat_value(stat_value, use_decimal=False, use_seconds=False):
+    """
+    Convert the text of a stat value. Percentages become a fraction, a float or a Decimal built from the text when
+    use_decimal is true. Counts become ints and ratios floats.
+    """
+    if ':' in stat_value:
+        if use_seconds:
+            seconds = clock_seconds(stat_value)
+            if seconds is not None:
+                return seconds
+        return stat_value
+    if '%' in stat_value:
+        number = stat_value.replace('%', '')
+        if use_decimal:
+            try:
+                return Decimal(number).scaleb(-2)
+            except InvalidOperation:
+                raise ValueError(f'could not convert string to Decimal: {stat_value!r}')
+        return float(number) / 100.0
+    if ' ' in stat_value:
+        parts = stat_value.split(' ')
+        if use_seconds:
+            seconds = duration_seconds(parts)
+            if seconds is not None:
+                return seconds
+        return parts
+    if stat_value == MISSING:
+        return stat_value
+    if ',' in stat_value:
+        stat_value = stat_value.replace(',', '')
+    if '.' in stat_value:
+        return float(stat_value)
+    return int(stat_value)
+
+
+class ValueConverter:
+    """
+    Converts the stat values of a page with convert_stat_value(), remembering the values it already converted.
+    Lists are copied so every stat gets its own list.
+    """
+    __slots__ = ('use_decimal', 'use_seconds', '_memo')
+
+    def __init__(self, use_decimal=False, use_seconds=False):
+        self.use_decimal = use_decimal
+        self.use_seconds = use_seconds
+        self._memo = {}
+
+    def __call__(self, stat_value):
+        value = self._memo.get(stat_value)
+        if value is None:
+            value = self._memo[stat_value] = convert_stat_value(stat_value, self.use_decimal, self.use_seconds)
+        if type(value) is list:
+            value = list(value)
+        return value
+
+    def convert_pairs(self, pairs):
+        """
+        Build a dictionary from (name, stat value) pairs. This is the loop of __call__ without a call for every value.
+        """
+        memo = self._memo
+        use_decimal = self.use_decimal
+        use_seconds = self.use_seconds
+        result = {}
+        for name, stat_value in pairs:
+            value = memo.get(stat_value)
+            if value is None:
+                value = memo[stat_value] = convert_stat_value(stat_value, use_decimal, use_seconds)
+            if type(value) is list:
+                value = list(value)
+            result[name] = value
+        return result
+
+
+def clock_seconds(text):
+    """
+    Convert a clock like '12:34' or '01:23:45' into seconds. Returns None if text is not a clock.
+    """
+    seconds = 0
+    for part in text.split(':'):
+        if not part.isdigit():
+            return None
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def duration_seconds(value):
+    """
+    Convert a duration stored in the _model into seconds. Returns None if the value is not a duration.
+    """
+    if isinstance(value, str):
+        if ':' in value:
+            return clock_seconds(value)
+        return None
+    if isinstance(value, list) and len(value) == 2 and value[1].lower() in UNIT_SECONDS:
+        try:
+            amount = float(value[0].replace(',', ''))
+        except ValueError:
+            return None
+        seconds = amount * UNIT_SECONDS[value[1].lower()]
+        return int(seconds) if seconds.is_integer() else seconds
+    return None
+
+
+def numeric_value(value):
+    """
+    Convert a value stored in the _model into a number. Durations become seconds and missing values ('--') or values
+    that are not numbers become None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    return duration_seconds(value)
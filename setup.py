@@ -25,5 +25,16 @@ setup(name='over_stats',
       license='GNU GPL3',
       python_requires='>=3.6',      
       packages=['over_stats'],
-      install_requires=['requests-html'],
+      install_requires=['requests'],
+      entry_points={
+          'console_scripts': ['over-stats=over_stats.cli:main'],
+      },
+      extras_require={
+          'aio': ['aiohttp'],
+          'brotli': ['brotli'],
+          'lxml': ['lxml'],
+          'numpy': ['numpy'],
+          'pandas': ['numpy', 'pandas'],
+          'requests_html': ['requests-html'],
+      },
       zip_safe=False)